@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, Course, Group, TestBlock, Question, TestResult, UserAnswer
+from .models import CustomUser, Course, Group, TestBlock, Question, TestResult, UserAnswer, QueuedSubmission, AnswerDraft, AnswerArchive
 
 
 @admin.register(CustomUser)
@@ -38,9 +38,10 @@ class QuestionInline(admin.TabularInline):
 
 @admin.register(TestBlock)
 class TestBlockAdmin(admin.ModelAdmin):
-    list_display = ['title', 'course', 'start_time', 'time_per_question', 'is_active']
+    list_display = ['title', 'course', 'start_time', 'time_per_question', 'question_count', 'end_time', 'is_active']
     list_filter = ['course', 'is_active', 'start_time']
     search_fields = ['title']
+    readonly_fields = ['question_count', 'end_time']
     inlines = [QuestionInline]
 
 
@@ -64,3 +65,26 @@ class UserAnswerAdmin(admin.ModelAdmin):
     list_display = ['user', 'question', 'selected_answer', 'is_correct', 'answered_at']
     list_filter = ['is_correct', 'answered_at']
     search_fields = ['user__username', 'question__question_text']
+
+
+@admin.register(QueuedSubmission)
+class QueuedSubmissionAdmin(admin.ModelAdmin):
+    list_display = ['user', 'test_block', 'status', 'created_at', 'processed_at']
+    list_filter = ['status', 'test_block']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'test_block', 'answers', 'time_spent', 'claimed_by', 'claimed_at', 'created_at', 'processed_at']
+
+
+@admin.register(AnswerDraft)
+class AnswerDraftAdmin(admin.ModelAdmin):
+    list_display = ['user', 'test_block', 'updated_at']
+    list_filter = ['test_block']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'test_block', 'answers', 'updated_at']
+
+
+@admin.register(AnswerArchive)
+class AnswerArchiveAdmin(admin.ModelAdmin):
+    list_display = ['test_block', 'result_count', 'raw_size', 'rows_deleted', 'updated_at']
+    exclude = ['data']
+    readonly_fields = ['test_block', 'result_count', 'raw_size', 'rows_deleted', 'updated_at']
@@ -0,0 +1,193 @@
+"""Eski bloklar javoblarini sovuq saqlashga ko'chirish (compaction).
+
+Blok muddati ``ANSWER_ARCHIVE_AFTER_DAYS`` kundan oldin tugagan bo'lsa, uning
+javoblari deyarli o'qilmaydi, lekin ``UserAnswer`` qatorlari va natijalar
+vektorlari issiq jadvallar va ularning indekslarini shishiradi.
+``compact_block`` blokning barcha javoblarini bitta siqilgan arxivga
+(``AnswerArchive.data``) yig'adi, natijalardagi vektorlarni bo'shatadi va
+``UserAnswer`` qatorlarini ``ANSWER_ARCHIVE_CHUNK_SIZE`` talik bo'laklarda
+o'chiradi.
+
+Har bir qadam alohida tranzaksiyada va takrorlansa ham xavfsiz: arxiv
+yozilmaguncha hech narsa o'chirilmaydi, to'xtab qolgan buyruq esa qayta
+ishga tushirilganda qolgan qatorlarni o'chirishdan davom etadi.
+
+Arxiv - ``{user_id: vektor}`` (answer_vector.py formatida) ketma-ketligi,
+zlib bilan siqilgan; bir blokdagi vektorlar tartibi bir xil bo'lgani uchun
+yaxshi siqiladi. O'qish qatlami (``result_vector``, ``result_answers``)
+natija sahifasi, eksport, item tahlili va qayta baholash uchun vektorni
+natijadan, bo'lmasa arxivdan, u ham bo'lmasa eski ``UserAnswer``
+qatorlaridan oladi.
+"""
+import zlib
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .answer_vector import BLANK, decode_answers, encode_answers, encode_layout, read_varint, write_varint
+from .models import AnswerArchive, Question, TestBlock, TestResult, UserAnswer
+
+ResultAnswer = namedtuple('ResultAnswer', ['question', 'selected_answer', 'is_correct'])
+
+
+def get_archive_after_days():
+    return getattr(settings, 'ANSWER_ARCHIVE_AFTER_DAYS', 30)
+
+
+def get_archive_chunk_size():
+    return getattr(settings, 'ANSWER_ARCHIVE_CHUNK_SIZE', 5000)
+
+
+def encode_archive(vectors):
+    """{user_id: vektor} -> (siqilgan baytlar, siqilmagan hajm)"""
+    out = bytearray()
+    for user_id in sorted(vectors):
+        vector = bytes(vectors[user_id])
+        write_varint(user_id, out)
+        write_varint(len(vector), out)
+        out += vector
+    return zlib.compress(bytes(out), 9), len(out)
+
+
+def decode_archive(data):
+    raw = zlib.decompress(bytes(data))
+    vectors = {}
+    offset = 0
+    while offset < len(raw):
+        user_id, offset = read_varint(raw, offset)
+        length, offset = read_varint(raw, offset)
+        vectors[user_id] = raw[offset:offset + length]
+        offset += length
+    return vectors
+
+
+def load_archived_vectors(block_id):
+    """Blok arxividagi {user_id: vektor}; arxiv bo'lmasa bo'sh"""
+    data = AnswerArchive.objects.filter(test_block_id=block_id).values_list('data', flat=True).first()
+    return decode_archive(data) if data is not None else {}
+
+
+def result_vector(result):
+    """Natija javoblari vektori (baytlar) - natijadan yoki arxivdan; topilmasa None"""
+    if result.answer_vector is not None:
+        return result.answer_vector
+    return load_archived_vectors(result.test_block_id).get(result.user_id)
+
+
+def result_answers(result):
+    """Natija sahifasi uchun javoblar (savol tartibida, javobsizlarsiz).
+
+    Vektori ham, arxivi ham yo'q eski natijalar ``UserAnswer`` qatorlaridan o'qiladi.
+    """
+    answer_vector = result_vector(result)
+    if answer_vector is None:
+        return list(
+            UserAnswer.objects.filter(user_id=result.user_id, question__test_block_id=result.test_block_id)
+            .select_related('question')
+        )
+    vector = decode_answers(answer_vector)
+    answered = [index for index, letter in enumerate(vector.selected) if letter != BLANK]
+    questions = Question.objects.only('id', 'question_text', 'correct_answer').order_by().in_bulk(
+        [vector.question_ids[index] for index in answered]
+    )
+    return [
+        ResultAnswer(questions[vector.question_ids[index]], chr(vector.selected[index]), bool(vector.correct_mask[index]))
+        for index in answered
+        if vector.question_ids[index] in questions
+    ]
+
+
+def vectors_from_rows(block, user_ids):
+    """Vektori yo'q talabalar uchun UserAnswer qatorlaridan vektor (blokning joriy tartibida)"""
+    question_ids = list(block.questions.values_list('id', flat=True))
+    positions = {question_id: index for index, question_id in enumerate(question_ids)}
+    layout = encode_layout(question_ids)
+    by_user = {}
+    rows = UserAnswer.objects.filter(question__test_block=block, user_id__in=user_ids).values_list(
+        'user_id', 'question_id', 'selected_answer', 'is_correct'
+    )
+    for user_id, question_id, letter, is_correct in rows.iterator(chunk_size=get_archive_chunk_size()):
+        selected, correct = by_user.setdefault(user_id, (bytearray(b'-' * len(question_ids)), [False] * len(question_ids)))
+        selected[positions[question_id]] = ord(letter)
+        correct[positions[question_id]] = is_correct
+    return {user_id: encode_answers(layout, bytes(selected), correct) for user_id, (selected, correct) in by_user.items()}
+
+
+def blocks_to_compact(days=None, now=None):
+    """Muddati ``days`` kundan oldin tugagan, issiq jadvallarda hali javoblari qolgan bloklar"""
+    days = get_archive_after_days() if days is None else days
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    has_vectors = Exists(TestResult.objects.filter(test_block=OuterRef('pk'), answer_vector__isnull=False))
+    has_rows = Exists(UserAnswer.objects.filter(question__test_block=OuterRef('pk')))
+    return TestBlock.objects.filter(Q(has_vectors) | Q(has_rows), end_time__lt=cutoff).order_by('end_time', 'id')
+
+
+@transaction.atomic
+def archive_block(block):
+    """1-qadam: barcha javoblarni arxivga yozish va natijalardagi vektorlarni bo'shatish.
+
+    Oldingi (to'xtab qolgan) ishga tushirishda yozilgan arxiv bilan birlashtiriladi.
+    """
+    archive = AnswerArchive.objects.select_for_update().filter(test_block=block).first()
+    vectors = decode_archive(archive.data) if archive is not None else {}
+    vectors.update(
+        TestResult.objects.filter(test_block=block, answer_vector__isnull=False).values_list('user_id', 'answer_vector')
+    )
+    # Vektori yo'q (eski) javoblar - qatorlari o'chirilishidan oldin arxivga
+    row_users = set(UserAnswer.objects.filter(question__test_block=block).values_list('user_id', flat=True).distinct())
+    vectors.update(vectors_from_rows(block, row_users - set(vectors)))
+    data, raw_size = encode_archive(vectors)
+    if archive is None:
+        archive = AnswerArchive(test_block=block)
+    archive.data, archive.raw_size, archive.result_count = data, raw_size, len(vectors)
+    archive.save()
+    cleared = TestResult.objects.filter(test_block=block, answer_vector__isnull=False).update(answer_vector=None)
+    return archive, cleared
+
+
+def delete_answer_rows(block, chunk_size=None):
+    """2-qadam: blokning UserAnswer qatorlarini bo'laklab o'chirish (har bo'lak o'z tranzaksiyasida)"""
+    chunk_size = chunk_size or get_archive_chunk_size()
+    deleted = 0
+    while True:
+        ids = list(UserAnswer.objects.filter(question__test_block=block).values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            count, _ = UserAnswer.objects.filter(id__in=ids).delete()
+            AnswerArchive.objects.filter(test_block=block).update(rows_deleted=F('rows_deleted') + count)
+        deleted += count
+
+
+def compact_block(block, chunk_size=None):
+    """Bitta blokni arxivlash; bajarilgan ish statistikasi"""
+    archive, cleared = archive_block(block)
+    rows_deleted = delete_answer_rows(block, chunk_size)
+    return {
+        'results': archive.result_count,
+        'vectors_cleared': cleared,
+        'rows_deleted': rows_deleted,
+        'raw_size': archive.raw_size,
+        'archive_size': len(archive.data),
+    }
+
+
+def restore_block(block):
+    """Arxivdagi vektorlarni natijalarga qaytarish (qayta baholashdan oldin).
+
+    Arxiv o'chirilmaydi: natijadagi vektor ustun turadi, keyingi arxivlash esa
+    yangilangan vektorlarni arxivga qayta yozadi.
+    """
+    vectors = load_archived_vectors(block.pk)
+    results = [
+        result for result in TestResult.objects.filter(test_block=block, answer_vector__isnull=True).only('id', 'user_id')
+        if result.user_id in vectors
+    ]
+    for result in results:
+        result.answer_vector = vectors[result.user_id]
+    TestResult.objects.bulk_update(results, ['answer_vector'], batch_size=1000)
+    return len(results)
@@ -0,0 +1,200 @@
+"""Imtihon davomida javoblarni avtomatik saqlash (WebSocket orqali).
+
+Talaba variant tanlaganda brauzer ``TestConsumer`` ga ``answer`` xabarini
+yuboradi. Har bir urinishning (talaba, blok) javoblari jarayon xotirasida
+turadi, bazaga esa har ``ANSWER_FLUSH_INTERVAL`` soniyada (yoki o'zgargan
+urinishlar ``ANSWER_FLUSH_BATCH_SIZE`` ga yetganda) partiyalab yoziladi:
+bitta savol oraliqda necha marta o'zgarmasin, faqat oxirgi holat yoziladi,
+har bir partiya esa ``AnswerDraft`` ga bitta upsert so'rovi.
+
+Bufer har bir blok uchun "nechta savolga javob bergan talabalar soni"
+gistogrammasini ham javob kelganda yangilab boradi - proktor oqimi
+(proctor.py) uni talabalarni aylanib chiqmasdan oladi.
+
+Brauzer yopilsa yoki jarayon qayta ishga tushsa javoblar qoralamadan
+tiklanadi; ``submit_test`` esa qoralamani yuborilgan javoblar bilan
+birlashtirib baholaydi va o'chiradi.
+"""
+import asyncio
+import logging
+from collections import Counter, defaultdict
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import AnswerDraft, TestResult
+
+logger = logging.getLogger(__name__)
+
+
+def get_flush_interval():
+    return getattr(settings, 'ANSWER_FLUSH_INTERVAL', 5)
+
+
+def get_flush_batch_size():
+    return getattr(settings, 'ANSWER_FLUSH_BATCH_SIZE', 500)
+
+
+def get_draft_answers(user_id, block_id):
+    """Saqlangan qoralama javoblari: {question_id: harf}"""
+    answers = AnswerDraft.objects.filter(user_id=user_id, test_block_id=block_id).values_list('answers', flat=True).first()
+    return answers or {}
+
+
+def write_drafts(items):
+    """[(user_id, block_id, javoblar), ...] ni bitta upsert bilan yozish.
+
+    Allaqachon topshirilgan urinishlar o'tkazib yuboriladi - topshirgandan
+    keyin yopilgan soket qoralamani qayta yaratmasligi uchun.
+    """
+    submitted = set(
+        TestResult.objects.filter(
+            user_id__in={user_id for user_id, _, _ in items}, test_block_id__in={block_id for _, block_id, _ in items}
+        ).values_list('user_id', 'test_block_id')
+    )
+    drafts = [
+        AnswerDraft(user_id=user_id, test_block_id=block_id, answers=answers)
+        for user_id, block_id, answers in items
+        if (user_id, block_id) not in submitted
+    ]
+    AnswerDraft.objects.bulk_create(
+        drafts, update_conflicts=True, unique_fields=['user', 'test_block'], update_fields=['answers', 'updated_at'],
+    )
+    return len(drafts)
+
+
+class AnswerBuffer:
+    """Jarayondagi barcha urinishlar javoblari va ularni yozuvchi vazifa"""
+
+    def __init__(self):
+        self._attempts = {}  # (user_id, block_id) -> {'answers': {...}, 'clients': n}
+        self._dirty = set()
+        self._answered = defaultdict(Counter)  # block_id -> {javoblar soni: talabalar}
+        self._task = None
+        self._wakeup = None
+        # messages - qabul qilingan javoblar, flushes - upsert partiyalari, rows - yozilgan qoralamalar
+        self.stats = {'messages': 0, 'flushes': 0, 'rows': 0}
+
+    async def attach(self, user_id, block_id):
+        """Urinishga soket ulandi; birinchisida javoblar qoralamadan yuklanadi"""
+        key = (user_id, block_id)
+        if key not in self._attempts:
+            answers = await database_sync_to_async(get_draft_answers)(user_id, block_id)
+            if key not in self._attempts:
+                self._attempts[key] = {'answers': answers, 'clients': 0}
+                self._count_answered(block_id, len(answers), 1)
+        self._attempts[key]['clients'] += 1
+        self._ensure_flusher()
+        return dict(self._attempts[key]['answers'])
+
+    async def detach(self, user_id, block_id):
+        """Soket uzildi; oxirgisida urinish darhol yoziladi va xotiradan chiqadi.
+
+        Yozib bo'lmasa urinish xotirada qoladi - uni navbatdagi ``flush`` qayta
+        yozadi va shundan keyin chiqaradi.
+        """
+        key = (user_id, block_id)
+        attempt = self._attempts.get(key)
+        if attempt is None:
+            return
+        attempt['clients'] -= 1
+        if attempt['clients'] > 0:
+            return
+        if key in self._dirty:
+            self._dirty.discard(key)
+            await self._write([key])
+        self._release([key])
+
+    def _release(self, keys):
+        """Ulangan soketi qolmagan va yozilmagan javobi yo'q urinishlarni xotiradan chiqarish"""
+        for key in keys:
+            attempt = self._attempts.get(key)
+            if attempt is not None and attempt['clients'] <= 0 and key not in self._dirty:
+                del self._attempts[key]
+                self._count_answered(key[1], len(attempt['answers']), -1)
+
+    def record(self, user_id, block_id, question_id, letter):
+        """Javobni xotiraga yozish; bo'sh harf javobni o'chiradi"""
+        key = (user_id, block_id)
+        answers = self._attempts[key]['answers']
+        answered = len(answers)
+        if letter:
+            answers[question_id] = letter
+        else:
+            answers.pop(question_id, None)
+        if len(answers) != answered:
+            self._count_answered(block_id, answered, -1)
+            self._count_answered(block_id, len(answers), 1)
+        self._dirty.add(key)
+        self.stats['messages'] += 1
+        if len(self._dirty) >= get_flush_batch_size() and self._wakeup is not None:
+            self._wakeup.set()
+
+    def pending(self):
+        return len(self._dirty)
+
+    def _count_answered(self, block_id, answered, delta):
+        counts = self._answered[block_id]
+        counts[answered] += delta
+        if counts[answered] <= 0:
+            del counts[answered]
+            if not counts:
+                del self._answered[block_id]
+
+    def progress(self, block_id):
+        """Shu jarayonda ulangan talabalar gistogrammasi: {javoblar soni: talabalar}"""
+        return dict(self._answered.get(block_id, {}))
+
+    async def flush(self):
+        """O'zgargan barcha urinishlarni partiyalab yozish"""
+        keys, self._dirty = list(self._dirty), set()
+        batch_size = get_flush_batch_size()
+        for start in range(0, len(keys), batch_size):
+            await self._write(keys[start:start + batch_size])
+
+    async def _write(self, keys):
+        items = [(user_id, block_id, dict(self._attempts[(user_id, block_id)]['answers']))
+                 for user_id, block_id in keys if (user_id, block_id) in self._attempts]
+        if not items:
+            return
+        try:
+            rows = await database_sync_to_async(write_drafts)(items)
+        except Exception:
+            # Keyingi urinishda qayta yoziladi
+            self._dirty.update(keys)
+            logger.exception("Javoblar qoralamasini yozishda xatolik (%s ta urinish)", len(items))
+            return
+        self.stats['flushes'] += 1
+        self.stats['rows'] += rows
+        self._release(keys)
+
+    def _ensure_flusher(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        interval = get_flush_interval()
+        while self._attempts:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+
+_buffer = None
+
+
+def get_answer_buffer():
+    global _buffer
+    if _buffer is None:
+        _buffer = AnswerBuffer()
+    return _buffer
+
+
+def clear_answer_buffer():
+    """Jarayondagi buferni tashlab yuborish (testlar uchun)"""
+    global _buffer
+    _buffer = None
@@ -0,0 +1,112 @@
+"""Natija javoblarining ixcham vektori (``TestResult.answer_vector``).
+
+Avval bitta natijani ko'rsatish uchun ``UserAnswer`` ``Question`` bilan
+birlashtirilib o'qilar, jadval esa har talaba va har savol uchun bitta
+qatorga o'sar edi. Endi javoblar topshirish paytida natijaning o'ziga
+bitta baytlar qatori qilib yoziladi:
+
+    format (1 bayt) | tartib uzunligi (varint) | tartib | tanlangan harflar | to'g'rilik bitmapi
+
+Tartib - baholash paytidagi savollar id lari (delta + varint, ketma-ket
+id lar bittadan bayt oladi). U vektorni o'zini-o'zi tushuntiradigan qiladi:
+keyin savol qo'shilsa yoki o'chirilsa ham eski natija to'g'ri o'qiladi.
+Harflar kalit tartibida (``'-'`` - javobsiz), bitmap esa
+``numpy.packbits`` (little) bilan siqilgan. 50 savolli natija ~110 bayt.
+
+Bir blokdagi barcha natijalar tartibi bir xil, shuning uchun u bir marta
+ochiladi (lru_cache).
+"""
+from functools import lru_cache
+
+import numpy as np
+
+FORMAT = 1
+BLANK = ord('-')
+
+
+def write_varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_layout(question_ids):
+    """Savollar tartibi: id lar ayirmalari (zigzag varint)"""
+    out = bytearray()
+    write_varint(len(question_ids), out)
+    previous = 0
+    for question_id in question_ids:
+        delta = question_id - previous
+        write_varint(delta * 2 if delta >= 0 else -delta * 2 - 1, out)
+        previous = question_id
+    return bytes(out)
+
+
+@lru_cache(maxsize=256)
+def decode_layout(layout):
+    count, offset = read_varint(layout, 0)
+    question_ids = []
+    previous = 0
+    for _ in range(count):
+        value, offset = read_varint(layout, offset)
+        previous += value >> 1 if not value & 1 else -((value + 1) >> 1)
+        question_ids.append(previous)
+    return tuple(question_ids)
+
+
+def encode_answers(layout, selected, correct_mask):
+    """Vektor: ``layout`` - ``encode_layout`` natijasi, ``selected`` - kalit
+    tartibidagi harflar, ``correct_mask`` - har bir savol to'g'rimi"""
+    out = bytearray([FORMAT])
+    write_varint(len(layout), out)
+    out += layout
+    out += selected
+    out += np.packbits(np.asarray(correct_mask, dtype=bool), bitorder='little').tobytes()
+    return bytes(out)
+
+
+class AnswerVector:
+    """Ochilgan vektor"""
+    __slots__ = ('question_ids', 'selected', 'correct_mask')
+
+    def __init__(self, question_ids, selected, correct_mask):
+        self.question_ids = question_ids
+        self.selected = selected
+        self.correct_mask = correct_mask
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def answers(self):
+        """{question_id (str): harf} - javobsiz savollarsiz"""
+        return {
+            str(question_id): chr(letter)
+            for question_id, letter in zip(self.question_ids, self.selected)
+            if letter != BLANK
+        }
+
+
+def decode_answers(data):
+    data = bytes(data)
+    if data[0] != FORMAT:
+        raise ValueError(f"Noma'lum javoblar vektori formati: {data[0]}")
+    length, offset = read_varint(data, 1)
+    question_ids = decode_layout(data[offset:offset + length])
+    offset += length
+    count = len(question_ids)
+    selected = data[offset:offset + count]
+    bits = np.frombuffer(data, dtype=np.uint8, offset=offset + count)
+    correct_mask = np.unpackbits(bits, count=count, bitorder='little').astype(bool)
+    return AnswerVector(question_ids, selected, correct_mask)
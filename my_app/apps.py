@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MyAppConfig(AppConfig):
     name = 'my_app'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
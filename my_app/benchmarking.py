@@ -0,0 +1,120 @@
+"""Benchmark buyruqlari uchun yordamchilar.
+
+Benchmarklar asosiy bazaga tegmaydi: har biri vaqtinchalik test bazasida
+namunaviy kurs, guruhlar, talabalar va test bloki yaratib ishlaydi.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import CustomUser, Course, Group, TestBlock, Question
+
+
+@contextmanager
+def temporary_database(verbosity=0, on_disk=False):
+    """Benchmark davomida vaqtinchalik test bazasidan foydalanish.
+
+    ``on_disk`` - SQLite bazasini xotirada emas, faylda yaratish (bir nechta
+    oqimdan yozish haqiqiy sharoitdagidek bo'lishi uchun).
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    directory = None
+    if on_disk and connection.vendor == 'sqlite':
+        directory = tempfile.mkdtemp(prefix='exam_bench_')
+        test_settings['NAME'] = os.path.join(directory, 'db.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        test_settings['NAME'] = old_test_name
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def seed_exam(students=10, groups=1, questions=20, password='parol', time_per_question=2):
+    """Kurs, guruhlar, talabalar va ochiq test bloki yaratish"""
+    course = Course.objects.create(name='Benchmark kursi')
+    group_list = [Group.objects.create(name=f'Guruh {i + 1}', course=course) for i in range(groups)]
+
+    # Parol bir marta xeshlanadi - benchmark tayyorlash vaqti qisqa bo'lishi uchun
+    password_hash = make_password(password)
+    CustomUser.objects.bulk_create([
+        CustomUser(
+            username=f'talaba{course.id}_{i + 1}',
+            first_name='Talaba',
+            last_name=str(i + 1),
+            password=password_hash,
+            group=group_list[i % groups],
+        )
+        for i in range(students)
+    ])
+
+    block = TestBlock.objects.create(
+        title='Benchmark testi',
+        course=course,
+        start_time=timezone.now() - timedelta(minutes=1),
+        time_per_question=time_per_question,
+    )
+    Question.objects.bulk_create([
+        Question(
+            test_block=block,
+            question_text=f'Savol {i + 1}',
+            option_a='A javob', option_b='B javob', option_c='C javob', option_d='D javob',
+            correct_answer='ABCD'[i % 4],
+            order=i + 1,
+        )
+        for i in range(questions)
+    ])
+    block.question_count = questions
+    block.save()
+
+    return SimpleNamespace(
+        course=course,
+        groups=group_list,
+        block=block,
+        students=list(CustomUser.objects.filter(group__course=course).order_by('id')),
+        password=password,
+    )
+
+
+def measure(func, *args, **kwargs):
+    """Funksiyani bajarish: (natija, soniya, so'rovlar ro'yxati)"""
+    # So'rovlar jurnali 9000 ta bilan cheklangan, uzun benchmarkda to'lib qoladi
+    connection.queries_log.clear()
+    with CaptureQueriesContext(connection) as ctx:
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - started
+    return result, elapsed, ctx.captured_queries
+
+
+def percentile(values, pct):
+    """Tartiblangan qiymatlardan foiz ulushi (eng yaqin daraja usuli)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(durations):
+    """Kechikishlar bo'yicha qisqa statistika (millisekundda)"""
+    return {
+        'count': len(durations),
+        'mean_ms': statistics.fmean(durations) * 1000 if durations else 0.0,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
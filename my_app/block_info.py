@@ -0,0 +1,86 @@
+"""WebSocket ulanishlari uchun blok ma'lumotlari keshi (jarayon ichida).
+
+Imtihon boshlanganda yuzlab soketlar bir soniyada ulanadi va har biri
+bir xil blok ma'lumotini so'raydi. Ma'lumot jarayon xotirasida
+``BLOCK_INFO_CACHE_TIMEOUT`` soniya saqlanadi; kesh bo'sh bo'lganda bir
+vaqtdagi so'rovlar bitta yuklashni kutadi (single-flight) - 500 ulanish
+bitta so'rov va bitta thread-pool o'tishiga teng.
+
+Blok yoki uning savollari shu jarayonda o'zgarsa yozuv darhol o'chiriladi
+(signals.py); boshqa jarayondagi tahrirlar esa eng ko'pi bilan
+``BLOCK_INFO_CACHE_TIMEOUT`` soniyada ko'rinadi.
+"""
+import asyncio
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import TestBlock
+
+INFO_FIELDS = ['id', 'title', 'start_time', 'end_time', 'time_per_question', 'question_count', 'is_active', 'version']
+
+_cache = {}  # block_id -> (ma'lumot yoki None, amal qilish muddati)
+_inflight = {}  # block_id -> yuklash vazifasi
+_generations = {}  # block_id -> invalidatsiyalar soni
+
+
+def get_block_info_timeout():
+    return getattr(settings, 'BLOCK_INFO_CACHE_TIMEOUT', 10)
+
+
+@database_sync_to_async
+def load_block_info(block_id):
+    """Bazadan bitta so'rov; blok topilmasa None"""
+    return TestBlock.objects.filter(pk=block_id).values(*INFO_FIELDS).first()
+
+
+async def _load(block_id):
+    generation = _generations.get(block_id, 0)
+    try:
+        info = await load_block_info(block_id)
+    finally:
+        _inflight.pop(block_id, None)
+    # Yuklash paytida blok tahrirlangan bo'lsa eski ma'lumot keshga yozilmaydi
+    if _generations.get(block_id, 0) == generation:
+        _cache[block_id] = (info, time.monotonic() + get_block_info_timeout())
+    return info
+
+
+async def get_block_info(block_id):
+    """Blok ma'lumoti (lug'at) yoki None"""
+    try:
+        block_id = int(block_id)
+    except (TypeError, ValueError):
+        return None
+    entry = _cache.get(block_id)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    task = _inflight.get(block_id)
+    if task is None:
+        task = _inflight[block_id] = asyncio.ensure_future(_load(block_id))
+    # Birinchi ulanish uzilsa ham yuklash qolganlar uchun davom etadi
+    return await asyncio.shield(task)
+
+
+def block_info_payload(info):
+    """Mijozga yuboriladigan JSON ko'rinishi"""
+    if info is None:
+        return {}
+    return {
+        **info,
+        'start_time': info['start_time'].isoformat(),
+        'end_time': info['end_time'].isoformat() if info['end_time'] else None,
+    }
+
+
+def invalidate_block_info(block_ids):
+    for block_id in block_ids:
+        _generations[block_id] = _generations.get(block_id, 0) + 1
+        _cache.pop(block_id, None)
+
+
+def clear_block_info():
+    """Butun keshni tozalash (testlar uchun)"""
+    _cache.clear()
+    _generations.clear()
@@ -0,0 +1,58 @@
+"""Test bloklari holatini (ochiq, muddati o'tgan, topshirilgan) hisoblash.
+
+Dashboard har bir blok uchun alohida so'rov yubormasligi uchun barcha
+bloklar holati o'zgarmas sondagi so'rovlarda hisoblanadi: savollar soni
+va tugash vaqti blokda saqlanadi, topshirilgan bloklar esa bitta so'rovda
+olinadi.
+"""
+from django.utils import timezone
+
+from .models import TestBlock, TestResult
+
+
+def get_user_blocks(user):
+    """Foydalanuvchi guruhiga tegishli faol test bloklari"""
+    test_blocks = TestBlock.objects.filter(is_active=True)
+    if user.group_id:
+        test_blocks = test_blocks.filter(course__groups=user.group_id)
+    return test_blocks
+
+
+def get_completed_results(user, block_ids=None):
+    """Topshirilgan bloklar: {block_id: result_id}"""
+    results = TestResult.objects.filter(user=user)
+    if block_ids is not None:
+        results = results.filter(test_block_id__in=block_ids)
+    return dict(results.values_list('test_block_id', 'id'))
+
+
+def build_block_status(block, result_id=None, now=None):
+    """Bitta blok holati (so'rovsiz)"""
+    now = now or timezone.now()
+    is_locked = now < block.start_time
+    is_expired = now > block.get_end_time()
+    completed = result_id is not None
+    return {
+        'block': block,
+        'question_count': block.get_question_count(),
+        'is_locked': is_locked,
+        'is_expired': is_expired,
+        'is_open': block.is_active and not is_locked and not is_expired,
+        'can_take': block.is_active and not is_locked and not is_expired and not completed,
+        'completed': completed,
+        'result_id': result_id,
+    }
+
+
+def get_blocks_status(user, blocks=None):
+    """Foydalanuvchining barcha bloklari holati (2 ta so'rov)"""
+    blocks = list(get_user_blocks(user) if blocks is None else blocks)
+    completed = get_completed_results(user, [block.id for block in blocks])
+    now = timezone.now()
+    return [build_block_status(block, completed.get(block.id), now) for block in blocks]
+
+
+def get_block_status(user, block):
+    """Bitta blok holati"""
+    completed = get_completed_results(user, [block.id])
+    return build_block_status(block, completed.get(block.id))
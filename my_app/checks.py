@@ -0,0 +1,54 @@
+"""Tizim tekshiruvlari (``manage.py check``)."""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+# Har bir jarayonda alohida keshlar: birida o'chirilgan yozuv boshqalarida qoladi
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+CACHED_SESSION_ENGINES = {
+    'django.contrib.sessions.backends.cache',
+    'django.contrib.sessions.backends.cached_db',
+}
+
+
+@register()
+def check_shared_caches(app_configs, **kwargs):
+    """Sessiya va principal keshlari barcha workerlar uchun umumiy bo'lishi kerak.
+
+    Aks holda chiqish, sessiyani tozalash, foydalanuvchini o'chirish yoki parolni
+    almashtirish faqat so'rovni bajargan workerda kuchga kiradi. DEBUG da (bitta
+    jarayonli ``runserver``) tekshirilmaydi.
+    """
+    if settings.DEBUG:
+        return []
+    errors = []
+    aliases = []
+    # Sessiyalar faqat kesh backendlarida keshga bog'liq ('db' da emas)
+    if settings.SESSION_ENGINE in CACHED_SESSION_ENGINES:
+        aliases.append(('SESSION_CACHE_ALIAS', settings.SESSION_CACHE_ALIAS))
+    if getattr(settings, 'PRINCIPAL_CACHE', None):
+        aliases.append(('PRINCIPAL_CACHE', settings.PRINCIPAL_CACHE))
+    for name, alias in aliases:
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_CACHES:
+            errors.append(Error(
+                f"{name} = {alias!r} jarayon ichidagi keshga ({backend}) ishora qiladi",
+                hint="Barcha workerlar uchun umumiy keshni (masalan, RedisCache) ko'rsating",
+                id='my_app.E001',
+            ))
+    return errors
+
+
+@register()
+def check_shared_leaderboard(app_configs, **kwargs):
+    """Jarayon xotirasidagi reyting boshqa workerlarda saqlangan natijalarni ko'rmaydi"""
+    if settings.DEBUG or getattr(settings, 'LEADERBOARD_BACKEND', 'memory') != 'memory':
+        return []
+    return [Warning(
+        "LEADERBOARD_BACKEND = 'memory' har bir jarayonda alohida va eskirib qoladi",
+        hint="REDIS_URL ni sozlang (LEADERBOARD_BACKEND = 'redis')",
+        id='my_app.W002',
+    )]
@@ -1,63 +1,161 @@
+import asyncio
 import json
-from channels.generic.websocket import AsyncWebsocketConsumer
+import time
 from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
 from django.utils import timezone
-from .models import TestBlock
+from .answer_buffer import get_answer_buffer
+from .block_info import block_info_payload, get_block_info, get_block_info_timeout
+from .exam_timer import get_timer_interval, get_timer_state, join_ticker, leave_ticker
+from .grading import VALID_ANSWERS, compile_answer_key
+from .models import TestBlock, TestResult
+from .proctor import build_progress, count_submitted, get_proctor_group, get_push_interval, merge_snapshots
 
 class TestConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.block_id = self.scope['url_route']['kwargs']['block_id']
-        self.room_group_name = f'test_{self.block_id}'
-
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        # Qolgan vaqtni xona tickeri yuboradi (exam_timer.py)
+        self.timer_group_name = join_ticker(self.block_id)
+        await self.channel_layer.group_add(self.timer_group_name, self.channel_name)
 
         await self.accept()
         
         # Send initial time info
-        block_info = await self.get_block_info()
+        block_info = block_info_payload(await get_block_info(self.block_id))
         await self.send(text_data=json.dumps({
             'type': 'init',
             'data': block_info
         }))
+        # Qayta ulanganda mijoz vaqtni darhol oladi, keyingi tickni kutmaydi
+        await self.send_timer()
+
+        # Javoblarni avtomatik saqlash faqat tizimga kirgan talabalar uchun
+        self.attempt = None
+        self.attached = False
+        # Topshirilganlik tekshiruvi natijasi shu vaqtgacha amal qiladi (monotonic)
+        self.submitted_checked_until = 0
+        user = self.scope.get('user')
+        if user is not None and user.is_authenticated and block_info:
+            self.answer_key = await self.get_answer_key(block_info)
+            self.attempt = (user.id, block_info['id'])
+            if await self.is_submitted():
+                return
+            answers = await get_answer_buffer().attach(*self.attempt)
+            self.attached = True
+            await self.send(text_data=json.dumps({'type': 'answers', 'answers': answers}))
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        if getattr(self, 'timer_group_name', None):
+            await self.channel_layer.group_discard(self.timer_group_name, self.channel_name)
+            leave_ticker(self.block_id)
+            self.timer_group_name = None
+        if getattr(self, 'attached', False):
+            await get_answer_buffer().detach(*self.attempt)
+            self.attached = False
+        self.attempt = None
 
     async def receive(self, text_data):
         data = json.loads(text_data)
         message_type = data.get('type')
 
-        if message_type == 'timer_update':
-            # Broadcast timer to all users in this test
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'timer_message',
-                    'elapsed': data.get('elapsed')
-                }
-            )
+        if message_type == 'sync':
+            await self.send_timer()
+        elif message_type == 'answer':
+            await self.save_answer(data)
+
+    async def save_answer(self, data):
+        question_id = str(data.get('question_id'))
+        letter = data.get('answer') or ''
+        if self.attempt is None:
+            error = "Javoblarni saqlash uchun tizimga kiring"
+        elif question_id not in self.answer_key.positions or (
+            letter and not (isinstance(letter, str) and letter in VALID_ANSWERS)
+        ):
+            error = "Noto'g'ri javob"
+        else:
+            error = await self.check_can_answer()
+        if error:
+            await self.send(text_data=json.dumps({'type': 'error', 'question_id': question_id, 'message': error}))
+            return
+        get_answer_buffer().record(*self.attempt, question_id, letter)
 
-    async def timer_message(self, event):
+    async def check_can_answer(self):
+        """take_test/submit_test dagi shartlar: blok ochiq, muddati o'tmagan, hali topshirilmagan"""
+        info = await get_block_info(self.block_id)
+        now = timezone.now()
+        if info is None or not info['is_active'] or now < info['start_time']:
+            return "Bu test hozir mavjud emas"
+        if info['end_time'] is None or info['end_time'] < now:
+            return "Test vaqti tugagan"
+        if await self.is_submitted():
+            return "Siz bu testni allaqachon topshirgansiz"
+        return None
+
+    async def is_submitted(self):
+        """Natija bormi; topilmagani BLOCK_INFO_CACHE_TIMEOUT soniya eslab qolinadi
+        (har bir javob uchun so'rov bo'lmasligi uchun)"""
+        if self.submitted_checked_until is None:
+            return True
+        if time.monotonic() < self.submitted_checked_until:
+            return False
+        submitted = await database_sync_to_async(
+            TestResult.objects.filter(user_id=self.attempt[0], test_block_id=self.attempt[1]).exists
+        )()
+        self.submitted_checked_until = None if submitted else time.monotonic() + get_block_info_timeout()
+        return submitted
+
+    async def send_timer(self):
+        state = await get_timer_state(self.block_id)
+        if state is not None:
+            await self.send(text_data=json.dumps({'type': 'timer', **state}))
+
+    async def timer_tick(self, event):
         await self.send(text_data=json.dumps({
             'type': 'timer',
-            'elapsed': event['elapsed']
+            'remaining': event['remaining'],
+            'end_time': event['end_time'],
         }))
 
     @database_sync_to_async
-    def get_block_info(self):
-        try:
-            block = TestBlock.objects.get(id=self.block_id)
-            return {
-                'savol_vaqti': block.savol_vaqti,
-                'vaqt_turi': block.vaqt_turi,
-                'boshlash_vaqti': block.boshlash_vaqti.isoformat() if block.boshlash_vaqti else None,
-                'tugash_vaqti': block.tugash_vaqti.isoformat() if block.tugash_vaqti else None,
-            }
-        except TestBlock.DoesNotExist:
-            return {}
+    def get_answer_key(self, block_info):
+        # Kalit blok versiyasi bo'yicha jarayonda keshlangan - odatda so'rovsiz
+        return compile_answer_key(TestBlock(pk=block_info['id'], version=block_info['version']))
+
+
+class ProctorConsumer(AsyncWebsocketConsumer):
+    """Faqat staff uchun: blok bo'yicha jonli holat (proctor.py)"""
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_staff:
+            await self.close(code=4403)
+            return
+        self.block_id = self.scope['url_route']['kwargs']['block_id']
+        self.group_name = get_proctor_group(self.block_id)
+        self.snapshots = {}  # jarayon -> (qabul qilingan vaqt, {javoblar soni: talabalar})
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        self.push_task = asyncio.get_running_loop().create_task(self.push_progress())
+
+    async def disconnect(self, close_code):
+        if getattr(self, 'push_task', None):
+            self.push_task.cancel()
+            self.push_task = None
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def progress_snapshot(self, event):
+        self.snapshots[event['process']] = (time.monotonic(), event['answered'])
+
+    async def push_progress(self):
+        # Talabalar qancha bo'lmasin, mijozga belgilangan tezlikda bitta xabar
+        while True:
+            answered = merge_snapshots(self.snapshots, max_age=3 * get_timer_interval())
+            message = build_progress(
+                await get_block_info(self.block_id),
+                answered,
+                await count_submitted(self.block_id),
+                await get_timer_state(self.block_id),
+            )
+            await self.send(text_data=json.dumps(message))
+            await asyncio.sleep(get_push_interval())
+
@@ -0,0 +1,71 @@
+"""Admin hisobotlari o'qishlarini replikaga yo'naltirish.
+
+Natijalar ro'yxati, kurslar statistikasi va eksportlar og'ir o'qishlar;
+imtihon paytida ular asosiy bazadagi topshiriqlar yozilishiga xalaqit
+bermasligi uchun ``REPORTING_DATABASE`` (odatda ``replica``) ga yuboriladi.
+
+Qaysi o'qish hisobot ekanini model emas, view belgilaydi: ``reporting_view``
+dekoratori view (va uning oqimli javobi) bajarilayotganda kontekst
+o'zgaruvchisini yoqadi, router esa shunga qarab o'qish bazasini tanlaydi.
+Yozishlar har doim asosiy bazaga.
+"""
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_reporting = ContextVar('reporting', default=False)
+
+
+def get_reporting_database():
+    alias = getattr(settings, 'REPORTING_DATABASE', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def _iterate_reporting(content):
+    # Oqimli javob view qaytgandan keyin o'qiladi; har bir bo'lak alohida
+    # kontekstda (ASGI da boshqa oqimda) olinishi mumkin, shuning uchun
+    # belgi har bir next() atrofida qo'yiladi
+    iterator = iter(content)
+    while True:
+        token = _reporting.set(True)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _reporting.reset(token)
+        yield chunk
+
+
+def reporting_view(view):
+    """View ichidagi o'qishlar hisobot bazasiga"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _reporting.set(True)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _reporting.reset(token)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = _iterate_reporting(response.streaming_content)
+        return response
+    return wrapper
+
+
+class ReportingReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _reporting.get():
+            return get_reporting_database()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika asosiy bazaning nusxasi - obyektlar bir xil
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,81 @@
+"""Imtihon varag'i keshi.
+
+Blok ochilganda kursdagi barcha talabalar bir vaqtda ``take_test`` ga
+kiradi. Savollar (to'g'ri javobsiz) va ularning HTML ko'rinishi har bir
+blok versiyasi uchun bir marta tayyorlanib, umumiy keshda saqlanadi.
+Blok yoki uning savollari tahrirlanganda versiya oshadi va eski kalit
+o'z-o'zidan ishlatilmay qoladi.
+
+Kesh bo'sh bo'lganda faqat bitta worker varaqni qayta quradi: jarayon
+ichida qulf (lock), jarayonlar orasida esa ``cache.add`` bilan olinadigan
+kalit ishlatiladi. Qolganlar tayyor varaqni kutadi.
+"""
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+PAPER_FIELDS = ('id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'order')
+
+_local_locks = [threading.Lock() for _ in range(64)]
+
+
+def get_paper_cache():
+    return caches[getattr(settings, 'EXAM_PAPER_CACHE', 'default')]
+
+
+def get_paper_key(block):
+    # created_at baza qayta yaratilganda bir xil id li bloklarni ajratadi
+    return f'exam_paper:{block.pk}:{block.version}:{int(block.created_at.timestamp())}'
+
+
+def build_exam_paper(block):
+    """Varaqni bazadan qurish (to'g'ri javoblarsiz)"""
+    questions = list(block.questions.values(*PAPER_FIELDS))
+    return {
+        'block_id': block.pk,
+        'version': block.version,
+        'questions': questions,
+        'html': render_to_string('take_test_questions.html', {'questions': questions}),
+    }
+
+
+def _local_lock(key):
+    return _local_locks[zlib.crc32(key.encode()) % len(_local_locks)]
+
+
+def get_exam_paper(block):
+    """Blokning joriy versiyasi uchun varaq (keshdan yoki qurib)"""
+    cache = get_paper_cache()
+    key = get_paper_key(block)
+    paper = cache.get(key)
+    if paper is not None:
+        return paper
+
+    timeout = getattr(settings, 'EXAM_PAPER_TIMEOUT', 6 * 60 * 60)
+    lock_timeout = getattr(settings, 'EXAM_PAPER_LOCK_TIMEOUT', 10)
+    with _local_lock(key):
+        paper = cache.get(key)
+        if paper is not None:
+            return paper
+
+        lock_key = f'{key}:lock'
+        if cache.add(lock_key, 1, lock_timeout):
+            try:
+                paper = build_exam_paper(block)
+                cache.set(key, paper, timeout)
+            finally:
+                cache.delete(lock_key)
+            return paper
+
+        # Boshqa worker qurmoqda - tayyor bo'lishini kutamiz
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            paper = cache.get(key)
+            if paper is not None:
+                return paper
+    return build_exam_paper(block)
@@ -0,0 +1,82 @@
+"""Imtihon chiptalari: parolsiz, bir martalik kirish.
+
+Imtihon boshlanishida yuzlab talaba bir vaqtda ``login_view`` ga murojaat
+qiladi va har bir ``authenticate()`` to'liq PBKDF2 tekshiruvini bajaradi.
+Chipta esa ``foydalanuvchi-blok-nonce-imzo`` ko'rinishidagi qator bo'lib,
+imzo ``SECRET_KEY`` dan olingan HMAC-SHA256 ning qisqartirilgan qismi.
+Tekshirish bitta HMAC hisoblash (mikrosekundlar), bir martalikni esa
+``used_at IS NULL`` shartli bitta UPDATE ta'minlaydi. Soxta chiptalar
+bazaga yetib bormaydi.
+"""
+import base64
+import secrets
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import CustomUser, ExamTicket
+
+SALT = 'my_app.exam_tickets'
+SIGNATURE_BYTES = 10  # 80 bit - chop etish uchun qisqa, taxmin qilish uchun yetarli
+NONCE_ALPHABET = 'abcdefghjkmnpqrstuvwxyz23456789'
+NONCE_LENGTH = 10
+
+IssuedTicket = namedtuple('IssuedTicket', ['user', 'token'])
+
+
+def _signature(payload):
+    digest = salted_hmac(SALT, payload, algorithm='sha256').digest()[:SIGNATURE_BYTES]
+    return base64.b32encode(digest).decode().rstrip('=').lower()
+
+
+def make_ticket(user_id, block_id, nonce):
+    payload = f'{user_id}-{block_id}-{nonce}'
+    return f'{payload}-{_signature(payload)}'
+
+
+def verify_ticket(token):
+    """Imzoni tekshirish (bazasiz): (user_id, block_id, nonce) yoki None"""
+    parts = (token or '').strip().lower().split('-')
+    if len(parts) != 4 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    payload = '-'.join(parts[:3])
+    if not constant_time_compare(parts[3], _signature(payload)):
+        return None
+    return int(parts[0]), int(parts[1]), parts[2]
+
+
+@transaction.atomic
+def issue_tickets(block):
+    """Blok kursidagi barcha talabalarga yangi chiptalar (eskilari bekor qilinadi)"""
+    students = list(
+        CustomUser.objects.filter(group__course_id=block.course_id, is_staff=False, is_active=True)
+        .select_related('group').order_by('group__name', 'last_name', 'first_name')
+    )
+    ExamTicket.objects.filter(test_block=block).delete()
+    tickets = ExamTicket.objects.bulk_create([
+        ExamTicket(
+            user=student, test_block=block,
+            nonce=''.join(secrets.choice(NONCE_ALPHABET) for _ in range(NONCE_LENGTH)),
+        )
+        for student in students
+    ])
+    return [IssuedTicket(ticket.user, make_ticket(ticket.user_id, block.id, ticket.nonce)) for ticket in tickets]
+
+
+def redeem_ticket(token):
+    """Chiptani ishlatish: (foydalanuvchi, block_id) yoki None"""
+    parsed = verify_ticket(token)
+    if parsed is None:
+        return None
+    user_id, block_id, nonce = parsed
+    used = ExamTicket.objects.filter(
+        nonce=nonce, user_id=user_id, test_block_id=block_id, used_at__isnull=True
+    ).update(used_at=timezone.now())
+    if not used:
+        return None
+    user = CustomUser.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return None
+    return user, block_id
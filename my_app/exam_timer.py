@@ -0,0 +1,117 @@
+"""Imtihon taymeri: har bir faol blok xonasi uchun bitta server ticker.
+
+Avval har bir mijoz ``timer_update`` yuborar va u butun ``test_<id>``
+guruhiga tarqatilar edi - N talabada O(N^2) xabar, ustiga istalgan mijoz
+hammaning soatini o'zgartira olardi. Endi qolgan vaqt faqat serverda
+``TestBlock.end_time`` dan (block_info keshi orqali) hisoblanadi va har
+``EXAM_TIMER_INTERVAL`` soniyada bir marta yuboriladi (O(N)).
+
+Ticker xonaga birinchi mijoz ulanganda ishga tushadi va oxirgisi chiqqanda
+to'xtaydi. Hisob jarayon ichida yuritiladi, shuning uchun ticker faqat shu
+jarayondagi ulanishlar guruhiga (``test_<id>.timer.<jarayon>``) yozadi -
+bir nechta worker bo'lsa har biri o'z mijozlariga alohida yuboradi.
+Shu tickda proktorlarga jarayondagi talabalar holati ham yuboriladi.
+"""
+import asyncio
+import logging
+import uuid
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.utils import timezone
+
+from .answer_buffer import get_answer_buffer
+from .block_info import get_block_info
+from .proctor import get_proctor_group
+
+logger = logging.getLogger(__name__)
+
+PROCESS_ID = uuid.uuid4().hex[:12]
+
+
+def get_timer_group(block_id):
+    return f'test_{block_id}.timer.{PROCESS_ID}'
+
+
+def get_timer_interval():
+    return getattr(settings, 'EXAM_TIMER_INTERVAL', 1)
+
+
+async def get_timer_state(block_id):
+    """Qolgan vaqt (soniya) va tugash vaqti; blok topilmasa None"""
+    info = await get_block_info(block_id)
+    if info is None or info['end_time'] is None:
+        return None
+    remaining = max(0, round((info['end_time'] - timezone.now()).total_seconds(), 1))
+    return {'remaining': remaining, 'end_time': info['end_time'].isoformat()}
+
+
+class BlockTicker:
+    """Bitta blok xonasi uchun qolgan vaqtni davriy yuboruvchi vazifa"""
+
+    def __init__(self, block_id):
+        self.block_id = block_id
+        self.group_name = get_timer_group(block_id)
+        self.clients = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def run(self):
+        channel_layer = get_channel_layer()
+        interval = get_timer_interval()
+        while True:
+            # Ulangan mijoz joriy vaqtni connect da oladi, shuning uchun avval kutiladi
+            await asyncio.sleep(interval)
+            try:
+                state = await get_timer_state(self.block_id)
+                if state is not None:
+                    await channel_layer.group_send(self.group_name, {'type': 'timer.tick', **state})
+                    await self.send_progress(channel_layer)
+            except Exception:
+                logger.exception("Taymer xabarini yuborishda xatolik (blok %s)", self.block_id)
+
+
+    async def send_progress(self, channel_layer):
+        """Shu jarayondagi talabalar gistogrammasi proktorlarga (proctor.py)"""
+        answered = get_answer_buffer().progress(int(self.block_id))
+        await channel_layer.group_send(get_proctor_group(self.block_id), {
+            'type': 'progress.snapshot',
+            'process': PROCESS_ID,
+            'answered': {str(count): students for count, students in answered.items()},
+        })
+
+
+_tickers = {}
+
+
+def join_ticker(block_id):
+    """Mijoz xonaga qo'shildi; birinchi mijozda ticker ishga tushadi"""
+    ticker = _tickers.get(block_id)
+    if ticker is None:
+        ticker = _tickers[block_id] = BlockTicker(block_id)
+        ticker.start()
+    ticker.clients += 1
+    return ticker.group_name
+
+
+def leave_ticker(block_id):
+    """Mijoz chiqdi; oxirgi mijozda ticker to'xtaydi"""
+    ticker = _tickers.get(block_id)
+    if ticker is None:
+        return
+    ticker.clients -= 1
+    if ticker.clients <= 0:
+        ticker.stop()
+        del _tickers[block_id]
+
+
+def active_tickers():
+    """{block_id: mijozlar soni} - faol tickerlar"""
+    return {block_id: ticker.clients for block_id, ticker in _tickers.items()}
@@ -0,0 +1,178 @@
+"""Natijalar va javoblarni CSV/XLSX ko'rinishida oqim (streaming) bilan eksport qilish.
+
+Qatorlar bazadan ``.iterator(chunk_size=...)`` bilan o'qiladi va darhol
+javobga yoziladi, shuning uchun xotira sarfi eksport hajmiga bog'liq emas.
+Javoblar matritsasi har bir natijaning javoblar vektoridan (answer_vector.py)
+quriladi - ``UserAnswer`` jadvali o'qilmaydi; arxivlangan bloklarda vektorlar
+arxivdan (answer_archive.py) olinadi.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .answer_archive import load_archived_vectors
+from .answer_vector import BLANK, decode_answers
+from .models import TestResult
+from .reports import filter_results
+
+CHUNK_SIZE = 2000
+
+RESULT_COLUMNS = [
+    ('user__username', 'Username'),
+    ('user__first_name', 'Ism'),
+    ('user__last_name', 'Familiya'),
+    ('user__group__name', 'Guruh'),
+    ('test_block__course__name', 'Kurs'),
+    ('test_block__title', 'Test'),
+    ('correct_answers', "To'g'ri javoblar"),
+    ('total_questions', 'Jami savollar'),
+    ('score', 'Ball'),
+    ('time_spent', 'Sarflangan vaqt (soniya)'),
+    ('completed_at', 'Topshirilgan vaqt'),
+]
+
+
+def _format(value):
+    if hasattr(value, 'tzinfo'):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def result_rows(filters):
+    """Natijalar: sarlavha va qatorlar"""
+    yield [title for _, title in RESULT_COLUMNS]
+    results = filter_results(TestResult.objects.all(), filters).order_by('-completed_at', '-id')
+    for row in results.values_list(*[field for field, _ in RESULT_COLUMNS]).iterator(chunk_size=CHUNK_SIZE):
+        yield [_format(value) for value in row]
+
+
+def answer_matrix_rows(block, filters):
+    """Bitta blok uchun talaba x savol javoblar matritsasi"""
+    question_ids = list(block.questions.values_list('id', flat=True))
+    positions = {question_id: index for index, question_id in enumerate(question_ids)}
+    yield ['Username', 'Ism', 'Familiya', 'Guruh', "To'g'ri javoblar", 'Ball'] + [
+        f'Savol {index}' for index in range(1, len(question_ids) + 1)
+    ]
+
+    results = filter_results(TestResult.objects.filter(test_block=block), filters).order_by('user_id').values_list(
+        'user_id', 'user__username', 'user__first_name', 'user__last_name', 'user__group__name', 'correct_answers',
+        'score', 'answer_vector',
+    )
+    archived = None
+    for user_id, *details, answer_vector in results.iterator(chunk_size=CHUNK_SIZE):
+        if answer_vector is None:
+            if archived is None:
+                archived = load_archived_vectors(block.pk)
+            answer_vector = archived.get(user_id)
+        letters = [''] * len(question_ids)
+        if answer_vector is not None:
+            vector = decode_answers(answer_vector)
+            for question_id, letter in zip(vector.question_ids, vector.selected):
+                if letter != BLANK and question_id in positions:
+                    letters[positions[question_id]] = chr(letter)
+        yield details + letters
+
+
+class _Echo:
+    """csv.writer uchun: yozilgan qatorni qaytaradigan 'fayl'"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # Excel UTF-8 ni to'g'ri ochishi uchun BOM
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ZipStream:
+    """ZipFile yozgan baytlarni yig'ib, oqimga berib turadigan 'fayl'"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_ILLEGAL_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Natijalar" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None:
+        value = '' if value is None else str(value)
+    if isinstance(value, (int, float)):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_RE.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def stream_xlsx(rows, flush_every=500):
+    """Minimal XLSX (bitta varaq) - openpyxl siz, oqim bilan"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for index, row in enumerate(rows, start=1):
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode())
+                if index % flush_every == 0:
+                    yield stream.drain()
+            sheet.write(b'</sheetData></worksheet>')
+        yield stream.drain()
+    yield stream.drain()
@@ -0,0 +1,240 @@
+"""Test javoblarini baholash va saqlash.
+
+Har bir blokning javoblar kaliti ixcham ko'rinishga kompilyatsiya qilinadi:
+savollar id lari tartibi (``array``) va to'g'ri javob harflari (``bytes``).
+Kalit blok versiyasi bo'yicha jarayon xotirasida saqlanadi, shuning uchun
+baholash bazaga murojaat qilmaydi.
+
+``grade_many`` bir nechta topshiriqni birdaniga NumPy bilan baholaydi;
+``submit_test``, qayta baholash va qog'ozdagi javob varaqlarini import qilish
+shu baholagichdan foydalanadi. Javoblar natijaning o'ziga ixcham vektor
+bo'lib yoziladi (answer_vector.py); har bir javob uchun ``UserAnswer``
+qatori faqat ``STORE_USER_ANSWER_ROWS`` yoqilganda, o'sha tranzaksiyada.
+
+Topshirish idempotent: natija brauzer yuborgan kalit bilan saqlanadi va
+``(user, test_block)`` cheklovi ikkinchi yozuvni bazada to'xtatadi. Xuddi
+shu kalit bilan qayta yuborilgan so'rov qayta baholanmaydi - ``get_submission``
+asl natijani qaytaradi.
+"""
+import threading
+from array import array
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .answer_archive import restore_block
+from .answer_vector import decode_answers, encode_answers, encode_layout
+from .item_analysis import invalidate_item_analysis
+from .leaderboard import invalidate_leaderboards, record_results_on_commit
+from .models import AnswerDraft, TestResult, UserAnswer
+
+VALID_ANSWERS = frozenset('ABCD')
+BLANK = ord('-')
+
+Grade = namedtuple('Grade', ['correct_count', 'selected', 'correct_mask'])
+
+_answer_keys = {}
+_answer_keys_lock = threading.Lock()
+
+
+class AnswerKey:
+    """Kompilyatsiya qilingan javoblar kaliti"""
+    __slots__ = ('block_id', 'version', 'question_ids', 'letters', 'positions', 'layout')
+
+    def __init__(self, block_id, version, question_ids, letters):
+        self.block_id = block_id
+        self.version = version
+        self.question_ids = array('q', question_ids)
+        self.letters = bytes(letters)
+        self.positions = {str(question_id): index for index, question_id in enumerate(self.question_ids)}
+        self.layout = encode_layout(self.question_ids)
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def encode(self, answers):
+        """{question_id: harf} ni kalit tartibidagi baytlarga aylantirish ('-' - javobsiz)"""
+        selected = bytearray(b'-' * len(self))
+        for question_id, letter in answers.items():
+            index = self.positions.get(str(question_id))
+            # Mijoz yuborgan qiymat ro'yxat yoki lug'at bo'lishi ham mumkin (xeshlanmaydi)
+            if index is not None and isinstance(letter, str) and letter in VALID_ANSWERS:
+                selected[index] = ord(letter)
+        return bytes(selected)
+
+
+def normalize_answers(answers):
+    """Mijozdan kelgan javoblardan faqat {question_id (str): harf} - navbatga ham shu shaklda yoziladi"""
+    return {
+        str(question_id): letter
+        for question_id, letter in answers.items()
+        if isinstance(letter, str) and letter in VALID_ANSWERS
+    }
+
+
+def compile_answer_key(block, refresh=False):
+    """Blokning joriy versiyasi uchun kompilyatsiya qilingan kalit"""
+    cached = _answer_keys.get(block.pk)
+    if not refresh and cached is not None and cached.version == block.version:
+        return cached
+    rows = list(block.questions.values_list('id', 'correct_answer'))
+    answer_key = AnswerKey(
+        block.pk,
+        block.version,
+        [question_id for question_id, _ in rows],
+        b''.join(correct_answer.encode() for _, correct_answer in rows),
+    )
+    with _answer_keys_lock:
+        _answer_keys[block.pk] = answer_key
+    return answer_key
+
+
+def clear_answer_keys():
+    with _answer_keys_lock:
+        _answer_keys.clear()
+
+
+def grade_many(block, submissions):
+    """Ko'p topshiriqni birdaniga baholash.
+
+    ``submissions`` - javoblar lug'atlari ({question_id: harf}) yoki kalit
+    tartibida kodlangan baytlar ro'yxati. Har biri uchun ``Grade`` qaytaradi.
+    """
+    answer_key = compile_answer_key(block)
+    encoded = [
+        submission if isinstance(submission, bytes) else answer_key.encode(submission)
+        for submission in submissions
+    ]
+    if not encoded:
+        return []
+    if not len(answer_key):
+        return [Grade(0, selected, np.zeros(0, dtype=bool)) for selected in encoded]
+
+    matrix = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(len(encoded), len(answer_key))
+    key = np.frombuffer(answer_key.letters, dtype=np.uint8)
+    correct = matrix == key
+    counts = correct.sum(axis=1)
+    return [Grade(int(count), selected, mask) for count, selected, mask in zip(counts, encoded, correct)]
+
+
+def calculate_score(correct_count, total_questions):
+    return round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
+
+
+def store_user_answer_rows():
+    return getattr(settings, 'STORE_USER_ANSWER_ROWS', True)
+
+
+def build_answer_vector(answer_key, grade):
+    return encode_answers(answer_key.layout, grade.selected, grade.correct_mask)
+
+
+def build_user_answers(answer_key, user, grade):
+    """Baholangan topshiriqdan UserAnswer obyektlari (saqlanmagan)"""
+    return [
+        UserAnswer(
+            user=user,
+            question_id=answer_key.question_ids[index],
+            selected_answer=chr(letter),
+            is_correct=bool(grade.correct_mask[index]),
+        )
+        for index, letter in enumerate(grade.selected)
+        if letter != BLANK
+    ]
+
+
+@transaction.atomic
+def save_submissions(block, entries, submission_keys=None):
+    """[(user, javoblar, sarflangan vaqt), ...] ni baholab birga saqlash.
+
+    ``submission_keys`` - har bir topshiriqning Idempotency-Key si (ixtiyoriy).
+    Natija allaqachon bo'lsa ``IntegrityError`` - hech narsa yozilmaydi.
+    """
+    answer_key = compile_answer_key(block)
+    grades = grade_many(block, [answers for _, answers, _ in entries])
+    total_questions = len(answer_key)
+    submission_keys = submission_keys or [''] * len(entries)
+
+    store_rows = store_user_answer_rows()
+    user_answers = []
+    results = []
+    for (user, _, time_spent), grade, submission_key in zip(entries, grades, submission_keys):
+        if store_rows:
+            user_answers.extend(build_user_answers(answer_key, user, grade))
+        results.append(TestResult(
+            user=user,
+            test_block=block,
+            score=calculate_score(grade.correct_count, total_questions),
+            total_questions=total_questions,
+            correct_answers=grade.correct_count,
+            time_spent=time_spent,
+            submission_key=submission_key,
+            answer_vector=build_answer_vector(answer_key, grade),
+        ))
+    # Natijalar birinchi: takroriy topshiriq UserAnswer larga yetmasdan cheklovda to'xtaydi
+    results = TestResult.objects.bulk_create(results, batch_size=1000)
+    UserAnswer.objects.bulk_create(user_answers, batch_size=1000)
+    # Topshirilgan urinishlarning avtomatik saqlangan qoralamalari endi kerak emas
+    AnswerDraft.objects.filter(test_block=block, user_id__in=[user.pk for user, _, _ in entries]).delete()
+    record_results_on_commit(block, results)
+    return results
+
+
+def save_submission(user, block, answers, time_spent=0, submission_key=''):
+    """Bitta topshiriqni baholab, UserAnswer va TestResult ni birga saqlash"""
+    return save_submissions(block, [(user, answers, time_spent)], [submission_key])[0]
+
+
+def get_submission(user_id, block_id):
+    """Saqlangan natija (lug'at) yoki None - bitta so'rov, unique indeks bo'yicha"""
+    return TestResult.objects.filter(user_id=user_id, test_block_id=block_id).values(
+        'id', 'score', 'correct_answers', 'total_questions', 'submission_key'
+    ).first()
+
+
+@transaction.atomic
+def regrade_block(block, batch_size=1000):
+    """Blokdagi barcha natijalarni joriy kalit bo'yicha qayta baholash"""
+    answer_key = compile_answer_key(block, refresh=True)
+    # Arxivlangan blok vektorlari natijalarga qaytadi; keyingi arxivlash ularni yana yig'adi
+    restore_block(block)
+
+    # Saqlangan UserAnswer qatorlari (bo'lsa) - vektori yo'q eski natijalar javoblari ham shunda
+    user_answers = list(
+        UserAnswer.objects.filter(question__test_block=block).only('id', 'user_id', 'question_id', 'selected_answer', 'is_correct')
+    )
+    by_user = {}
+    for answer in user_answers:
+        by_user.setdefault(answer.user_id, {})[str(answer.question_id)] = answer.selected_answer
+    user_ids = list(by_user)
+    row_grades = dict(zip(user_ids, grade_many(block, [by_user[user_id] for user_id in user_ids])))
+
+    changed_answers = []
+    for answer in user_answers:
+        index = answer_key.positions.get(str(answer.question_id))
+        is_correct = index is not None and bool(row_grades[answer.user_id].correct_mask[index])
+        if answer.is_correct != is_correct:
+            answer.is_correct = is_correct
+            changed_answers.append(answer)
+    UserAnswer.objects.bulk_update(changed_answers, ['is_correct'], batch_size=batch_size)
+
+    total_questions = len(answer_key)
+    results = list(TestResult.objects.filter(test_block=block))
+    vector_results = [result for result in results if result.answer_vector is not None]
+    vector_grades = grade_many(block, [decode_answers(result.answer_vector).answers() for result in vector_results])
+    grades = {result.pk: grade for result, grade in zip(vector_results, vector_grades)}
+    for result in results:
+        grade = grades.get(result.pk) or row_grades.get(result.user_id)
+        result.correct_answers = grade.correct_count if grade else 0
+        result.total_questions = total_questions
+        result.score = calculate_score(result.correct_answers, total_questions)
+        if result.pk in grades:
+            result.answer_vector = build_answer_vector(answer_key, grade)
+    TestResult.objects.bulk_update(
+        results, ['correct_answers', 'total_questions', 'score', 'answer_vector'], batch_size=batch_size
+    )
+    invalidate_item_analysis(block)
+    transaction.on_commit(lambda: invalidate_leaderboards(block))
+    return len(results)
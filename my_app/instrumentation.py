@@ -0,0 +1,98 @@
+"""So'rovlar soni va vaqtini o'lchash, view lar uchun so'rov byudjeti.
+
+``QueryRecorder`` ``connection.execute_wrapper`` orqali ishlaydi, shuning
+uchun ``DEBUG`` o'chiq bo'lsa ham so'rovlarni sanaydi. Bir xil shakldagi
+so'rovlar (faqat parametrlari farq qiladigan) takrorlansa, bu odatda N+1
+muammosidan dalolat beradi.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.urls import resolve
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?),?)+\s*\)', re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+# Tranzaksiya boshqaruvi so'rovlari byudjetga kirmaydi
+_TRANSACTION_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT', 'BEGIN', 'COMMIT')
+
+
+def normalize_sql(sql):
+    """So'rovdan parametrlarni olib tashlab, uning shaklini qaytarish"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """Bajarilgan so'rovlar soni, umumiy vaqti va shakllari"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.patterns = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.total_time += time.perf_counter() - started
+            if not sql.lstrip().upper().startswith(_TRANSACTION_PREFIXES):
+                self.count += 1
+                self.patterns[normalize_sql(sql)] += 1
+
+    def duplicates(self, threshold=2):
+        """Kamida ``threshold`` marta takrorlangan so'rov shakllari"""
+        return {pattern: count for pattern, count in self.patterns.items() if count >= threshold}
+
+    def top_duplicates(self, limit=5, threshold=2):
+        """Eng ko'p takrorlangan ``limit`` ta shakl: [(shakl, soni), ...]"""
+        return [(pattern, count) for pattern, count in self.patterns.most_common(limit) if count >= threshold]
+
+    def record(self, using=None):
+        """``with recorder.record(): ...`` - blok ichidagi so'rovlarni yozib olish.
+
+        ``using`` berilmasa barcha bazalardagi (masalan, hisobot replikasi) so'rovlar sanaladi.
+        """
+        from django.db import connections
+
+        stack = ExitStack()
+        for alias in ([using] if using else connections):
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+
+def query_budget(max_queries):
+    """View uchun ruxsat etilgan so'rovlar sonini belgilash (``@login_required`` dan pastda)"""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func):
+    return getattr(view_func, 'query_budget', None)
+
+
+class QueryBudgetMixin:
+    """Testlar uchun: view o'z so'rov byudjetidan oshmasligini tekshirish"""
+
+    def assertWithinQueryBudget(self, url, method='get', **kwargs):
+        budget = get_query_budget(resolve(url.split('?')[0]).func)
+        if budget is None:
+            self.fail(f"{url} uchun so'rov byudjeti belgilanmagan (@query_budget)")
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = getattr(self.client, method)(url, **kwargs)
+        if recorder.count > budget:
+            details = '\n'.join(f'  {count}x {pattern[:150]}' for pattern, count in recorder.duplicates().items())
+            self.fail(
+                f"{url}: {recorder.count} ta so'rov, byudjet {budget}."
+                + (f"\nTakrorlangan so'rovlar:\n{details}" if details else '')
+            )
+        return response
@@ -0,0 +1,161 @@
+"""Savollar bo'yicha item tahlili (materiallashtirilgan).
+
+Har bir savol uchun qiyinlik (p - to'g'ri javob berganlar ulushi), ajrata
+olish (point-biserial: savolga to'g'ri javob va umumiy ball orasidagi
+korrelyatsiya) va A/B/C/D variantlari chastotasi hisoblanadi.
+
+Metrikalarning o'zi emas, ularni hisoblash uchun yetarli yig'indilar
+saqlanadi: blok bo'yicha natijalar soni, ballar va ballar kvadratlari
+yig'indisi; savol bo'yicha esa har bir variantni tanlaganlar soni va
+ularning ballari yig'indisi. Shu sababli yangilash faqat ``last_result_id``
+dan keyingi natijalarning javoblar vektorlarini (answer_vector.py) NumPy
+bilan qo'shadi, metrikalar esa butun blok uchun birdan qayta hisoblanadi. To'g'ri javob o'zgarsa ham
+yig'indilar yaroqli qoladi - faqat ballar o'zgarganda (qayta baholash)
+tahlil noldan quriladi.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+from .answer_archive import load_archived_vectors
+from .answer_vector import decode_answers
+from .models import BlockAnalysis, QuestionAnalysis, TestResult
+
+OPTIONS = 'ABCD'
+# Harf bayti -> variant indeksi (A-D dan boshqasi -1)
+OPTION_INDEX = np.full(256, -1, dtype=np.intp)
+OPTION_INDEX[np.frombuffer(OPTIONS.encode(), dtype=np.uint8)] = np.arange(len(OPTIONS))
+COUNT_FIELDS = [f'count_{letter.lower()}' for letter in OPTIONS]
+SCORE_FIELDS = [f'score_sum_{letter.lower()}' for letter in OPTIONS]
+
+
+def compute_item_statistics(counts, score_sums, correct, result_count, score_sum, score_sq_sum):
+    """Yig'indilardan (qiyinlik, ajrata olish) massivlari; hisoblab bo'lmasa NaN
+
+    ``counts`` va ``score_sums`` - (savollar x 4) matritsalar, ``correct`` -
+    har bir savolning to'g'ri varianti indeksi.
+    """
+    count = len(correct)
+    if not result_count or not count:
+        return np.full(count, np.nan), np.full(count, np.nan)
+    rows = np.arange(count)
+    correct_count = counts[rows, correct]
+    correct_score_sum = score_sums[rows, correct]
+
+    mean = score_sum / result_count
+    std = np.sqrt(max(score_sq_sum / result_count - mean * mean, 0.0))
+    difficulty = correct_count / result_count
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correct_mean = correct_score_sum / correct_count
+        other_mean = (score_sum - correct_score_sum) / (result_count - correct_count)
+        discrimination = (correct_mean - other_mean) / std * np.sqrt(difficulty * (1 - difficulty))
+    discrimination[~np.isfinite(discrimination)] = np.nan
+    return difficulty, discrimination
+
+
+def _nullable(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def invalidate_item_analysis(block):
+    """Ballar o'zgarganda - keyingi yangilashda tahlil noldan quriladi"""
+    BlockAnalysis.objects.filter(test_block=block).delete()
+
+
+@transaction.atomic
+def refresh_item_analysis(block, recompute=False):
+    """Yangi natijalarni tahlilga qo'shish; ``BlockAnalysis`` qaytaradi"""
+    analysis, _ = BlockAnalysis.objects.select_for_update().get_or_create(test_block=block)
+    rebuild = analysis.last_result_id == 0
+    new = TestResult.objects.filter(test_block=block, id__gt=analysis.last_result_id).aggregate(
+        count=Count('id'), score_sum=Sum('score'), score_sq_sum=Sum(F('score') * F('score')), last_id=Max('id')
+    )
+    if not new['count'] and not rebuild and not recompute:
+        return analysis
+
+    questions = list(block.questions.order_by('order', 'id').values_list('id', 'correct_answer'))
+    positions = {question_id: index for index, (question_id, _) in enumerate(questions)}
+    existing = {item.question_id: item for item in QuestionAnalysis.objects.filter(question_id__in=positions)}
+    counts = np.zeros((len(questions), len(OPTIONS)))
+    score_sums = np.zeros((len(questions), len(OPTIONS)))
+    if not rebuild:
+        for question_id, item in existing.items():
+            counts[positions[question_id]] = [getattr(item, field) for field in COUNT_FIELDS]
+            score_sums[positions[question_id]] = [getattr(item, field) for field in SCORE_FIELDS]
+
+    if new['count']:
+        rows = TestResult.objects.filter(
+            test_block=block, id__gt=analysis.last_result_id, id__lte=new['last_id'],
+        ).values_list('user_id', 'score', 'answer_vector')
+        # Vektor tartibi -> joriy savol indekslari (blokdagi natijalar odatda bitta tartibda)
+        layouts = {}
+        archived = None
+        for user_id, score, answer_vector in rows.iterator(chunk_size=2000):
+            if answer_vector is None:
+                # Arxivlangan blok - vektorlar bir marta arxivdan
+                if archived is None:
+                    archived = load_archived_vectors(block.pk)
+                answer_vector = archived.get(user_id)
+                if answer_vector is None:
+                    continue
+            vector = decode_answers(answer_vector)
+            rows_index = layouts.get(vector.question_ids)
+            if rows_index is None:
+                rows_index = layouts[vector.question_ids] = np.array(
+                    [positions.get(question_id, -1) for question_id in vector.question_ids], dtype=np.intp
+                )
+            columns = OPTION_INDEX[np.frombuffer(vector.selected, dtype=np.uint8)]
+            valid = (rows_index >= 0) & (columns >= 0)
+            np.add.at(counts, (rows_index[valid], columns[valid]), 1)
+            np.add.at(score_sums, (rows_index[valid], columns[valid]), score)
+
+        if rebuild:
+            analysis.result_count = analysis.score_sum = analysis.score_sq_sum = 0
+        analysis.result_count += new['count']
+        analysis.score_sum += new['score_sum'] or 0
+        analysis.score_sq_sum += new['score_sq_sum'] or 0
+        analysis.last_result_id = new['last_id']
+        analysis.save()
+
+    correct = np.array([OPTIONS.index(letter) if letter in OPTIONS else 0 for _, letter in questions], dtype=np.intp)
+    difficulty, discrimination = compute_item_statistics(
+        counts, score_sums, correct, analysis.result_count, analysis.score_sum, analysis.score_sq_sum
+    )
+
+    to_create, to_update = [], []
+    for index, (question_id, _) in enumerate(questions):
+        item = existing.get(question_id) or QuestionAnalysis(question_id=question_id)
+        for column, field in enumerate(COUNT_FIELDS):
+            setattr(item, field, int(counts[index, column]))
+        for column, field in enumerate(SCORE_FIELDS):
+            setattr(item, field, float(score_sums[index, column]))
+        item.difficulty = _nullable(difficulty[index])
+        item.discrimination = _nullable(discrimination[index])
+        (to_update if item.pk else to_create).append(item)
+    QuestionAnalysis.objects.bulk_create(to_create)
+    QuestionAnalysis.objects.bulk_update(to_update, COUNT_FIELDS + SCORE_FIELDS + ['difficulty', 'discrimination'])
+    return analysis
+
+
+def get_item_analysis(block):
+    """Sahifa uchun: {savol_id: {'difficulty', 'discrimination', 'options', 'blank'}}"""
+    analysis = refresh_item_analysis(block)
+    total = analysis.result_count
+    items = {}
+    for item in QuestionAnalysis.objects.filter(question__test_block=block).select_related('question'):
+        counts = [getattr(item, field) for field in COUNT_FIELDS]
+        items[item.question_id] = {
+            'difficulty': item.difficulty,
+            'discrimination': item.discrimination,
+            'options': [
+                {
+                    'letter': letter,
+                    'count': count,
+                    'percent': round(count * 100 / total, 1) if total else 0,
+                    'is_correct': letter == item.question.correct_answer,
+                }
+                for letter, count in zip(OPTIONS, counts)
+            ],
+            'blank': max(total - sum(counts), 0),
+        }
+    return {'result_count': total, 'questions': items}
@@ -0,0 +1,301 @@
+"""Reytinglar (leaderboard): test bloki, guruh va kurs bo'yicha.
+
+Har bir reyting tartiblangan to'plam: ball kamayish, teng ballda sarflangan
+vaqt o'sish tartibida. Blok reytingida talabaning shu blokdagi natijasi,
+guruh va kurs reytinglarida esa natijalar yig'indisi turadi. Reytinglar
+``submit_test`` dan keyin (tranzaksiya tasdiqlangach) yangilanadi va
+ORDER BY siz O(log n) da "mening o'rnim" va top-K ni beradi.
+
+Ikki backend bor: jarayon xotirasi (standart) va Redis sorted set (REDIS_URL
+sozlanganda; xotiradagi reyting boshqa workerlar natijalarini ko'rmaydi). Reyting
+hali yuklanmagan bo'lsa (jarayon qayta ishga tushgan, qayta baholash) u
+birinchi murojaatda bazadan quriladi.
+
+Reyting qo'shimcha ma'lumot: backend ishlamasa (Redis o'chgan) xato logga
+yoziladi, sahifalar esa reytingsiz ko'rsatiladi.
+"""
+import bisect
+import logging
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils.module_loading import import_string
+
+from .models import CustomUser, Group, TestResult
+
+logger = logging.getLogger(__name__)
+
+LeaderboardEntry = namedtuple('LeaderboardEntry', ['rank', 'user_id', 'score', 'time_spent'])
+
+BACKENDS = {
+    'memory': 'my_app.leaderboard.MemoryLeaderboard',
+    'redis': 'my_app.leaderboard.RedisLeaderboard',
+}
+
+KINDS = ('block', 'group', 'course')
+
+
+def block_board(block_id):
+    return f'block:{block_id}'
+
+
+def group_board(group_id):
+    return f'group:{group_id}'
+
+
+def course_board(course_id):
+    return f'course:{course_id}'
+
+
+class MemoryLeaderboard:
+    """Reytinglar jarayon xotirasida: tartiblangan ro'yxat + bisect"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boards = {}  # board -> ({user_id: (ball, vaqt)}, tartiblangan kalitlar)
+
+    @staticmethod
+    def _key(user_id, score, time_spent):
+        return (-score, time_spent, user_id)
+
+    def exists(self, board):
+        return board in self._boards
+
+    def replace(self, board, items):
+        totals = {user_id: (score, time_spent) for user_id, score, time_spent in items}
+        keys = sorted(self._key(user_id, *total) for user_id, total in totals.items())
+        with self._lock:
+            self._boards[board] = (totals, keys)
+
+    def increment(self, board, items):
+        with self._lock:
+            totals, keys = self._boards.setdefault(board, ({}, []))
+            for user_id, score, time_spent in items:
+                old = totals.get(user_id)
+                if old is not None:
+                    del keys[bisect.bisect_left(keys, self._key(user_id, *old))]
+                    score, time_spent = score + old[0], time_spent + old[1]
+                totals[user_id] = (score, time_spent)
+                bisect.insort(keys, self._key(user_id, score, time_spent))
+
+    def rank(self, board, user_id):
+        with self._lock:
+            totals, keys = self._boards.get(board, ({}, []))
+            total = totals.get(user_id)
+            if total is None:
+                return None
+            return LeaderboardEntry(bisect.bisect_left(keys, self._key(user_id, *total)) + 1, user_id, *total)
+
+    def top(self, board, k):
+        with self._lock:
+            _, keys = self._boards.get(board, ({}, []))
+            return [
+                LeaderboardEntry(index, user_id, -score, time_spent)
+                for index, (score, time_spent, user_id) in enumerate(keys[:k], start=1)
+            ]
+
+    def size(self, board):
+        return len(self._boards.get(board, ({}, []))[0])
+
+    def delete(self, boards):
+        with self._lock:
+            for board in boards:
+                self._boards.pop(board, None)
+
+
+class RedisLeaderboard:
+    """Reytinglar Redis sorted set larida (bir nechta worker uchun umumiy)"""
+
+    # Ball va vaqt bitta songa: ball * 100 * TIME_SCALE - vaqt (vaqt < TIME_SCALE soniya);
+    # ball kasr bo'lishi mumkin (66.67), shuning uchun yuzdan birlarda saqlanadi
+    TIME_SCALE = 10 ** 7
+
+    def __init__(self, url=None, prefix='exam:leaderboard'):
+        import redis
+
+        self.redis = redis.Redis.from_url(url or getattr(settings, 'LEADERBOARD_REDIS_URL', 'redis://localhost:6379/0'))
+        self.prefix = prefix
+
+    def _key(self, board):
+        return f'{self.prefix}:{board}'
+
+    def _loaded_key(self, board):
+        return f'{self.prefix}:{board}:loaded'
+
+    def _encode(self, score, time_spent):
+        # Vaqt ballga "oqib" o'tmasligi uchun TIME_SCALE dan kichik (mijoz yuboradi)
+        time_spent = min(max(int(time_spent), 0), self.TIME_SCALE - 1)
+        return round(score * 100) * self.TIME_SCALE - time_spent
+
+    def _decode(self, rank, user_id, value):
+        value = int(round(value))
+        hundredths = -(-value // self.TIME_SCALE)
+        score = hundredths // 100 if hundredths % 100 == 0 else hundredths / 100
+        return LeaderboardEntry(rank, int(user_id), score, hundredths * self.TIME_SCALE - value)
+
+    def exists(self, board):
+        return bool(self.redis.exists(self._loaded_key(board)))
+
+    def replace(self, board, items):
+        with self.redis.pipeline() as pipe:
+            pipe.delete(self._key(board))
+            mapping = {user_id: self._encode(score, time_spent) for user_id, score, time_spent in items}
+            if mapping:
+                pipe.zadd(self._key(board), mapping)
+            pipe.set(self._loaded_key(board), 1)
+            pipe.execute()
+
+    def increment(self, board, items):
+        with self.redis.pipeline() as pipe:
+            for user_id, score, time_spent in items:
+                pipe.zincrby(self._key(board), self._encode(score, time_spent), user_id)
+            pipe.execute()
+
+    def rank(self, board, user_id):
+        with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zrevrank(self._key(board), user_id)
+            pipe.zscore(self._key(board), user_id)
+            rank, value = pipe.execute()
+        if rank is None:
+            return None
+        return self._decode(rank + 1, user_id, value)
+
+    def top(self, board, k):
+        items = self.redis.zrevrange(self._key(board), 0, k - 1, withscores=True)
+        return [self._decode(index, user_id, value) for index, (user_id, value) in enumerate(items, start=1)]
+
+    def size(self, board):
+        return self.redis.zcard(self._key(board))
+
+    def delete(self, boards):
+        keys = [key for board in boards for key in (self._key(board), self._loaded_key(board))]
+        if keys:
+            self.redis.delete(*keys)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_leaderboard():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = getattr(settings, 'LEADERBOARD_BACKEND', 'memory')
+                _backend = import_string(BACKENDS.get(backend, backend))()
+    return _backend
+
+
+def clear_leaderboards():
+    """Jarayondagi backend ni tashlab yuborish (testlar uchun)"""
+    global _backend
+    _backend = None
+
+
+def load_board(board):
+    """Reyting qatorlarini bazadan hisoblash: [(user_id, ball, vaqt), ...]"""
+    kind, pk = board.split(':')
+    if kind == 'block':
+        return list(TestResult.objects.filter(test_block_id=pk).values_list('user_id', 'score', 'time_spent'))
+    field = {'group': 'user__group_id', 'course': 'test_block__course_id'}[kind]
+    return list(
+        TestResult.objects.filter(**{field: pk}).order_by().values('user_id')
+        .annotate(total_score=Sum('score'), total_time=Sum('time_spent'))
+        .values_list('user_id', 'total_score', 'total_time')
+    )
+
+
+def ensure_board(board):
+    backend = get_leaderboard()
+    if not backend.exists(board):
+        backend.replace(board, load_board(board))
+    return backend
+
+
+def rebuild_board(board):
+    get_leaderboard().replace(board, load_board(board))
+
+
+def record_results(block, results):
+    """Yangi saqlangan natijalarni blok, guruh va kurs reytinglariga qo'shish"""
+    boards = {block_board(block.id): [], course_board(block.course_id): []}
+    for result in results:
+        item = (result.user_id, result.score, result.time_spent)
+        boards[block_board(block.id)].append(item)
+        boards[course_board(block.course_id)].append(item)
+        if result.user.group_id:
+            boards.setdefault(group_board(result.user.group_id), []).append(item)
+    try:
+        backend = get_leaderboard()
+        for board, items in boards.items():
+            if backend.exists(board):
+                backend.increment(board, items)
+            else:
+                # Yuklanmagan reyting bazadan quriladi - yangi natijalar allaqachon ichida
+                backend.replace(board, load_board(board))
+    except Exception:
+        logger.exception("Reytingni yangilashda xatolik (blok %s)", block.id)
+
+
+def record_results_on_commit(block, results):
+    transaction.on_commit(lambda: record_results(block, results))
+
+
+def delete_boards(boards):
+    """Reytinglarni qayta qurishga belgilash (keyingi murojaatda bazadan yuklanadi)"""
+    try:
+        get_leaderboard().delete(boards)
+    except Exception:
+        logger.exception("Reytinglarni o'chirishda xatolik (%s)", ', '.join(boards))
+
+
+def invalidate_leaderboards(block):
+    """Ballar o'zgarganda blok, kurs va kurs guruhlari reytinglarini qayta qurishga belgilash"""
+    boards = [block_board(block.id), course_board(block.course_id)]
+    boards += [group_board(group_id) for group_id in Group.objects.filter(course_id=block.course_id).values_list('id', flat=True)]
+    delete_boards(boards)
+
+
+def get_rank(board, user_id):
+    return ensure_board(board).rank(board, user_id)
+
+
+def get_top(board, k=10):
+    """Top-K: foydalanuvchi obyektlari bilan birga"""
+    entries = ensure_board(board).top(board, k)
+    users = CustomUser.objects.only('username', 'first_name', 'last_name').in_bulk([entry.user_id for entry in entries])
+    return [
+        {'rank': entry.rank, 'user': users.get(entry.user_id), 'score': entry.score, 'time_spent': entry.time_spent}
+        for entry in entries
+    ]
+
+
+def get_board_entries(board, k=100):
+    """Admin sahifasi uchun (top-K, jami); reyting ishlamasa None"""
+    try:
+        return get_top(board, k), get_leaderboard().size(board)
+    except Exception:
+        logger.exception("Reytingni o'qishda xatolik (%s)", board)
+        return None
+
+
+def get_result_rankings(result, user, k=10):
+    """Natija sahifasi uchun: blok, guruh va kursdagi o'rin hamda blok top-K; reyting ishlamasa None"""
+    boards = [('block', block_board(result.test_block_id)), ('course', course_board(result.test_block.course_id))]
+    if user.group_id:
+        boards.append(('group', group_board(user.group_id)))
+    rankings = {}
+    try:
+        for kind, board in boards:
+            entry = get_rank(board, user.id)
+            if entry is not None:
+                rankings[kind] = {'rank': entry.rank, 'total': get_leaderboard().size(board)}
+        rankings['top'] = get_top(block_board(result.test_block_id), k)
+    except Exception:
+        logger.exception("Reytingni o'qishda xatolik (natija %s)", result.id)
+        return None
+    return rankings
@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from my_app.answer_archive import blocks_to_compact, compact_block, get_archive_chunk_size
+
+
+def database_pages():
+    """SQLite: (jami sahifalar, bo'sh sahifalar, sahifa hajmi); boshqa bazalarda None"""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        values = []
+        for pragma in ('page_count', 'freelist_count', 'page_size'):
+            cursor.execute(f'PRAGMA {pragma}')
+            values.append(cursor.fetchone()[0])
+    return values
+
+
+class Command(BaseCommand):
+    help = (
+        "Muddati o'tgan bloklar javoblarini siqilgan arxivga ko'chirish va UserAnswer qatorlarini o'chirish. "
+        "To'xtab qolsa qayta ishga tushirish kifoya. Rejalashtirish: cron orqali kuniga bir marta "
+        "yoki --every bilan doimiy jarayon sifatida."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Shuncha kundan oldin tugagan bloklar (standart: ANSWER_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Bir tranzaksiyada o'chiriladigan qatorlar")
+        parser.add_argument('--block', type=int, action='append', dest='block_ids', help="Faqat shu bloklar")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat arxivlanadigan bloklarni ko'rsatish")
+        parser.add_argument('--vacuum', action='store_true', help="Oxirida VACUUM - bo'shagan joyni fayldan qaytarish")
+        parser.add_argument('--every', type=float, default=None,
+                            help="Har shuncha soniyada takrorlash (rejalashtirilgan jarayon)")
+
+    def handle(self, *args, **options):
+        while True:
+            self.compact(options)
+            if options['every'] is None:
+                return
+            time.sleep(options['every'])
+
+    def compact(self, options):
+        blocks = self.get_blocks(options)
+        if options['dry_run']:
+            for block in blocks:
+                self.stdout.write(f"{block.id}: {block.title} (tugagan: {block.end_time:%Y-%m-%d})")
+            self.stdout.write(f"Jami: {len(blocks)} ta blok")
+            return
+
+        chunk_size = options['chunk_size'] or get_archive_chunk_size()
+        pages_before = database_pages()
+        totals = {'results': 0, 'vectors_cleared': 0, 'rows_deleted': 0, 'raw_size': 0, 'archive_size': 0}
+        for block in blocks:
+            stats = compact_block(block, chunk_size)
+            for key in totals:
+                totals[key] += stats[key]
+            self.stdout.write(
+                f"{block.id}: {block.title} - {stats['results']} ta natija, {stats['rows_deleted']} ta qator o'chirildi, "
+                f"arxiv {stats['archive_size']} bayt ({stats['raw_size']} bayt siqilmagan)"
+            )
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(blocks)} ta blok arxivlandi: {totals['rows_deleted']} ta UserAnswer qatori o'chirildi, "
+            f"{totals['vectors_cleared']} ta natija vektori arxivga ko'chirildi, "
+            f"arxivlar {totals['archive_size']} bayt"
+        ))
+        self.report_space(pages_before, database_pages())
+
+    def get_blocks(self, options):
+        blocks = blocks_to_compact(days=options['days'])
+        if options['block_ids']:
+            blocks = blocks.filter(pk__in=options['block_ids'])
+        return list(blocks.only('id', 'title', 'end_time'))
+
+    def report_space(self, before, after):
+        if before is None or after is None:
+            return
+        # O'chirilgan qatorlar sahifalari bo'sh ro'yxatga tushadi va baza ularni qayta
+        # ishlatadi; fayl esa faqat VACUUM dan keyin kichrayadi
+        used_before = (before[0] - before[1]) * before[2]
+        used_after = (after[0] - after[1]) * after[2]
+        self.stdout.write(
+            f"Bo'shagan joy: {used_before - used_after} bayt "
+            f"(band: {used_before} -> {used_after}, fayl: {before[0] * before[2]} -> {after[0] * after[2]} bayt)"
+        )
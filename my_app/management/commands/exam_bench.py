@@ -0,0 +1,352 @@
+import json
+import random
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.db import connection, connections
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from my_app.answer_buffer import AnswerBuffer
+from my_app.answer_archive import result_answers
+from my_app.benchmarking import measure, seed_exam, summarize, temporary_database
+from my_app.exam_paper import get_paper_cache, get_paper_key
+from my_app.exam_tickets import issue_tickets
+from my_app.grading import clear_answer_keys, grade_many, save_submission, save_submissions
+from my_app.models import AnswerDraft, QueuedSubmission, TestResult, UserAnswer
+from my_app.submission_queue import get_submission_queue, process_batch
+
+
+def legacy_submit(user, block, answers, time_spent=0):
+    """Avvalgi submit_test: har bir javob uchun alohida INSERT, tranzaksiyasiz"""
+    questions = block.questions.all()
+    correct_count = 0
+    for question in questions:
+        selected = answers.get(str(question.id))
+        if selected:
+            is_correct = selected == question.correct_answer
+            if is_correct:
+                correct_count += 1
+            UserAnswer.objects.create(user=user, question=question, selected_answer=selected, is_correct=is_correct)
+    total_questions = questions.count()
+    score = round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
+    return TestResult.objects.create(
+        user=user, test_block=block, score=score, total_questions=total_questions,
+        correct_answers=correct_count, time_spent=time_spent,
+    )
+
+
+class Command(BaseCommand):
+    help = "Imtihon sahifalari uchun benchmark (vaqtinchalik bazada)"
+
+    scenarios = ['take_test', 'submit', 'grade', 'queue', 'login', 'autosave', 'concurrent', 'answers']
+    # Bir nechta oqim bitta bazaga yozadi - xotiradagi baza emas, fayl kerak
+    on_disk_scenarios = {'concurrent'}
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios)
+        parser.add_argument('--students', type=int, default=50)
+        parser.add_argument('--questions', type=int, nargs='+', default=[50, 200],
+                            help="Blokdagi savollar soni (bir nechta qiymat berish mumkin)")
+        parser.add_argument('--threads', type=int, default=8, help="concurrent: bir vaqtda yuboruvchi oqimlar")
+
+    def handle(self, *args, **options):
+        self.threads = options['threads']
+        with temporary_database(on_disk=options['scenario'] in self.on_disk_scenarios):
+            for questions in options['questions']:
+                getattr(self, f"bench_{options['scenario']}")(options['students'], questions)
+
+    def report(self, title, rows):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for label, values in rows:
+            details = '  '.join(f'{key}={value:.2f}' if isinstance(value, float) else f'{key}={value}'
+                                for key, value in values.items())
+            self.stdout.write(f'  {label:<28} {details}')
+
+    def bench_take_test(self, students, questions):
+        """take_test: keshsiz va kesh bilan so'rovlar soni va vaqti"""
+        exam = seed_exam(students=students, questions=questions)
+        url = reverse('take_test', args=[exam.block.id])
+        clients = []
+        for student in exam.students:
+            client = Client()
+            client.force_login(student)
+            clients.append(client)
+
+        cache = get_paper_cache()
+        key = get_paper_key(exam.block)
+
+        def run(warm):
+            durations, queries = [], []
+            for client in clients:
+                if not warm:
+                    cache.delete(key)
+                response, elapsed, captured = measure(client.get, url)
+                if response.status_code != 200:
+                    raise CommandError(f'{url}: {response.status_code}')
+                durations.append(elapsed)
+                queries.append(len(captured))
+            return dict(summarize(durations), queries=max(queries))
+
+        cold = run(warm=False)
+        warm = run(warm=True)
+        _, _, captured = measure(clients[0].get, url)
+
+        self.report(
+            f"take_test: {students} talaba, {questions} savol",
+            [('har safar qayta qurish', cold), ('umumiy kesh', warm)],
+        )
+        self.stdout.write('  Keshdan keyingi so\'rovlar:')
+        for query in captured:
+            self.stdout.write(f"    {query['sql'][:110]}")
+
+    def bench_submit(self, students, questions):
+        """submit_test baholash: avvalgi tsikl va bulk_create bilan yozish"""
+        exam = seed_exam(students=students, questions=questions)
+        question_ids = list(exam.block.questions.values_list('id', flat=True))
+        rng = random.Random(questions)
+        submissions = [
+            {str(question_id): rng.choice('ABCD') for question_id in question_ids}
+            for _ in exam.students
+        ]
+
+        rows = []
+        for label, submit in [('avvalgi (har javob INSERT)', legacy_submit), ('bulk_create + atomic', save_submission)]:
+            UserAnswer.objects.all().delete()
+            TestResult.objects.all().delete()
+            clear_answer_keys()
+            durations, queries = [], []
+            started = time.perf_counter()
+            for student, answers in zip(exam.students, submissions):
+                _, elapsed, captured = measure(submit, student, exam.block, answers, 60)
+                durations.append(elapsed)
+                queries.append(len(captured))
+            total = time.perf_counter() - started
+            rows.append((label, dict(summarize(durations), per_second=len(durations) / total, queries=max(queries))))
+
+        self.report(f"submit: {students} talaba, {questions} savol", rows)
+
+    def bench_grade(self, students, questions):
+        """grade_many: lug'at bo'yicha tsikl va vektorli taqqoslash"""
+        exam = seed_exam(students=1, questions=questions)
+        answer_key = list(exam.block.questions.values_list('id', 'correct_answer'))
+        rng = random.Random(questions)
+        submissions = [
+            {str(question_id): rng.choice('ABCD') for question_id, _ in answer_key}
+            for _ in range(students)
+        ]
+
+        def loop_grade():
+            return [
+                sum(answers.get(str(question_id)) == correct for question_id, correct in answer_key)
+                for answers in submissions
+            ]
+
+        encoded = [grade.selected for grade in grade_many(exam.block, submissions)]
+        rows = []
+        for label, grade in [
+            ('python tsikli', loop_grade),
+            ('grade_many (lug\'atlar)', lambda: grade_many(exam.block, submissions)),
+            ('grade_many (kodlangan)', lambda: grade_many(exam.block, encoded)),
+        ]:
+            clear_answer_keys()
+            _, elapsed, _ = measure(grade)
+            rows.append((label, {'total_ms': elapsed * 1000, 'per_second': students / elapsed}))
+        self.report(f"grade: {students} topshiriq, {questions} savol", rows)
+
+    def bench_queue(self, students, questions):
+        """Navbat: yozish kechikishi va worker o'tkazuvchanligi"""
+        exam = seed_exam(students=students, questions=questions)
+        question_ids = list(exam.block.questions.values_list('id', flat=True))
+        rng = random.Random(questions)
+        queue = get_submission_queue()
+
+        durations = []
+        for student in exam.students:
+            answers = {str(question_id): rng.choice('ABCD') for question_id in question_ids}
+            _, elapsed, _ = measure(queue.enqueue, student.id, exam.block.id, answers, 60)
+            durations.append(elapsed)
+        depth = queue.depth()
+
+        started = time.perf_counter()
+        while process_batch(queue, settings.SUBMISSION_QUEUE_BATCH_SIZE):
+            pass
+        drained = time.perf_counter() - started
+
+        done = QueuedSubmission.objects.filter(test_block=exam.block, status=QueuedSubmission.DONE).count()
+        self.report(f"queue: {students} talaba, {questions} savol", [
+            ('navbatga yozish', dict(summarize(durations), depth=depth)),
+            ('worker', {'total_ms': drained * 1000, 'per_second': done / drained, 'done': done}),
+        ])
+
+    def bench_login(self, students, questions):
+        """Imtihon boshidagi kirish: parol (PBKDF2) va imtihon chiptasi, bitta yadroda"""
+        exam = seed_exam(students=students, questions=questions)
+        tickets = issue_tickets(exam.block)
+
+        def run(url, payloads):
+            durations = []
+            started = time.perf_counter()
+            for data in payloads:
+                response, elapsed, _ = measure(Client().post, url, data)
+                if response.status_code != 302:
+                    raise CommandError(f'{url}: {response.status_code}')
+                durations.append(elapsed)
+            total = time.perf_counter() - started
+            return dict(summarize(durations), logins_per_second=len(durations) / total)
+
+        self.report(f"login: {students} talaba (bitta jarayon = bitta yadro)", [
+            ('username + parol', run(reverse('login'), [
+                {'username': student.username, 'password': exam.password} for student in exam.students
+            ])),
+            ('imtihon chiptasi', run(reverse('ticket_login'), [{'ticket': ticket.token} for ticket in tickets])),
+        ])
+
+    def bench_autosave(self, students, questions):
+        """Avtomatik saqlash: javob xabarlari va bazaga yozilgan partiyalar"""
+        exam = seed_exam(students=students, questions=questions)
+        question_ids = [str(question_id) for question_id in exam.block.questions.values_list('id', flat=True)]
+        rng = random.Random(questions)
+        # Har bir talaba har savolga javob beradi, har beshinchisini keyin o'zgartiradi
+        changes = [(student.id, question_id) for student in exam.students for question_id in question_ids]
+        changes += rng.sample(changes, len(changes) // 5)
+        rng.shuffle(changes)
+        ticks = 10  # imtihon davomidagi flush oraliqlari soni
+
+        async def run():
+            buffer = AnswerBuffer()
+            for student in exam.students:
+                await buffer.attach(student.id, exam.block.id)
+            flush_durations = []
+            started = time.perf_counter()
+            per_tick = -(-len(changes) // ticks)
+            for start in range(0, len(changes), per_tick):
+                for user_id, question_id in changes[start:start + per_tick]:
+                    buffer.record(user_id, exam.block.id, question_id, rng.choice('ABCD'))
+                flush_started = time.perf_counter()
+                await buffer.flush()
+                flush_durations.append(time.perf_counter() - flush_started)
+            total = time.perf_counter() - started
+            for student in exam.students:
+                await buffer.detach(student.id, exam.block.id)
+            return buffer.stats, flush_durations, total
+
+        stats, flush_durations, total = async_to_sync(run)()
+        drafts = AnswerDraft.objects.filter(test_block=exam.block).count()
+        self.report(f"autosave: {students} talaba, {questions} savol, {ticks} ta flush", [
+            ('javob xabarlari', {'messages': stats['messages'], 'per_second': stats['messages'] / total}),
+            ('bazaga yozish', dict(summarize(flush_durations), upserts=stats['flushes'], rows=stats['rows'], drafts=drafts)),
+            ('xabar boshiga yozilsa', {'writes': stats['messages'], 'ratio': stats['messages'] / max(1, stats['flushes'])}),
+        ])
+
+    def bench_answers(self, students, questions):
+        """Javoblarni saqlash: UserAnswer qatorlari va natijadagi ixcham vektor"""
+        exam = seed_exam(students=students, questions=questions)
+        question_ids = list(exam.block.questions.values_list('id', flat=True))
+        rng = random.Random(questions)
+        # Talabalar savollarning ~90% iga javob beradi
+        entries = [
+            (student, {str(question_id): rng.choice('ABCD') for question_id in question_ids if rng.random() < 0.9}, 60)
+            for student in exam.students
+        ]
+
+        def legacy_answers(result):
+            """Avvalgi view_result o'qishi"""
+            return list(
+                UserAnswer.objects.filter(user_id=result.user_id, question__test_block=result.test_block_id)
+                .select_related('question')
+            )
+
+        rows = []
+        for label, store_rows in [('UserAnswer qatorlari', True), ('faqat vektor', False)]:
+            UserAnswer.objects.all().delete()
+            TestResult.objects.all().delete()
+            clear_answer_keys()
+            with override_settings(STORE_USER_ANSWER_ROWS=store_rows):
+                started = time.perf_counter()
+                for start in range(0, len(entries), 200):
+                    save_submissions(exam.block, entries[start:start + 200])
+                written = time.perf_counter() - started
+            results = list(TestResult.objects.filter(test_block=exam.block))
+            read = legacy_answers if store_rows else result_answers
+            durations = [measure(read, result)[1] for result in results[:200]]
+            rows.append((label, dict(
+                summarize(durations),
+                rows=UserAnswer.objects.count(),
+                vector_bytes=sum(len(result.answer_vector) for result in results) // len(results),
+                write_per_second=len(entries) / written,
+            )))
+        self.report(f"answers: {students} talaba, {questions} savol (o'qish - bitta natija)", rows)
+
+    def bench_concurrent(self, students, questions):
+        """Bir vaqtdagi submit_test: standart SQLite va ishlab chiqarish profili (settings.py)"""
+        exam = seed_exam(students=students, questions=questions)
+        question_ids = list(exam.block.questions.values_list('id', flat=True))
+        url = reverse('submit_test', args=[exam.block.id])
+        rng = random.Random(questions)
+        payloads = [
+            json.dumps({'answers': {str(question_id): rng.choice('ABCD') for question_id in question_ids}, 'time_spent': 60})
+            for _ in exam.students
+        ]
+        database = settings.DATABASES['default']
+        profiles = [
+            ('standart', {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}, 'DELETE'),
+            ('ishlab chiqarish profili', {
+                'OPTIONS': settings.SQLITE_PRODUCTION_OPTIONS, 'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True,
+            }, 'WAL'),
+        ]
+        original = {key: database.get(key) for key in ('OPTIONS', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+
+        rows = []
+        try:
+            for label, profile, journal_mode in profiles:
+                TestResult.objects.all().delete()
+                UserAnswer.objects.all().delete()
+                # journal_mode faylda saqlanadi - har profil o'z rejimidan boshlaydi
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode={journal_mode}')
+                connections.close_all()
+                database.update(profile)
+                rows.append((label, self.run_concurrent_submits(exam.students, payloads, url)))
+        finally:
+            connections.close_all()
+            database.update(original)
+        self.report(f"concurrent: {students} talaba, {self.threads} oqim, {questions} savol", rows)
+
+    def run_concurrent_submits(self, students, payloads, url):
+        clients = []
+        for student in students:
+            client = Client(raise_request_exception=False)
+            client.force_login(student)
+            clients.append(client)
+        # Talabalar oqimlarga navbat bilan bo'linadi
+        work = [list(zip(clients[index::self.threads], payloads[index::self.threads])) for index in range(self.threads)]
+        durations, errors = [], []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.threads + 1)
+
+        def worker(items):
+            barrier.wait()
+            for client, payload in items:
+                started = time.perf_counter()
+                response = client.post(url, payload, content_type='application/json')
+                elapsed = time.perf_counter() - started
+                with lock:
+                    (durations if response.status_code == 200 else errors).append(elapsed)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(items,)) for items in work]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - started
+        saved = TestResult.objects.count()
+        return dict(summarize(durations), per_second=saved / total, saved=saved, errors=len(errors))
+
@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from my_app.benchmarking import percentile, seed_exam, temporary_database
+
+ENDPOINTS = ['login', 'dashboard', 'take_test', 'websocket', 'submit_test']
+
+
+class LoadStats:
+    """Endpointlar bo'yicha kechikish, xatolik va so'rovlar soni"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, elapsed, queries, ok):
+        with self.lock:
+            self.durations[endpoint].append(elapsed)
+            self.queries[endpoint].append(queries)
+            if not ok:
+                self.errors[endpoint] += 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Imtihon kuni yuklamasini simulyatsiya qilish: N talaba bir vaqtda login, dashboard, take_test, "
+        "WebSocket va submit_test bosqichlaridan o'tadi (vaqtinchalik bazada)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=4)
+        parser.add_argument('--questions', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=20, help="Bir vaqtda ishlaydigan talabalar soni")
+        parser.add_argument('--skip-websocket', action='store_true')
+
+    def handle(self, *args, **options):
+        with temporary_database(on_disk=True):
+            exam = seed_exam(students=options['students'], groups=options['groups'], questions=options['questions'])
+            question_ids = list(exam.block.questions.values_list('id', flat=True))
+            connection.close()
+
+            stats = LoadStats()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                futures = [
+                    pool.submit(self.run_student, stats, exam, student, question_ids, options['skip_websocket'])
+                    for student in exam.students
+                ]
+                for future in futures:
+                    future.result()
+            wall_time = time.perf_counter() - started
+
+        self.report(stats, wall_time, options)
+
+    def timed(self, stats, endpoint, func, *args, **kwargs):
+        """Bitta bosqichni o'lchash; muvaffaqiyatli bo'lsa javobni qaytaradi"""
+        connection.queries_log.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            try:
+                response = func(*args, **kwargs)
+                ok = getattr(response, 'status_code', 200) < 400
+            except Exception:
+                response, ok = None, False
+            elapsed = time.perf_counter() - started
+        stats.record(endpoint, elapsed, len(ctx.captured_queries), ok)
+        return response if ok else None
+
+    def run_student(self, stats, exam, student, question_ids, skip_websocket):
+        """Bitta talabaning to'liq imtihon oqimi"""
+        close_old_connections()
+        try:
+            client = Client()
+            response = self.timed(stats, 'login', client.post, reverse('login'), {
+                'username': student.username, 'password': exam.password,
+            })
+            if response is None or response.status_code != 302:
+                return
+            self.timed(stats, 'dashboard', client.get, reverse('dashboard'))
+            self.timed(stats, 'take_test', client.get, reverse('take_test', args=[exam.block.id]))
+            if not skip_websocket:
+                cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+                self.timed(stats, 'websocket', async_to_sync(self.websocket_session), exam.block.id, cookie)
+            answers = {str(question_id): 'ABCD'[(student.id + question_id) % 4] for question_id in question_ids}
+            self.timed(
+                stats, 'submit_test', client.post, reverse('submit_test', args=[exam.block.id]),
+                data=json.dumps({'answers': answers, 'time_spent': 60}), content_type='application/json',
+            )
+        finally:
+            connection.close()
+
+    async def websocket_session(self, block_id, cookie):
+        """WebSocket ga ulanish va birinchi xabarni kutish"""
+        from test_sayt.asgi import application
+
+        communicator = WebsocketCommunicator(application, f'/ws/test/{block_id}/', headers=[(b'cookie', cookie.encode())])
+        try:
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise ConnectionError("WebSocket ulanmadi")
+            await communicator.receive_from(timeout=5)
+        finally:
+            await communicator.disconnect()
+
+    def report(self, stats, wall_time, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{options['students']} talaba, {options['groups']} guruh, {options['questions']} savol, "
+            f"parallel={options['concurrency']}, umumiy vaqt={wall_time:.2f}s"
+        ))
+        self.stdout.write(
+            f"  {'endpoint':<12} {'soni':>6} {'xato':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'rps':>8} {'sql o`rt':>8} {'sql max':>8}"
+        )
+        for endpoint in ENDPOINTS:
+            durations = stats.durations.get(endpoint)
+            if not durations:
+                continue
+            queries = stats.queries[endpoint]
+            self.stdout.write(
+                f"  {endpoint:<12} {len(durations):>6} {stats.errors[endpoint]:>5} "
+                f"{percentile(durations, 50) * 1000:>9.1f} {percentile(durations, 95) * 1000:>9.1f} "
+                f"{percentile(durations, 99) * 1000:>9.1f} {len(durations) / wall_time:>8.1f} "
+                f"{sum(queries) / len(queries):>8.1f} {max(queries):>8}"
+            )
@@ -0,0 +1,48 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.grading import compile_answer_key, save_submissions
+from my_app.models import CustomUser, TestBlock, TestResult
+
+
+class Command(BaseCommand):
+    help = (
+        "Qog'ozdagi javob varaqlarini import qilish. CSV ustunlari: username, answers, time_spent (ixtiyoriy). "
+        "answers - savollar tartibidagi harflar, javobsiz savol uchun '-'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_id', type=int)
+        parser.add_argument('csv_file')
+
+    def handle(self, *args, **options):
+        try:
+            block = TestBlock.objects.get(pk=options['block_id'])
+        except TestBlock.DoesNotExist:
+            raise CommandError(f"Test bloki topilmadi: {options['block_id']}")
+
+        with open(options['csv_file'], newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+
+        answer_key = compile_answer_key(block)
+        users = CustomUser.objects.in_bulk([row['username'] for row in rows], field_name='username')
+        completed = set(TestResult.objects.filter(test_block=block).values_list('user_id', flat=True))
+
+        entries = []
+        for line, row in enumerate(rows, start=2):
+            user = users.get(row['username'])
+            letters = (row.get('answers') or '').strip().upper()
+            if user is None:
+                self.stderr.write(f"{line}-qator: foydalanuvchi topilmadi: {row['username']}")
+            elif user.id in completed:
+                self.stderr.write(f"{line}-qator: {row['username']} bu testni allaqachon topshirgan")
+            elif len(letters) != len(answer_key):
+                self.stderr.write(f"{line}-qator: {len(answer_key)} ta javob kutilgan, {len(letters)} ta berilgan")
+            else:
+                answers = {str(question_id): letter for question_id, letter in zip(answer_key.question_ids, letters)}
+                entries.append((user, answers, int(row.get('time_spent') or 0)))
+                completed.add(user.id)
+
+        save_submissions(block, entries)
+        self.stdout.write(self.style.SUCCESS(f"{len(entries)} ta javob varag'i import qilindi"))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.models import TestBlock
+from my_app.question_import import FORMATS, QuestionImportError, detect_format, import_questions
+
+
+class Command(BaseCommand):
+    help = "Savollarni CSV/JSON/matn fayldan test blokiga import qilish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_id', type=int)
+        parser.add_argument('file')
+        parser.add_argument('--format', choices=FORMATS, help="Standart: fayl kengaytmasidan")
+
+    def handle(self, *args, **options):
+        try:
+            block = TestBlock.objects.get(pk=options['block_id'])
+        except TestBlock.DoesNotExist:
+            raise CommandError(f"Test bloki topilmadi: {options['block_id']}")
+
+        started = time.perf_counter()
+        with open(options['file'], 'rb') as f:
+            try:
+                created = import_questions(block, f, options['format'] or detect_format(options['file']))
+            except QuestionImportError as exc:
+                for line, message in exc.errors:
+                    self.stderr.write(f"{line}-qator: {message}" if line else message)
+                raise CommandError(f"Import qilinmadi: {len(exc.errors)} ta xato")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created)} ta savol {time.perf_counter() - started:.2f} soniyada import qilindi"
+        ))
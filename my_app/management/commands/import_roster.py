@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.roster_import import RosterImportError, get_default_workers, import_roster, write_credentials_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "O'quvchilar ro'yxatini CSV dan import qilish. Ustunlar: username, first_name, last_name, group, "
+        "course (ixtiyoriy), password (ixtiyoriy - bo'sh bo'lsa yaratiladi)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--credentials', help="Login va parollarni shu CSV faylga yozish")
+        parser.add_argument('--workers', type=int, default=get_default_workers(),
+                            help="Parol xeshlash jarayonlari soni (standart: CPU soni, ko'pi bilan 8)")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with open(options['csv_file'], 'rb') as f:
+            try:
+                report = import_roster(f, workers=options['workers'])
+            except RosterImportError as exc:
+                for line, message in exc.errors:
+                    self.stderr.write(f"{line}-qator: {message}")
+                raise CommandError(f"Import qilinmadi: {len(exc.errors)} ta xato")
+        elapsed = time.perf_counter() - started
+
+        for line, username in report.duplicates:
+            self.stderr.write(f"{line}-qator: {username} allaqachon mavjud - o'tkazib yuborildi")
+        if options['credentials']:
+            with open(options['credentials'], 'w', newline='', encoding='utf-8-sig') as f:
+                write_credentials_csv(report.credentials, f)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(report.created)} ta o'quvchi {elapsed:.2f} soniyada qo'shildi"
+            + (f", {len(report.duplicates)} ta takroriy o'tkazib yuborildi" if report.duplicates else '')
+        ))
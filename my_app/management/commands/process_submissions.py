@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from my_app.submission_queue import get_submission_queue, run_worker
+
+
+class Command(BaseCommand):
+    help = "Navbatdagi test topshiriqlarini partiyalab baholash va saqlash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.SUBMISSION_QUEUE_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=0.5, help="Navbat bo'sh bo'lganda kutish (soniya)")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Shuncha soniyadan beri baholanayotganlarni navbatga qaytarish")
+        parser.add_argument('--once', action='store_true', help="Navbat bo'shagach to'xtash")
+        parser.add_argument('--stats', action='store_true', help="Faqat navbat uzunligini ko'rsatish")
+
+    def handle(self, *args, **options):
+        queue = get_submission_queue()
+        if options['stats']:
+            self.stdout.write(f"Navbatda: {queue.depth()}")
+            return
+        run_worker(
+            queue,
+            batch_size=options['batch_size'],
+            interval=options['interval'],
+            once=options['once'],
+            stale_after=options['stale_after'],
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from my_app.leaderboard import block_board, course_board, group_board, rebuild_board
+from my_app.models import Course, Group, TestBlock
+
+
+class Command(BaseCommand):
+    help = (
+        "Blok, guruh va kurs reytinglarini bazadan qayta qurish "
+        "(LEADERBOARD_BACKEND='redis' uchun; 'memory' har bir jarayonda o'zi yuklanadi)"
+    )
+
+    def handle(self, *args, **options):
+        boards = [block_board(pk) for pk in TestBlock.objects.values_list('id', flat=True)]
+        boards += [group_board(pk) for pk in Group.objects.values_list('id', flat=True)]
+        boards += [course_board(pk) for pk in Course.objects.values_list('id', flat=True)]
+        for board in boards:
+            rebuild_board(board)
+        self.stdout.write(self.style.SUCCESS(f"{len(boards)} ta reyting qayta qurildi"))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from my_app.models import TestBlock
+
+
+class Command(BaseCommand):
+    help = "Test bloklarining savollar soni va tugash vaqtini qayta hisoblash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_ids', nargs='*', type=int, help="Faqat shu bloklar (ixtiyoriy)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        blocks = TestBlock.objects.annotate(actual_count=Count('questions')).only(
+            'start_time', 'time_per_question', 'question_count', 'end_time'
+        )
+        if options['block_ids']:
+            blocks = blocks.filter(id__in=options['block_ids'])
+
+        changed = []
+        for block in blocks.iterator(chunk_size=options['batch_size']):
+            old_end_time = block.end_time
+            old_count = block.question_count
+            block.question_count = block.actual_count
+            block.end_time = block.get_end_time()
+            if (old_count, old_end_time) != (block.question_count, block.end_time):
+                changed.append(block)
+
+        with transaction.atomic():
+            TestBlock.objects.bulk_update(
+                changed, ['question_count', 'end_time'], batch_size=options['batch_size']
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(changed)} ta blok yangilandi"))
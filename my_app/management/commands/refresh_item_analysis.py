@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.item_analysis import invalidate_item_analysis, refresh_item_analysis
+from my_app.models import TestBlock
+
+
+class Command(BaseCommand):
+    help = "Savollar item tahlilini yangi natijalar bilan yangilash (--full: noldan qurish)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_ids', nargs='*', type=int)
+        parser.add_argument('--full', action='store_true')
+
+    def handle(self, *args, **options):
+        blocks = TestBlock.objects.all()
+        if options['block_ids']:
+            blocks = blocks.filter(pk__in=options['block_ids'])
+            missing = set(options['block_ids']) - set(blocks.values_list('pk', flat=True))
+            if missing:
+                raise CommandError(f"Test bloki topilmadi: {', '.join(map(str, sorted(missing)))}")
+        for block in blocks:
+            if options['full']:
+                invalidate_item_analysis(block)
+            analysis = refresh_item_analysis(block)
+            self.stdout.write(self.style.SUCCESS(f"{block.title}: {analysis.result_count} ta natija tahlil qilindi"))
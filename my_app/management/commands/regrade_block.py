@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.grading import regrade_block
+from my_app.models import TestBlock
+
+
+class Command(BaseCommand):
+    help = "Blokdagi natijalarni joriy to'g'ri javoblar bo'yicha qayta baholash"
+
+    def add_arguments(self, parser):
+        parser.add_argument('block_ids', nargs='+', type=int)
+
+    def handle(self, *args, **options):
+        for block_id in options['block_ids']:
+            try:
+                block = TestBlock.objects.get(pk=block_id)
+            except TestBlock.DoesNotExist:
+                raise CommandError(f"Test bloki topilmadi: {block_id}")
+            count = regrade_block(block)
+            self.stdout.write(self.style.SUCCESS(f"{block.title}: {count} ta natija qayta baholandi"))
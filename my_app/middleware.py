@@ -0,0 +1,86 @@
+import json
+import logging
+import re
+import time
+
+from django.conf import settings
+
+from .instrumentation import QueryRecorder, get_query_budget
+
+logger = logging.getLogger('my_app.requests')
+
+DUPLICATE_PATTERN_LIMIT = 5  # logda va sarlavhada ko'rsatiladigan takrorlangan shakllar
+DUPLICATE_PATTERN_LENGTH = 200  # bitta shakl sarlavhada shu uzunlikkacha
+DUPLICATE_HEADER_LENGTH = 1000
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def format_duplicate_patterns(duplicates):
+    """Sarlavha uchun: "3x SELECT ...; 2x SELECT ..." (bir qatorda, qisqartirilgan)"""
+    value = '; '.join(
+        f'{count}x {_WHITESPACE_RE.sub(" ", pattern)[:DUPLICATE_PATTERN_LENGTH]}' for pattern, count in duplicates
+    )
+    return value[:DUPLICATE_HEADER_LENGTH]
+
+
+class RequestInstrumentationMiddleware:
+    """my_app view lari uchun so'rovlar soni, SQL vaqti, takrorlangan so'rovlar va view vaqti.
+
+    DEBUG rejimida natija ``X-Query-*`` sarlavhalarida, aks holda
+    ``my_app.requests`` loggeriga bitta JSON qator sifatida yoziladi.
+    ``view_ms`` - view chaqirilgandan (``process_view``) javobgacha,
+    ``request_ms`` - butun middleware zanjiri (sessiya, autentifikatsiya va h.k.).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._instrumented_view = None
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+        finished = time.perf_counter()
+
+        view_func = request._instrumented_view
+        if view_func is None:
+            return response
+
+        duplicates = recorder.duplicates()
+        top_duplicates = recorder.top_duplicates(DUPLICATE_PATTERN_LIMIT)
+        budget = get_query_budget(view_func)
+        data = {
+            'view': request.resolver_match.url_name if request.resolver_match else view_func.__name__,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.total_time * 1000, 2),
+            'view_ms': round((finished - request._view_started) * 1000, 2),
+            'request_ms': round((finished - started) * 1000, 2),
+            'duplicate_queries': sum(duplicates.values()),
+            'duplicate_patterns': [{'sql': pattern, 'count': count} for pattern, count in top_duplicates],
+            'query_budget': budget,
+        }
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(data['queries'])
+            response['X-Query-Time-Ms'] = str(data['sql_ms'])
+            response['X-View-Time-Ms'] = str(data['view_ms'])
+            response['X-Request-Time-Ms'] = str(data['request_ms'])
+            response['X-Duplicate-Queries'] = str(data['duplicate_queries'])
+            if top_duplicates:
+                response['X-Duplicate-Patterns'] = format_duplicate_patterns(top_duplicates)
+            if budget is not None:
+                response['X-Query-Budget'] = str(budget)
+        else:
+            logger.info(json.dumps(data))
+        if budget is not None and recorder.count > budget:
+            logger.warning("%s: %d ta so'rov, byudjet %d", data['view'], recorder.count, budget)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if view_func.__module__ == 'my_app.views':
+            request._instrumented_view = view_func
+            request._view_started = time.perf_counter()
+        return None
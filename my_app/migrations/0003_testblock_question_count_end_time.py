@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:18
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_question_count(apps, schema_editor):
+    TestBlock = apps.get_model('my_app', 'TestBlock')
+    blocks = list(TestBlock.objects.annotate(actual_count=Count('questions')))
+    for block in blocks:
+        block.question_count = block.actual_count
+        block.end_time = block.start_time + timedelta(minutes=block.actual_count * block.time_per_question)
+    TestBlock.objects.bulk_update(blocks, ['question_count', 'end_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0002_group_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testblock',
+            name='end_time',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Tugash vaqti'),
+        ),
+        migrations.AddField(
+            model_name='testblock',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Savollar soni'),
+        ),
+        migrations.RunPython(fill_question_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0003_testblock_question_count_end_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testblock',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versiya'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0004_testblock_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueuedSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict, verbose_name='Javoblar')),
+                ('time_spent', models.IntegerField(default=0, verbose_name='Sarflangan vaqt (soniya)')),
+                ('status', models.CharField(choices=[('pending', 'Navbatda'), ('processing', 'Baholanmoqda'), ('done', 'Tayyor'), ('failed', 'Xatolik')], default='pending', max_length=20, verbose_name='Holat')),
+                ('claimed_by', models.CharField(blank=True, max_length=32, verbose_name='Worker')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Olingan vaqt')),
+                ('error', models.TextField(blank=True, verbose_name='Xatolik')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yuborilgan vaqt')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Baholangan vaqt')),
+                ('test_block', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_submissions', to='my_app.testblock', verbose_name='Test bloki')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queued_submissions', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Navbatdagi topshiriq',
+                'verbose_name_plural': 'Navbatdagi topshiriqlar',
+                'indexes': [models.Index(fields=['status', 'id'], name='my_app_queu_status_6d2ad2_idx')],
+                'unique_together': {('user', 'test_block')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0005_queuedsubmission'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['-completed_at', '-id'], name='result_completed_idx'),
+        ),
+    ]
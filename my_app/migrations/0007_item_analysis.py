@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0006_testresult_completed_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlockAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_count', models.PositiveIntegerField(default=0, verbose_name='Natijalar soni')),
+                ('score_sum', models.FloatField(default=0, verbose_name="Ballar yig'indisi")),
+                ('score_sq_sum', models.FloatField(default=0, verbose_name="Ballar kvadratlari yig'indisi")),
+                ('last_result_id', models.BigIntegerField(default=0, verbose_name='Oxirgi hisobga olingan natija')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Yangilangan vaqt')),
+                ('test_block', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis', to='my_app.testblock', verbose_name='Test bloki')),
+            ],
+            options={
+                'verbose_name': 'Blok tahlili',
+                'verbose_name_plural': 'Blok tahlillari',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count_a', models.PositiveIntegerField(default=0, verbose_name='A tanlanganlar')),
+                ('count_b', models.PositiveIntegerField(default=0, verbose_name='B tanlanganlar')),
+                ('count_c', models.PositiveIntegerField(default=0, verbose_name='C tanlanganlar')),
+                ('count_d', models.PositiveIntegerField(default=0, verbose_name='D tanlanganlar')),
+                ('score_sum_a', models.FloatField(default=0, verbose_name="A tanlaganlar ballari yig'indisi")),
+                ('score_sum_b', models.FloatField(default=0, verbose_name="B tanlaganlar ballari yig'indisi")),
+                ('score_sum_c', models.FloatField(default=0, verbose_name="C tanlaganlar ballari yig'indisi")),
+                ('score_sum_d', models.FloatField(default=0, verbose_name="D tanlaganlar ballari yig'indisi")),
+                ('difficulty', models.FloatField(blank=True, null=True, verbose_name='Qiyinlik (p)')),
+                ('discrimination', models.FloatField(blank=True, null=True, verbose_name='Ajrata olish (r)')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analysis', to='my_app.question', verbose_name='Savol')),
+            ],
+            options={
+                'verbose_name': 'Savol tahlili',
+                'verbose_name_plural': 'Savol tahlillari',
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0007_item_analysis'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(max_length=16, unique=True, verbose_name='Chipta raqami')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Yaratilgan vaqt')),
+                ('used_at', models.DateTimeField(blank=True, null=True, verbose_name='Ishlatilgan vaqt')),
+                ('test_block', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tickets', to='my_app.testblock', verbose_name='Test bloki')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_tickets', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Imtihon chiptasi',
+                'verbose_name_plural': 'Imtihon chiptalari',
+                'unique_together': {('user', 'test_block')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0008_examticket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerDraft',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(default=dict, verbose_name='Javoblar')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Saqlangan vaqt')),
+                ('test_block', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_drafts', to='my_app.testblock', verbose_name='Test bloki')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_drafts', to=settings.AUTH_USER_MODEL, verbose_name='Foydalanuvchi')),
+            ],
+            options={
+                'verbose_name': 'Javoblar qoralamasi',
+                'verbose_name_plural': 'Javoblar qoralamalari',
+                'unique_together': {('user', 'test_block')},
+            },
+        ),
+    ]
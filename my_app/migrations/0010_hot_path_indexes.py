@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:03
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_results(apps, schema_editor):
+    """Cheklovdan oldin: bir blokni qayta topshirganlarning birinchi natijasi qoladi"""
+    TestResult = apps.get_model('my_app', 'TestResult')
+    duplicates = (
+        TestResult.objects.values('user_id', 'test_block_id').order_by()
+        .annotate(first_id=Min('id'), result_count=Count('id')).filter(result_count__gt=1)
+    )
+    for row in duplicates:
+        TestResult.objects.filter(user_id=row['user_id'], test_block_id=row['test_block_id']).exclude(
+            id=row['first_id']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0009_answerdraft'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['test_block', 'order'], name='question_block_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testresult',
+            index=models.Index(fields=['test_block', '-completed_at', '-id'], name='result_block_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['question', 'user'], name='answer_question_user_idx'),
+        ),
+        migrations.RunPython(delete_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='testresult',
+            constraint=models.UniqueConstraint(fields=('user', 'test_block'), name='result_user_block_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='submission_key',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Topshirish kaliti'),
+        ),
+    ]
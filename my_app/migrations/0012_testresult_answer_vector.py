@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+# answer_vector.py kodekining shu migratsiya paytidagi (1-format) nusxasi: migratsiya
+# keyinchalik kodek o'zgarsa ham aynan shu formatda yozishi kerak
+FORMAT = 1
+
+
+def write_varint(value, out):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_layout(question_ids):
+    out = bytearray()
+    write_varint(len(question_ids), out)
+    previous = 0
+    for question_id in question_ids:
+        delta = question_id - previous
+        write_varint(delta * 2 if delta >= 0 else -delta * 2 - 1, out)
+        previous = question_id
+    return bytes(out)
+
+
+def encode_answers(layout, selected, correct_mask):
+    out = bytearray([FORMAT])
+    write_varint(len(layout), out)
+    out += layout
+    out += selected
+    # numpy.packbits(..., bitorder='little') bilan bir xil
+    bits = bytearray((len(correct_mask) + 7) // 8)
+    for index, correct in enumerate(correct_mask):
+        if correct:
+            bits[index // 8] |= 1 << (index % 8)
+    out += bits
+    return bytes(out)
+
+
+def backfill_answer_vectors(apps, schema_editor):
+    """Mavjud natijalar vektorlari UserAnswer qatorlaridan (blok tartibida)"""
+    Question = apps.get_model('my_app', 'Question')
+    TestResult = apps.get_model('my_app', 'TestResult')
+    UserAnswer = apps.get_model('my_app', 'UserAnswer')
+    block_ids = TestResult.objects.filter(answer_vector__isnull=True).values_list('test_block_id', flat=True).distinct()
+    for block_id in list(block_ids):
+        question_ids = list(Question.objects.filter(test_block_id=block_id).order_by('order', 'id').values_list('id', flat=True))
+        positions = {question_id: index for index, question_id in enumerate(question_ids)}
+        layout = encode_layout(question_ids)
+        by_user = {}
+        for user_id, question_id, letter, is_correct in UserAnswer.objects.filter(
+            question__test_block_id=block_id
+        ).values_list('user_id', 'question_id', 'selected_answer', 'is_correct').iterator(chunk_size=2000):
+            selected, correct = by_user.setdefault(user_id, (bytearray(b'-' * len(question_ids)), [False] * len(question_ids)))
+            selected[positions[question_id]] = ord(letter)
+            correct[positions[question_id]] = is_correct
+        results = list(TestResult.objects.filter(test_block_id=block_id, answer_vector__isnull=True).only('id', 'user_id'))
+        for result in results:
+            selected, correct = by_user.get(result.user_id, (b'-' * len(question_ids), [False] * len(question_ids)))
+            result.answer_vector = encode_answers(layout, bytes(selected), correct)
+        TestResult.objects.bulk_update(results, ['answer_vector'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0011_testresult_submission_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testresult',
+            name='answer_vector',
+            field=models.BinaryField(blank=True, null=True, verbose_name='Javoblar vektori'),
+        ),
+        migrations.RunPython(backfill_answer_vectors, migrations.RunPython.noop),
+    ]
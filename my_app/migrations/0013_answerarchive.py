@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0012_testresult_answer_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.BinaryField(verbose_name='Arxiv (zlib)')),
+                ('result_count', models.PositiveIntegerField(default=0, verbose_name='Natijalar soni')),
+                ('raw_size', models.PositiveIntegerField(default=0, verbose_name='Siqilmagan hajm (bayt)')),
+                ('rows_deleted', models.PositiveIntegerField(default=0, verbose_name="O'chirilgan javob qatorlari")),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Arxivlangan vaqt')),
+                ('test_block', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='answer_archive', to='my_app.testblock', verbose_name='Test bloki')),
+            ],
+            options={
+                'verbose_name': 'Javoblar arxivi',
+                'verbose_name_plural': 'Javoblar arxivlari',
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -74,6 +77,9 @@ class TestBlock(models.Model):
     start_time = models.DateTimeField(verbose_name="Boshlanish vaqti")
     time_per_question = models.IntegerField(default=2, verbose_name="Har bir savol uchun vaqt (daqiqa)")
     is_active = models.BooleanField(default=True, verbose_name="Faol")
+    question_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Savollar soni")
+    end_time = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Tugash vaqti")
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versiya")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
     
     class Meta:
@@ -84,17 +90,62 @@ class TestBlock(models.Model):
     def __str__(self):
         return self.title
     
+    def save(self, *args, **kwargs):
+        # Admin panel formadan satr yuborishi mumkin
+        start_time = self._meta.get_field('start_time').to_python(self.start_time)
+        if timezone.is_naive(start_time):
+            start_time = timezone.make_aware(start_time)
+        self.start_time = start_time
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'end_time', 'version'}
+        if self._state.adding:
+            self.end_time = self.get_end_time()
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            # question_count ni savol signallari bazada yuritadi - eski nusxadagi qiymat
+            # uni (va tugash vaqtini) bosib ketmasligi uchun bazadagisi olinadi
+            question_count = (
+                type(self).objects.select_for_update().filter(pk=self.pk)
+                .values_list('question_count', flat=True).first()
+            )
+            if question_count is not None:
+                self.question_count = question_count
+            self.end_time = self.get_end_time()
+            # Har bir tahrirda versiya oshadi (imtihon varag'i keshi shunga bog'langan)
+            self.version = F('version') + 1
+            super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+    
     def is_unlocked(self):
         """Test ochilganmi tekshirish"""
         return timezone.now() >= self.start_time
     
+    def get_question_count(self):
+        """Savollar soni (saqlangan maydondan, so'rovsiz)"""
+        return self.question_count
+    
     def get_end_time(self):
         """Test tugash vaqtini hisoblash"""
-        question_count = self.questions.count()
-        total_minutes = question_count * self.time_per_question
-        from datetime import timedelta
+        total_minutes = self.question_count * self.time_per_question
         return self.start_time + timedelta(minutes=total_minutes)
     
+    @classmethod
+    def bump_version(cls, block_id):
+        """Savol tahrirlanganda blok versiyasini oshirish"""
+        cls.objects.filter(pk=block_id).update(version=F('version') + 1)
+    
+    @classmethod
+    def adjust_question_count(cls, block_id, delta):
+        """Savollar sonini o'zgartirish va tugash vaqtini qayta hisoblash"""
+        with transaction.atomic():
+            blocks = cls.objects.filter(pk=block_id)
+            blocks.update(question_count=F('question_count') + delta, version=F('version') + 1)
+            block = blocks.only('start_time', 'time_per_question', 'question_count').first()
+            if block is not None:
+                blocks.update(end_time=block.get_end_time())
+    
     def is_expired(self):
         """Test muddati o'tganmi"""
         return timezone.now() > self.get_end_time()
@@ -119,9 +170,17 @@ class Question(models.Model):
         verbose_name = "Savol"
         verbose_name_plural = "Savollar"
         ordering = ['order', 'id']
+        indexes = [models.Index(fields=['test_block', 'order'], name='question_block_order_idx')]
     
     def __str__(self):
         return f"{self.test_block.title} - Savol {self.order}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Savol boshqa blokka ko'chirilganini aniqlash uchun
+        instance._original_test_block_id = instance.__dict__.get('test_block_id')
+        return instance
 
 
 class TestResult(models.Model):
@@ -133,11 +192,22 @@ class TestResult(models.Model):
     correct_answers = models.IntegerField(default=0, verbose_name="To'g'ri javoblar")
     completed_at = models.DateTimeField(auto_now_add=True, verbose_name="Topshirilgan vaqt")
     time_spent = models.IntegerField(default=0, verbose_name="Sarflangan vaqt (soniya)")
+    # Brauzer yuborgan Idempotency-Key: shu kalit bilan qayta yuborish asl natijani oladi
+    submission_key = models.CharField(max_length=64, blank=True, verbose_name="Topshirish kaliti")
+    # Javoblar va to'g'riligi ixcham ko'rinishda (answer_vector.py) - natija sahifasi,
+    # eksport va item tahlili shundan o'qiydi
+    answer_vector = models.BinaryField(null=True, blank=True, editable=False, verbose_name="Javoblar vektori")
     
     class Meta:
         verbose_name = "Test natijasi"
         verbose_name_plural = "Test natijalari"
         ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['-completed_at', '-id'], name='result_completed_idx'),
+            models.Index(fields=['test_block', '-completed_at', '-id'], name='result_block_completed_idx'),
+        ]
+        # Talaba blokni bir marta topshiradi - ikki marta bosishda ham (exists() tekshiruvi poygani to'smaydi)
+        constraints = [models.UniqueConstraint(fields=['user', 'test_block'], name='result_user_block_uniq')]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.test_block.title} ({self.score}%)"
@@ -160,6 +230,130 @@ class UserAnswer(models.Model):
         verbose_name = "Foydalanuvchi javobi"
         verbose_name_plural = "Foydalanuvchi javoblari"
         unique_together = ['user', 'question']
+        indexes = [models.Index(fields=['question', 'user'], name='answer_question_user_idx')]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.question.question_text[:50]}"
+
+
+class AnswerDraft(models.Model):
+    """Imtihon davomida WebSocket orqali avtomatik saqlangan (hali topshirilmagan) javoblar"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='answer_drafts', verbose_name="Foydalanuvchi")
+    test_block = models.ForeignKey(TestBlock, on_delete=models.CASCADE, related_name='answer_drafts', verbose_name="Test bloki")
+    answers = models.JSONField(default=dict, verbose_name="Javoblar")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Saqlangan vaqt")
+    
+    class Meta:
+        verbose_name = "Javoblar qoralamasi"
+        verbose_name_plural = "Javoblar qoralamalari"
+        unique_together = ['user', 'test_block']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.test_block_id} ({len(self.answers)})"
+
+
+class AnswerArchive(models.Model):
+    """Muddati ancha oldin tugagan blok javoblarining siqilgan arxivi (answer_archive.py)"""
+    test_block = models.OneToOneField(TestBlock, on_delete=models.CASCADE, related_name='answer_archive', verbose_name="Test bloki")
+    data = models.BinaryField(verbose_name="Arxiv (zlib)")
+    result_count = models.PositiveIntegerField(default=0, verbose_name="Natijalar soni")
+    raw_size = models.PositiveIntegerField(default=0, verbose_name="Siqilmagan hajm (bayt)")
+    rows_deleted = models.PositiveIntegerField(default=0, verbose_name="O'chirilgan javob qatorlari")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Arxivlangan vaqt")
+    
+    class Meta:
+        verbose_name = "Javoblar arxivi"
+        verbose_name_plural = "Javoblar arxivlari"
+    
+    def __str__(self):
+        return f"{self.test_block_id} ({self.result_count})"
+
+
+class QueuedSubmission(models.Model):
+    """Navbatdagi (hali baholanmagan) test topshirig'i"""
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Navbatda'),
+        (PROCESSING, 'Baholanmoqda'),
+        (DONE, 'Tayyor'),
+        (FAILED, 'Xatolik'),
+    ]
+    
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='queued_submissions', verbose_name="Foydalanuvchi")
+    test_block = models.ForeignKey(TestBlock, on_delete=models.CASCADE, related_name='queued_submissions', verbose_name="Test bloki")
+    answers = models.JSONField(default=dict, verbose_name="Javoblar")
+    time_spent = models.IntegerField(default=0, verbose_name="Sarflangan vaqt (soniya)")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING, verbose_name="Holat")
+    claimed_by = models.CharField(max_length=32, blank=True, verbose_name="Worker")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="Olingan vaqt")
+    error = models.TextField(blank=True, verbose_name="Xatolik")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yuborilgan vaqt")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Baholangan vaqt")
+    
+    class Meta:
+        verbose_name = "Navbatdagi topshiriq"
+        verbose_name_plural = "Navbatdagi topshiriqlar"
+        unique_together = ['user', 'test_block']
+        indexes = [models.Index(fields=['status', 'id'])]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.test_block_id} ({self.status})"
+
+
+class BlockAnalysis(models.Model):
+    """Item tahlili uchun blok bo'yicha yig'ma ko'rsatkichlar (ballar yig'indisi va h.k.)"""
+    test_block = models.OneToOneField(TestBlock, on_delete=models.CASCADE, related_name='analysis', verbose_name="Test bloki")
+    result_count = models.PositiveIntegerField(default=0, verbose_name="Natijalar soni")
+    score_sum = models.FloatField(default=0, verbose_name="Ballar yig'indisi")
+    score_sq_sum = models.FloatField(default=0, verbose_name="Ballar kvadratlari yig'indisi")
+    last_result_id = models.BigIntegerField(default=0, verbose_name="Oxirgi hisobga olingan natija")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Yangilangan vaqt")
+    
+    class Meta:
+        verbose_name = "Blok tahlili"
+        verbose_name_plural = "Blok tahlillari"
+    
+    def __str__(self):
+        return f"{self.test_block_id} ({self.result_count})"
+
+
+class QuestionAnalysis(models.Model):
+    """Savol bo'yicha item tahlili: variantlar chastotasi, qiyinlik va ajrata olish"""
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='analysis', verbose_name="Savol")
+    count_a = models.PositiveIntegerField(default=0, verbose_name="A tanlanganlar")
+    count_b = models.PositiveIntegerField(default=0, verbose_name="B tanlanganlar")
+    count_c = models.PositiveIntegerField(default=0, verbose_name="C tanlanganlar")
+    count_d = models.PositiveIntegerField(default=0, verbose_name="D tanlanganlar")
+    score_sum_a = models.FloatField(default=0, verbose_name="A tanlaganlar ballari yig'indisi")
+    score_sum_b = models.FloatField(default=0, verbose_name="B tanlaganlar ballari yig'indisi")
+    score_sum_c = models.FloatField(default=0, verbose_name="C tanlaganlar ballari yig'indisi")
+    score_sum_d = models.FloatField(default=0, verbose_name="D tanlaganlar ballari yig'indisi")
+    difficulty = models.FloatField(null=True, blank=True, verbose_name="Qiyinlik (p)")
+    discrimination = models.FloatField(null=True, blank=True, verbose_name="Ajrata olish (r)")
+    
+    class Meta:
+        verbose_name = "Savol tahlili"
+        verbose_name_plural = "Savol tahlillari"
+    
+    def __str__(self):
+        return f"{self.question_id} (p={self.difficulty}, r={self.discrimination})"
+
+
+class ExamTicket(models.Model):
+    """Bir martalik imtihon chiptasi: parolsiz, to'g'ridan-to'g'ri testga kirish uchun"""
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='exam_tickets', verbose_name="Foydalanuvchi")
+    test_block = models.ForeignKey(TestBlock, on_delete=models.CASCADE, related_name='tickets', verbose_name="Test bloki")
+    nonce = models.CharField(max_length=16, unique=True, verbose_name="Chipta raqami")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan vaqt")
+    used_at = models.DateTimeField(null=True, blank=True, verbose_name="Ishlatilgan vaqt")
+    
+    class Meta:
+        verbose_name = "Imtihon chiptasi"
+        verbose_name_plural = "Imtihon chiptalari"
+        unique_together = ['user', 'test_block']
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.test_block_id}"
@@ -0,0 +1,46 @@
+"""Keyset (kursor) sahifalash.
+
+``OFFSET`` chuqur sahifalarda oldingi barcha qatorlarni o'qib chiqadi.
+Kursor esa oxirgi ko'rsatilgan qatorning ``(vaqt, id)`` qiymatini saqlaydi,
+keyingi sahifa indeks bo'yicha shu joydan davom etadi - sahifa narxi
+qanchalik chuqur varaqlanganidan qat'i nazar bir xil.
+"""
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+
+KeysetPage = namedtuple('KeysetPage', ['items', 'next_cursor'])
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Kursorni (qiymat, id) ga aylantirish; noto'g'ri bo'lsa None"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(value), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginate_keyset(queryset, cursor=None, per_page=50, field='completed_at'):
+    """``(-field, -id)`` tartibida bitta sahifa"""
+    queryset = queryset.order_by(f'-{field}', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+
+    items = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(items, next_cursor)
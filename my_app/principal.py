@@ -0,0 +1,112 @@
+"""Keshlangan foydalanuvchi (principal).
+
+``AuthenticationMiddleware`` har bir so'rovda foydalanuvchini bazadan
+o'qiydi, sahifalar esa keyin ``user.group`` va ``user.group.course`` ni
+alohida so'rovlar bilan oladi. ``CachedModelBackend`` foydalanuvchining
+kichik nusxasini (id, ism, guruh va kurs, staff belgilari, parol xeshi -
+sessiya xeshini tekshirish uchun) keshda saqlaydi va undan guruhi va kursi
+bog'langan ``CustomUser`` obyektini tiklaydi. Foydalanuvchi, guruh yoki
+kurs o'zgarganda nusxa keshdan o'chiriladi (signals.py).
+
+``PRINCIPAL_CACHE`` None bo'lsa (umumiy kesh sozlanmagan) yoki kesh
+ishlamasa foydalanuvchi odatdagidek bazadan olinadi.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from .models import Course, CustomUser, Group
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = [
+    'id', 'username', 'first_name', 'last_name', 'password', 'is_staff', 'is_superuser', 'is_active',
+    'last_login', 'group_id',
+]
+
+
+def get_principal_cache():
+    """Principal keshi; o'chirilgan bo'lsa None"""
+    alias = getattr(settings, 'PRINCIPAL_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def get_principal_key(user_id):
+    return f'principal:{user_id}'
+
+
+def build_principal(user_id):
+    """Bazadan nusxa (lug'at) - bitta so'rov"""
+    row = (
+        CustomUser.objects.filter(pk=user_id)
+        .values(*USER_FIELDS, 'group__name', 'group__course_id', 'group__course__name')
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        **{field: row[field] for field in USER_FIELDS},
+        'group_name': row['group__name'],
+        'course_id': row['group__course_id'],
+        'course_name': row['group__course__name'],
+    }
+
+
+def user_from_principal(principal):
+    """Nusxadan ``CustomUser`` - ``user.group.course`` so'rovsiz ishlaydi"""
+    # from_db qiymatlarni modeldagi maydonlar tartibida kutadi
+    fields = [field.attname for field in CustomUser._meta.concrete_fields if field.attname in USER_FIELDS]
+    user = CustomUser.from_db('default', fields, [principal[field] for field in fields])
+    if principal['group_id'] is not None:
+        group = Group(id=principal['group_id'], name=principal['group_name'], course_id=principal['course_id'])
+        group.course = Course(id=principal['course_id'], name=principal['course_name'])
+        user.group = group
+    user.course_id = principal['course_id']
+    return user
+
+
+def get_principal(user_id):
+    cache = get_principal_cache()
+    if cache is None:
+        return build_principal(user_id)
+    key = get_principal_key(user_id)
+    principal = cache.get(key)
+    if principal is None:
+        principal = build_principal(user_id)
+        if principal is not None:
+            cache.set(key, principal, getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 300))
+    return principal
+
+
+def invalidate_principals(user_ids):
+    cache = get_principal_cache()
+    if cache is None:
+        return
+    try:
+        cache.delete_many([get_principal_key(user_id) for user_id in user_ids])
+    except Exception:
+        # Nusxa PRINCIPAL_CACHE_TIMEOUT dan keyin o'zi eskiradi
+        logger.exception("Principal keshidan o'chirishda xatolik (%s ta foydalanuvchi)", len(user_ids))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, lekin ``get_user`` keshdan"""
+
+    def get_user(self, user_id):
+        if get_principal_cache() is None:
+            return super().get_user(user_id)
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        try:
+            principal = get_principal(user_id)
+        except Exception:
+            logger.exception("Principal keshi ishlamayapti - foydalanuvchi bazadan olinadi")
+            return super().get_user(user_id)
+        if principal is None:
+            return None
+        user = user_from_principal(principal)
+        return user if self.user_can_authenticate(user) else None
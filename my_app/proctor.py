@@ -0,0 +1,62 @@
+"""Proktor uchun jonli imtihon holati: ulangan talabalar, javoblar
+gistogrammasi, topshirganlar soni va qolgan vaqt.
+
+Har bir jarayonning blok tickeri (exam_timer.py) har tickda shu jarayondagi
+talabalar gistogrammasini (answer_buffer.py da tayyor turadi)
+``proctor_<id>`` guruhiga bitta xabar qilib yuboradi. Proktor ulanishi
+jarayonlar xabarlarini birlashtiradi va mijozga har
+``PROCTOR_PUSH_INTERVAL`` soniyada bir marta yuboradi. Shunday qilib
+1000 talabali imtihonni kuzatish talabalar soniga bog'liq bo'lmagan
+yuklama beradi: jarayon boshiga bitta xabar va proktor boshiga bitta
+COUNT so'rovi.
+"""
+import time
+from collections import Counter
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .models import TestResult
+
+
+def get_proctor_group(block_id):
+    return f'proctor_{block_id}'
+
+
+def get_push_interval():
+    return getattr(settings, 'PROCTOR_PUSH_INTERVAL', 1)
+
+
+@database_sync_to_async
+def count_submitted(block_id):
+    return TestResult.objects.filter(test_block_id=block_id).count()
+
+
+def merge_snapshots(snapshots, max_age, now=None):
+    """Jarayonlar xabarlarini birlashtirish: {javoblar soni: talabalar}.
+
+    ``max_age`` soniyadan beri xabar yubormagan jarayon (talabalari qolmagan
+    yoki to'xtagan) hisobga olinmaydi.
+    """
+    now = time.monotonic() if now is None else now
+    answered = Counter()
+    for received_at, counts in snapshots.values():
+        if now - received_at <= max_age:
+            answered.update({int(count): students for count, students in counts.items()})
+    return answered
+
+
+def build_progress(block_info, answered, submitted, timer):
+    """Mijozga yuboriladigan xabar"""
+    question_count = block_info['question_count'] if block_info else 0
+    # histogram[i] - i ta savolga javob bergan ulangan talabalar
+    histogram = [0] * (question_count + 1)
+    for count, students in answered.items():
+        histogram[min(count, question_count)] += students
+    return {
+        'type': 'progress',
+        'connected': sum(answered.values()),
+        'histogram': histogram,
+        'submitted': submitted,
+        'remaining': timer['remaining'] if timer else None,
+    }
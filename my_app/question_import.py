@@ -0,0 +1,192 @@
+"""Test bloki uchun savollarni fayldan ommaviy import qilish.
+
+Qo'llab-quvvatlanadigan formatlar:
+
+* CSV - ustunlar: question_text, option_a, option_b, option_c, option_d, correct_answer
+* JSON - shu kalitli obyektlar massivi yoki har qatorda bitta obyekt (JSON Lines)
+* Matn::
+
+    1. Savol matni
+    A) birinchi variant
+    B) ikkinchi variant
+    C) uchinchi variant
+    D) to'rtinchi variant
+    Javob: B
+
+  Savollar bo'sh qator bilan ajratiladi; savol matni bir necha qatorli bo'lishi mumkin.
+
+Fayl oqim sifatida o'qiladi, har bir yozuv tekshiriladi va xatolar qator
+raqami bilan qaytariladi. Xato bo'lmasa savollar bitta tranzaksiyada
+``bulk_create`` bilan qo'shiladi. ``bulk_create`` signal chaqirmaydi,
+shuning uchun blokning savollar soni, tugash vaqti va versiyasi hamda
+blok ma'lumotlari keshi alohida yangilanadi.
+"""
+import codecs
+import csv
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Max
+
+from .block_info import invalidate_block_info
+from .models import Question, TestBlock
+
+FIELDS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+OPTION_FIELDS = {'A': 'option_a', 'B': 'option_b', 'C': 'option_c', 'D': 'option_d'}
+FORMATS = ('csv', 'json', 'txt')
+
+_OPTION_RE = re.compile(r'^([A-Da-d])\s*[).]\s*(.*)$')
+_ANSWER_RE = re.compile(r"^(?:javob|to'g'ri javob|answer)\s*[:\-]\s*([A-Da-d])\b", re.IGNORECASE)
+_NUMBER_RE = re.compile(r'^\d+\s*[).]\s*')
+
+
+class QuestionImportError(Exception):
+    """Faylda xatolar bor: ``errors`` - [(qator, xabar), ...]"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} ta xato")
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return {'jsonl': 'json', 'text': 'txt'}.get(extension, extension)
+
+
+def iter_text_lines(stream, encoding='utf-8-sig'):
+    """Baytli yoki matnli oqimdan to'liq qatorlar (fayl to'liq xotiraga o'qilmaydi)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ''
+    for chunk in stream:
+        pending += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        *complete, pending = pending.split('\n')
+        for line in complete:
+            yield line + '\n'
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+def parse_csv(lines):
+    reader = csv.DictReader(lines)
+    missing = [field for field in FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise QuestionImportError([(1, f"ustunlar yetishmaydi: {', '.join(missing)}")])
+    for row in reader:
+        yield reader.line_num, row
+
+
+def parse_json(lines):
+    """JSON massivi yoki JSON Lines - obyektlarni birma-bir ajratib olish"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    line = 1
+    started = False
+    for chunk in lines:
+        buffer += chunk
+        while True:
+            stripped = buffer.lstrip()
+            line += buffer.count('\n', 0, len(buffer) - len(stripped))
+            buffer = stripped
+            if not started and buffer.startswith('['):
+                buffer, started = buffer[1:], True
+                continue
+            if buffer.startswith((',', ']')):
+                buffer = buffer[1:]
+                continue
+            if not buffer:
+                break
+            try:
+                value, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                break  # obyekt hali to'liq o'qilmagan
+            yield line, value
+            line += buffer.count('\n', 0, end)
+            buffer = buffer[end:]
+    if buffer.strip():
+        yield line, None
+
+
+def parse_text(lines):
+    """Matn formatidagi savollar: bo'sh qator bilan ajratilgan bloklar"""
+    record, start, option = None, 0, None
+    for line_number, text in enumerate(lines, start=1):
+        text = text.strip()
+        if not text:
+            if record is not None:
+                yield start, record
+            record = None
+            continue
+        if record is None:
+            record, start, option = {'question_text': _NUMBER_RE.sub('', text, count=1)}, line_number, None
+            continue
+        answer = _ANSWER_RE.match(text)
+        option_match = _OPTION_RE.match(text)
+        if answer:
+            record['correct_answer'] = answer.group(1)
+        elif option_match:
+            option = OPTION_FIELDS[option_match.group(1).upper()]
+            record[option] = option_match.group(2)
+        elif option is None:
+            record['question_text'] += '\n' + text
+        else:
+            record[option] += ' ' + text
+    if record is not None:
+        yield start, record
+
+
+PARSERS = {'csv': parse_csv, 'json': parse_json, 'txt': parse_text}
+
+
+def validate_question(data):
+    """Bitta yozuvdan (Question maydonlari, xatolar)"""
+    if not isinstance(data, dict):
+        return None, ["savol obyekti kutilgan (JSON sintaksisini tekshiring)"]
+    values = {field: str(data.get(field) or '').strip() for field in FIELDS}
+    values['correct_answer'] = values['correct_answer'].upper()
+    errors = [f"'{field}' bo'sh" for field in FIELDS if not values[field]]
+    if values['correct_answer'] and values['correct_answer'] not in OPTION_FIELDS:
+        errors.append(f"to'g'ri javob A, B, C yoki D bo'lishi kerak: {values['correct_answer']}")
+    for letter, field in OPTION_FIELDS.items():
+        max_length = Question._meta.get_field(field).max_length
+        if len(values[field]) > max_length:
+            errors.append(f"{letter} variant {max_length} belgidan uzun")
+    return values, errors
+
+
+def parse_questions(stream, fmt):
+    """Fayldan (savollar, xatolar); xatolar - [(qator, xabar), ...]"""
+    if fmt not in PARSERS:
+        raise QuestionImportError([(0, f"Noma'lum format: {fmt or '-'}")])
+    questions, errors = [], []
+    try:
+        for line, data in PARSERS[fmt](iter_text_lines(stream)):
+            values, row_errors = validate_question(data)
+            if row_errors:
+                errors.extend((line, message) for message in row_errors)
+            else:
+                questions.append(values)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        errors.append((0, f"Faylni o'qib bo'lmadi: {exc}"))
+    if not questions and not errors:
+        errors.append((0, "Faylda savollar topilmadi"))
+    return questions, errors
+
+
+def import_questions(block, stream, fmt):
+    """Savollarni blok oxiriga qo'shish; xato bo'lsa hech narsa saqlanmaydi"""
+    questions, errors = parse_questions(stream, fmt)
+    if errors:
+        raise QuestionImportError(errors)
+    with transaction.atomic():
+        # Bir vaqtda ikki import bir xil tartib raqamlarini olmasligi uchun
+        list(TestBlock.objects.select_for_update().filter(pk=block.pk).only('pk'))
+        start = (block.questions.aggregate(Max('order'))['order__max'] or 0) + 1
+        created = Question.objects.bulk_create(
+            [Question(test_block=block, order=start + index, **values) for index, values in enumerate(questions)],
+            batch_size=1000,
+        )
+        TestBlock.adjust_question_count(block.pk, len(created))
+        transaction.on_commit(lambda: invalidate_block_info([block.pk]))
+    return created
@@ -0,0 +1,59 @@
+"""Admin panel hisobotlari uchun natijalarni filtrlash va sanash"""
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+RESULT_FILTERS = ('test', 'course', 'group', 'date_from', 'date_to')
+ID_FILTERS = ('test', 'course', 'group')
+MAX_ID = 2 ** 63 - 1  # BigAutoField chegarasi
+COUNT_CACHE_TIMEOUT = 60  # soniya
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_id(value):
+    # isdigit() '²' kabi belgilarni ham qabul qiladi - int() esa ularda yiqiladi
+    return value.isascii() and value.isdigit() and 0 < int(value) <= MAX_ID
+
+
+def get_result_filters(params):
+    """GET parametrlaridan faqat ma'lum filtrlar (bo'sh va noto'g'ri id qiymatlarsiz)"""
+    filters = {}
+    for name in RESULT_FILTERS:
+        value = params.get(name)
+        if value and (name not in ID_FILTERS or _is_id(value)):
+            filters[name] = value
+    return filters
+
+
+def filter_results(results, filters):
+    """Filtrlarni indekslangan ustunlar bo'yicha qo'llash (``get_result_filters`` natijasi)"""
+    if 'test' in filters:
+        results = results.filter(test_block_id=filters['test'])
+    if 'course' in filters:
+        results = results.filter(test_block__course_id=filters['course'])
+    if 'group' in filters:
+        results = results.filter(user__group_id=filters['group'])
+
+    # Sana oralig'i completed_at indeksidan foydalanishi uchun vaqt chegarasiga aylantiriladi
+    date_from = _parse_date(filters.get('date_from'))
+    if date_from:
+        results = results.filter(completed_at__gte=timezone.make_aware(datetime.combine(date_from, time.min)))
+    date_to = _parse_date(filters.get('date_to'))
+    if date_to:
+        results = results.filter(completed_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min)))
+    return results
+
+
+def cached_count(queryset, filters, prefix='results'):
+    """Filtrlar bo'yicha jami son (qisqa muddat keshlanadi)"""
+    key = '&'.join(f'{name}={filters[name]}' for name in sorted(filters))
+    cache_key = f'{prefix}_count:{hashlib.md5(key.encode()).hexdigest()}'
+    return cache.get_or_set(cache_key, queryset.count, COUNT_CACHE_TIMEOUT)
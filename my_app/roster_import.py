@@ -0,0 +1,168 @@
+"""O'quvchilar ro'yxatini (roster) CSV dan ommaviy ro'yxatga olish.
+
+CSV ustunlari: username, first_name, last_name, group, course (ixtiyoriy -
+bir xil nomli guruhlarni ajratish uchun), password (ixtiyoriy - bo'sh
+bo'lsa tasodifiy parol yaratiladi).
+
+Parollar PBKDF2 bilan xeshlanadi - bitta xesh yuzlab millisekund oladi,
+shuning uchun ``import_roster`` buyrug'i ularni chegaralangan jarayonlar
+hovuzida (ProcessPoolExecutor) parallel hisoblaydi. Admin sahifasidan
+import esa joriy oqimda xeshlaydi (so'rovni bajarayotgan worker ichida
+jarayonlar yaratilmaydi) va ``ROSTER_WEB_MAX_ROWS`` qatorgacha qabul
+qiladi - kattaroq ro'yxatlar buyruq orqali. Guruhlar nomi bo'yicha bitta so'rovda, mavjud usernamelar
+esa bitta ``username__in`` so'rovida aniqlanadi; foydalanuvchilar
+``bulk_create`` bilan bitta tranzaksiyada qo'shiladi.
+"""
+import csv
+import os
+import secrets
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import CustomUser, Group
+from .question_import import iter_text_lines
+
+REQUIRED_FIELDS = ['username', 'first_name', 'last_name', 'group']
+PASSWORD_ALPHABET = 'abcdefghjkmnpqrstuvwxyz23456789'  # chalkash belgilarsiz (l, 1, o, 0)
+PASSWORD_LENGTH = 8
+# Bundan kam parolda hovuz ishga tushirish xeshlashdan qimmatga tushadi
+MIN_PARALLEL = 8
+MAX_WORKERS = 8  # hovuzdagi jarayonlar chegarasi
+
+Credential = namedtuple('Credential', ['username', 'full_name', 'group', 'course', 'password'])
+RosterReport = namedtuple('RosterReport', ['created', 'credentials', 'duplicates'])
+
+
+class RosterImportError(Exception):
+    """Faylda xatolar bor: ``errors`` - [(qator, xabar), ...]"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} ta xato")
+
+
+class RosterTooLargeError(Exception):
+    """Ro'yxat veb shakl uchun juda katta"""
+
+    def __init__(self, rows, max_rows):
+        self.rows = rows
+        self.max_rows = max_rows
+        super().__init__(f"{rows} ta qator, ko'pi bilan {max_rows}")
+
+
+def get_web_max_rows():
+    """Admin sahifasidan bir martada import qilinadigan qatorlar (xeshlash so'rov ichida)"""
+    return getattr(settings, 'ROSTER_WEB_MAX_ROWS', 100)
+
+
+def generate_password(length=PASSWORD_LENGTH):
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+def get_default_workers():
+    """Buyruq uchun hovuz hajmi: CPU soni, lekin ``MAX_WORKERS`` dan oshmaydi"""
+    return min(os.cpu_count() or 1, MAX_WORKERS)
+
+
+def hash_passwords(passwords, workers=1):
+    """Parollarni xeshlash; ``workers`` > 1 bo'lsa jarayonlar hovuzida (faqat buyruqdan)"""
+    workers = min(workers, MAX_WORKERS)
+    if workers <= 1 or len(passwords) < MIN_PARALLEL:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(make_password, passwords, chunksize=chunksize))
+
+
+def read_roster(stream):
+    """CSV dan [(qator, {ustun: qiymat}), ...]"""
+    reader = csv.DictReader(iter_text_lines(stream))
+    missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or [])]
+    if missing:
+        raise RosterImportError([(1, f"ustunlar yetishmaydi: {', '.join(missing)}")])
+    return [
+        (reader.line_num, {key: (value or '').strip() for key, value in row.items() if key})
+        for row in reader
+    ]
+
+
+def resolve_groups(rows):
+    """Guruhlarni nomi bo'yicha bitta so'rovda topish: {(nom, kurs): [Group, ...]}"""
+    names = {row['group'] for _, row in rows if row['group']}
+    groups = {}
+    for group in Group.objects.filter(name__in=names).select_related('course'):
+        groups.setdefault((group.name, ''), []).append(group)
+        groups.setdefault((group.name, group.course.name), []).append(group)
+    return groups
+
+
+def import_roster(stream, workers=1, max_rows=None):
+    """Ro'yxatni tekshirib saqlash; xato bo'lsa hech kim qo'shilmaydi.
+
+    Bazada allaqachon bor usernamelar xato emas - ular o'tkazib yuboriladi
+    va ``duplicates`` da qaytariladi. ``max_rows`` dan ko'p qatorli fayl
+    ``RosterTooLargeError`` bilan rad etiladi.
+    """
+    rows = read_roster(stream)
+    if max_rows is not None and len(rows) > max_rows:
+        raise RosterTooLargeError(len(rows), max_rows)
+    groups = resolve_groups(rows)
+    existing = set(
+        CustomUser.objects.filter(username__in=[row['username'] for _, row in rows]).values_list('username', flat=True)
+    )
+
+    errors, duplicates, accepted, seen = [], [], [], {}
+    for line, row in rows:
+        row_errors = [f"'{field}' bo'sh" for field in REQUIRED_FIELDS if not row.get(field)]
+        if row['username']:
+            try:
+                CustomUser.username_validator(row['username'])
+            except ValidationError:
+                row_errors.append(f"username noto'g'ri: {row['username']}")
+            if row['username'] in seen:
+                row_errors.append(f"username faylda takrorlangan ({seen[row['username']]}-qator bilan)")
+            seen.setdefault(row['username'], line)
+        matches = groups.get((row['group'], row.get('course', '')), []) if row['group'] else []
+        if row['group'] and not matches:
+            row_errors.append(f"guruh topilmadi: {row['group']}")
+        elif len(matches) > 1:
+            row_errors.append(f"'{row['group']}' nomli guruh bir nechta kursda bor - course ustunini to'ldiring")
+
+        if row_errors:
+            errors.extend((line, message) for message in row_errors)
+        elif row['username'] in existing:
+            duplicates.append((line, row['username']))
+        else:
+            accepted.append((row, matches[0]))
+    if errors:
+        raise RosterImportError(errors)
+
+    passwords = [row.get('password') or generate_password() for row, _ in accepted]
+    hashes = hash_passwords(passwords, workers=workers)
+    users = [
+        CustomUser(
+            username=row['username'], first_name=row['first_name'], last_name=row['last_name'],
+            group=group, password=password_hash,
+        )
+        for (row, group), password_hash in zip(accepted, hashes)
+    ]
+    with transaction.atomic():
+        created = CustomUser.objects.bulk_create(users, batch_size=1000)
+
+    credentials = [
+        Credential(user.username, user.get_full_name(), group.name, group.course.name, password)
+        for user, (_, group), password in zip(created, accepted, passwords)
+    ]
+    return RosterReport(created, credentials, duplicates)
+
+
+def write_credentials_csv(credentials, f):
+    writer = csv.writer(f)
+    writer.writerow(['Username', 'Ism Familiya', 'Guruh', 'Kurs', 'Parol'])
+    for credential in credentials:
+        writer.writerow([credential.username, credential.full_name, credential.group, credential.course, credential.password])
@@ -3,4 +3,5 @@ from . import consumers
 
 websocket_urlpatterns = [
     re_path(r'ws/test/(?P<block_id>\w+)/$', consumers.TestConsumer.as_asgi()),
+    re_path(r'ws/proctor/(?P<block_id>\d+)/$', consumers.ProctorConsumer.as_asgi()),
 ]
@@ -0,0 +1,63 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .block_info import invalidate_block_info
+from .models import Course, CustomUser, Group, Question, TestBlock
+from .principal import invalidate_principals
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, raw=False, **kwargs):
+    """Savol qo'shilganda, tahrirlanganda yoki ko'chirilganda blokni yangilash"""
+    if raw:
+        return
+    original_block_id = getattr(instance, '_original_test_block_id', None)
+    if created:
+        TestBlock.adjust_question_count(instance.test_block_id, 1)
+    elif original_block_id is not None and original_block_id != instance.test_block_id:
+        TestBlock.adjust_question_count(original_block_id, -1)
+        TestBlock.adjust_question_count(instance.test_block_id, 1)
+    else:
+        TestBlock.bump_version(instance.test_block_id)
+    block_ids = {instance.test_block_id, original_block_id} - {None}
+    transaction.on_commit(lambda: invalidate_block_info(block_ids))
+    instance._original_test_block_id = instance.test_block_id
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    """Savol o'chirilganda blok savollar sonini kamaytirish"""
+    block_id = getattr(instance, '_original_test_block_id', None) or instance.test_block_id
+    TestBlock.adjust_question_count(block_id, -1)
+    transaction.on_commit(lambda: invalidate_block_info([block_id]))
+
+
+@receiver(post_save, sender=TestBlock)
+@receiver(post_delete, sender=TestBlock)
+def block_changed(sender, instance, raw=False, **kwargs):
+    """Blok tahrirlansa WebSocket ulanishlari uchun keshlangan ma'lumotni o'chirish"""
+    if raw:
+        return
+    transaction.on_commit(lambda: invalidate_block_info([instance.pk]))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, raw=False, **kwargs):
+    """Foydalanuvchi o'zgarsa keshlangan nusxasini o'chirish"""
+    if raw:
+        return
+    transaction.on_commit(lambda: invalidate_principals([instance.pk]))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Course)
+def group_or_course_changed(sender, instance, raw=False, created=False, **kwargs):
+    """Guruh yoki kurs nomi nusxalarda ham bor - a'zolarining nusxalarini o'chirish"""
+    if raw or created:
+        return
+    lookup = {'group': instance} if sender is Group else {'group__course': instance}
+    user_ids = list(CustomUser.objects.filter(**lookup).values_list('id', flat=True))
+    transaction.on_commit(lambda: invalidate_principals(user_ids))
+
@@ -0,0 +1,302 @@
+"""Test topshiriqlari navbati (write-behind).
+
+Imtihon vaqti tugaganda barcha talabalar bir necha soniya ichida
+``submit_test`` ga murojaat qiladi. Navbat yoqilganda view javoblarni
+faqat navbatga yozadi va darhol kvitansiya qaytaradi; ``process_submissions``
+worker esa navbatni partiyalab baholaydi va ``save_submissions`` orqali
+saqlaydi. Natija tayyor bo'lguncha talaba sahifasi holatni so'rab turadi.
+
+Ikki backend bor: ma'lumotlar bazasidagi jadval (standart) va Redis.
+"""
+import json
+import logging
+import time
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .grading import save_submissions
+from .item_analysis import refresh_item_analysis
+from .models import CustomUser, QueuedSubmission, TestBlock, TestResult
+
+logger = logging.getLogger(__name__)
+
+QueuedItem = namedtuple('QueuedItem', ['receipt', 'user_id', 'block_id', 'answers', 'time_spent'])
+
+BACKENDS = {
+    'database': 'my_app.submission_queue.DatabaseSubmissionQueue',
+    'redis': 'my_app.submission_queue.RedisSubmissionQueue',
+}
+
+
+class DatabaseSubmissionQueue:
+    """Navbat ``QueuedSubmission`` jadvalida"""
+
+    def enqueue(self, user_id, block_id, answers, time_spent=0):
+        """Topshiriqni navbatga qo'yish; takroriy yuborishda avvalgi kvitansiya qaytadi.
+
+        Avvalgisi xato bilan tugagan (FAILED) bo'lsa, u yangi javoblar bilan
+        navbatga qaytariladi - talaba qayta topshira oladi.
+        """
+        try:
+            with transaction.atomic():
+                submission = QueuedSubmission.objects.create(
+                    user_id=user_id, test_block_id=block_id, answers=answers, time_spent=time_spent
+                )
+        except IntegrityError:
+            submission = QueuedSubmission.objects.only('id').get(user_id=user_id, test_block_id=block_id)
+            QueuedSubmission.objects.filter(id=submission.id, status=QueuedSubmission.FAILED).update(
+                status=QueuedSubmission.PENDING, answers=answers, time_spent=time_spent,
+                claimed_by='', claimed_at=None, error='', processed_at=None,
+            )
+        return str(submission.id)
+
+    def status(self, receipt, user_id):
+        if not receipt.isdigit():
+            return None
+        row = QueuedSubmission.objects.filter(id=receipt, user_id=user_id).values('status', 'test_block_id', 'error').first()
+        if row is None:
+            return None
+        # Natija (user, test_block) bo'yicha yagona, shuning uchun alohida saqlanmaydi
+        result_id = None
+        if row['status'] == QueuedSubmission.DONE:
+            result_id = TestResult.objects.filter(user_id=user_id, test_block_id=row['test_block_id']).values_list('id', flat=True).first()
+        return {'status': row['status'], 'result_id': result_id, 'error': row['error']}
+
+    def claim(self, batch_size):
+        """Navbatdan ``batch_size`` tagacha topshiriqni olish"""
+        token = uuid.uuid4().hex
+        with transaction.atomic():
+            ids = list(
+                QueuedSubmission.objects.filter(status=QueuedSubmission.PENDING)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            QueuedSubmission.objects.filter(id__in=ids, status=QueuedSubmission.PENDING).update(
+                status=QueuedSubmission.PROCESSING, claimed_by=token, claimed_at=timezone.now()
+            )
+        rows = QueuedSubmission.objects.filter(claimed_by=token, status=QueuedSubmission.PROCESSING).values_list(
+            'id', 'user_id', 'test_block_id', 'answers', 'time_spent'
+        )
+        return [QueuedItem(str(row[0]), *row[1:]) for row in rows]
+
+    def complete(self, results):
+        """{kvitansiya: result_id} - baholangan topshiriqlarni belgilash"""
+        QueuedSubmission.objects.filter(id__in=list(results)).update(
+            status=QueuedSubmission.DONE, processed_at=timezone.now()
+        )
+
+    def fail(self, receipts, error):
+        QueuedSubmission.objects.filter(id__in=list(receipts)).update(
+            status=QueuedSubmission.FAILED, error=error, processed_at=timezone.now()
+        )
+
+    def depth(self):
+        return QueuedSubmission.objects.filter(status=QueuedSubmission.PENDING).count()
+
+    def requeue_stale(self, seconds):
+        """Ishlov berish paytida to'xtab qolgan topshiriqlarni navbatga qaytarish"""
+        return QueuedSubmission.objects.filter(
+            status=QueuedSubmission.PROCESSING, claimed_at__lt=timezone.now() - timedelta(seconds=seconds)
+        ).update(status=QueuedSubmission.PENDING, claimed_by='')
+
+
+class RedisSubmissionQueue:
+    """Navbat Redis ro'yxatida, holatlar esa hash larda"""
+
+    # Ro'yxat boshidan N ta elementni olib, "processing" ro'yxatiga atomar ko'chirish;
+    # olingan vaqt (Redis soati) ZSET da
+    CLAIM_SCRIPT = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('LTRIM', KEYS[1], #items, -1)
+    redis.call('RPUSH', KEYS[2], unpack(items))
+    local now = redis.call('TIME')[1]
+    for _, item in ipairs(items) do
+        redis.call('ZADD', KEYS[3], now, item)
+    end
+end
+return items
+"""
+
+    # ARGV[1] soniyadan oldin olingan elementlarni navbat boshiga qaytarish. Vaqti
+    # yozilmagan elementlar (eski versiya) hozir olingan deb hisoblanadi
+    REQUEUE_SCRIPT = """
+local now = tonumber(redis.call('TIME')[1])
+for _, item in ipairs(redis.call('LRANGE', KEYS[2], 0, -1)) do
+    redis.call('ZADD', KEYS[3], 'NX', now, item)
+end
+local items = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', '(' .. (now - tonumber(ARGV[1])))
+local moved = 0
+for _, item in ipairs(items) do
+    redis.call('ZREM', KEYS[3], item)
+    if redis.call('LREM', KEYS[2], 1, item) > 0 then
+        redis.call('LPUSH', KEYS[1], item)
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+    def __init__(self, url=None, prefix='exam:submissions'):
+        import redis
+
+        self.redis = redis.Redis.from_url(url or getattr(settings, 'SUBMISSION_QUEUE_REDIS_URL', 'redis://localhost:6379/0'))
+        self.prefix = prefix
+        self.pending_key = f'{prefix}:pending'
+        self.processing_key = f'{prefix}:processing'
+        self.claimed_at_key = f'{prefix}:claimed_at'
+        self._claim = self.redis.register_script(self.CLAIM_SCRIPT)
+        self._requeue = self.redis.register_script(self.REQUEUE_SCRIPT)
+
+    def _status_key(self, receipt):
+        return f'{self.prefix}:status:{receipt}'
+
+    def _owner_key(self, user_id, block_id):
+        return f'{self.prefix}:owner:{block_id}:{user_id}'
+
+    def enqueue(self, user_id, block_id, answers, time_spent=0):
+        receipt = uuid.uuid4().hex
+        owner_key = self._owner_key(user_id, block_id)
+        if not self.redis.set(owner_key, receipt, nx=True):
+            return self.redis.get(owner_key).decode()
+        payload = json.dumps([receipt, user_id, block_id, answers, time_spent])
+        with self.redis.pipeline() as pipe:
+            pipe.hset(self._status_key(receipt), mapping={'status': QueuedSubmission.PENDING, 'user_id': user_id})
+            pipe.rpush(self.pending_key, payload)
+            pipe.execute()
+        return receipt
+
+    def status(self, receipt, user_id):
+        data = {key.decode(): value.decode() for key, value in self.redis.hgetall(self._status_key(receipt)).items()}
+        if not data or data.get('user_id') != str(user_id):
+            return None
+        return {
+            'status': data['status'],
+            'result_id': int(data['result_id']) if data.get('result_id') else None,
+            'error': data.get('error', ''),
+        }
+
+    def claim(self, batch_size):
+        items = self._claim(keys=[self.pending_key, self.processing_key, self.claimed_at_key], args=[batch_size])
+        self._claimed = {json.loads(item)[0]: item for item in items}
+        return [QueuedItem(*json.loads(item)) for item in items]
+
+    def _finish(self, receipts, mapping):
+        with self.redis.pipeline() as pipe:
+            for receipt in receipts:
+                pipe.hset(self._status_key(receipt), mapping=mapping(receipt))
+                payload = getattr(self, '_claimed', {}).pop(receipt, None)
+                if payload is not None:
+                    pipe.lrem(self.processing_key, 1, payload)
+                    pipe.zrem(self.claimed_at_key, payload)
+            pipe.execute()
+
+    def complete(self, results):
+        self._finish(results, lambda receipt: {'status': QueuedSubmission.DONE, 'result_id': results[receipt]})
+
+    def fail(self, receipts, error):
+        # Egalik kaliti o'chiriladi - keyingi yuborish yangi kvitansiya bilan navbatga tushadi
+        claimed = getattr(self, '_claimed', {})
+        items = [QueuedItem(*json.loads(claimed[receipt])) for receipt in receipts if receipt in claimed]
+        self._finish(receipts, lambda receipt: {'status': QueuedSubmission.FAILED, 'error': error})
+        if items:
+            self.redis.delete(*[self._owner_key(item.user_id, item.block_id) for item in items])
+
+    def depth(self):
+        return self.redis.llen(self.pending_key)
+
+    def requeue_stale(self, seconds):
+        """``seconds`` soniyadan beri baholanayotganlarni (to'xtagan worker) navbatga qaytarish.
+
+        Boshqa workerlar hozir ishlayotgan yangi elementlarga tegilmaydi.
+        """
+        keys = [self.pending_key, self.processing_key, self.claimed_at_key]
+        return self._requeue(keys=keys, args=[seconds])
+
+
+def get_submission_queue():
+    backend = getattr(settings, 'SUBMISSION_QUEUE_BACKEND', 'database')
+    return import_string(BACKENDS.get(backend, backend))()
+
+
+def save_each(queue, block, items, users):
+    """Partiya yiqilganda har bir topshiriqni alohida saqlash - faqat xatolisi FAILED bo'ladi"""
+    done = {}
+    for item in items:
+        try:
+            result, = save_submissions(block, [(users[item.user_id], item.answers, item.time_spent)])
+        except Exception as exc:
+            logger.exception("Topshiriqni saqlashda xatolik (kvitansiya %s)", item.receipt)
+            queue.fail([item.receipt], str(exc))
+        else:
+            done[item.receipt] = result.id
+    return done
+
+
+def process_batch(queue, batch_size=200):
+    """Navbatdan bitta partiyani baholab saqlash; ishlangan topshiriqlar sonini qaytaradi"""
+    items = queue.claim(batch_size)
+    if not items:
+        return 0
+
+    by_block = {}
+    for item in items:
+        by_block.setdefault(item.block_id, []).append(item)
+    users = CustomUser.objects.in_bulk({item.user_id for item in items})
+    blocks = TestBlock.objects.in_bulk(list(by_block))
+
+    for block_id, block_items in by_block.items():
+        receipts = [item.receipt for item in block_items]
+        block = blocks.get(block_id)
+        if block is None:
+            queue.fail(receipts, "Test bloki topilmadi")
+            continue
+        try:
+            existing = dict(
+                TestResult.objects.filter(test_block=block, user_id__in=[item.user_id for item in block_items])
+                .values_list('user_id', 'id')
+            )
+            done = {item.receipt: existing[item.user_id] for item in block_items if item.user_id in existing}
+            pending = [item for item in block_items if item.user_id not in existing and item.user_id in users]
+            try:
+                results = save_submissions(
+                    block, [(users[item.user_id], item.answers, item.time_spent) for item in pending]
+                )
+                done.update((item.receipt, result.id) for item, result in zip(pending, results))
+            except Exception:
+                logger.exception("Partiyani saqlashda xatolik (blok %s) - topshiriqlar alohida saqlanadi", block_id)
+                done.update(save_each(queue, block, pending, users))
+            queue.complete(done)
+            if pending:
+                refresh_item_analysis(block)
+            missing = [item.receipt for item in block_items if item.user_id not in existing and item.user_id not in users]
+            if missing:
+                queue.fail(missing, "Foydalanuvchi topilmadi")
+        except Exception as exc:
+            logger.exception("Topshiriqlarni saqlashda xatolik (blok %s)", block_id)
+            queue.fail(receipts, str(exc))
+    return len(items)
+
+
+def run_worker(queue=None, batch_size=200, interval=0.5, once=False, stale_after=300):
+    """Navbatni doimiy bo'shatib turish"""
+    queue = queue or get_submission_queue()
+    queue.requeue_stale(stale_after)
+    while True:
+        started = time.perf_counter()
+        processed = process_batch(queue, batch_size)
+        if processed:
+            elapsed = time.perf_counter() - started
+            logger.info(
+                "submissions processed=%d seconds=%.3f rate=%.1f/s depth=%d",
+                processed, elapsed, processed / elapsed, queue.depth(),
+            )
+        if once and not processed:
+            return
+        if not processed:
+            time.sleep(interval)
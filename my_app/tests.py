@@ -1,3 +1,1498 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command, load_command_class
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .answer_vector import decode_answers, encode_answers, encode_layout
+from . import answer_archive, answer_buffer, block_info, exam_paper, exam_tickets, exam_timer, grading, leaderboard, roster_import
+from .checks import check_shared_caches, check_shared_leaderboard
+from .consumers import ProctorConsumer, TestConsumer
+from .db_router import ReportingReplicaRouter, reporting_view
+from .item_analysis import refresh_item_analysis
+from .principal import get_principal
+from .instrumentation import QueryBudgetMixin, normalize_sql
+from .middleware import RequestInstrumentationMiddleware
+from .submission_queue import DatabaseSubmissionQueue, process_batch
+from .models import (
+    CustomUser, Course, Group, TestBlock, Question, TestResult, UserAnswer, QueuedSubmission, QuestionAnalysis,
+    AnswerDraft, AnswerArchive,
+)
+
+
+def create_block(course, questions=3, **kwargs):
+    """Savollari bilan test bloki yaratish"""
+    kwargs.setdefault('title', 'Blok')
+    kwargs.setdefault('start_time', timezone.now() - timedelta(minutes=1))
+    block = TestBlock.objects.create(course=course, **kwargs)
+    for i in range(questions):
+        Question.objects.create(
+            test_block=block,
+            question_text=f'Savol {i}',
+            option_a='a', option_b='b', option_c='c', option_d='d',
+            correct_answer='ABCD'[i % 4],
+            order=i,
+        )
+    return block
+
+
+# Replika testda asosiy bazaning ko'zgusi, lekin boshqa ulanish tranzaksiyadagi
+# test ma'lumotlarini ko'rmaydi - hisobotlar testlarda asosiy bazadan o'qiydi.
+# Umumiy kesh va reyting (Redis) o'rniga testlarda jarayon ichidagilari
+@override_settings(
+    EXAM_PAPER_CACHE='default', REPORTING_DATABASE='default', SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_CACHE_ALIAS='default', PRINCIPAL_CACHE='default', LEADERBOARD_BACKEND='memory',
+)
+class ExamTestCase(TestCase):
+    """Kurs, guruh va talaba bilan umumiy sozlash"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(name='Kurs')
+        cls.group = Group.objects.create(name='101', course=cls.course)
+        cls.student = CustomUser.objects.create_user(
+            username='talaba', password='parol', first_name='Ali', last_name='Valiyev', group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        grading.clear_answer_keys()
+        leaderboard.clear_leaderboards()
+        block_info.clear_block_info()
+        answer_buffer.clear_answer_buffer()
+        self.client.force_login(self.student)
+        get_principal(self.student.id)
+
+    def submit(self, block, answers, time_spent=30, key=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post(
+            reverse('submit_test', args=[block.id]),
+            data=json.dumps({'answers': answers, 'time_spent': time_spent}),
+            content_type='application/json',
+            headers=headers,
+        )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+
+class DashboardQueryTest(ExamTestCase):
+    def test_query_count_does_not_depend_on_block_count(self):
+        block = create_block(self.course)
+        TestResult.objects.create(user=self.student, test_block=block, total_questions=3)
+        small = self.count_queries(reverse('dashboard'))
+
+        for i in range(10):
+            create_block(self.course, questions=5, title=f'Blok {i}')
+        create_block(self.course, start_time=timezone.now() + timedelta(days=1))
+        create_block(self.course, start_time=timezone.now() - timedelta(days=1))
+        large = self.count_queries(reverse('dashboard'))
+
+        self.assertEqual(small, large)
+
+    def test_block_statuses(self):
+        done = create_block(self.course, title='Topshirilgan')
+        result = TestResult.objects.create(user=self.student, test_block=done, total_questions=3)
+        create_block(self.course, title='Yopiq', start_time=timezone.now() + timedelta(days=1))
+        create_block(self.course, title='Tugagan', start_time=timezone.now() - timedelta(days=1))
+        create_block(self.course, title='Ochiq')
+
+        response = self.client.get(reverse('dashboard'))
+        statuses = {item['block'].title: item for item in response.context['blocks_data']}
+
+        self.assertTrue(statuses['Topshirilgan']['completed'])
+        self.assertEqual(statuses['Topshirilgan']['result_id'], result.id)
+        self.assertFalse(statuses['Topshirilgan']['can_take'])
+        self.assertTrue(statuses['Yopiq']['is_locked'])
+        self.assertTrue(statuses['Tugagan']['is_expired'])
+        self.assertTrue(statuses['Ochiq']['can_take'])
+        self.assertEqual(statuses['Ochiq']['question_count'], 3)
+
+    def test_take_test_uses_block_status(self):
+        block = create_block(self.course)
+        response = self.client.get(reverse('take_test', args=[block.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_time'], 3 * block.time_per_question * 60)
+
+        TestResult.objects.create(user=self.student, test_block=block, total_questions=3)
+        response = self.client.get(reverse('take_test', args=[block.id]))
+        self.assertRedirects(response, reverse('dashboard'))
+
+
+class QuestionCountTest(ExamTestCase):
+    def assertCount(self, block, count):
+        block.refresh_from_db()
+        self.assertEqual(block.question_count, count)
+        self.assertEqual(block.end_time, block.start_time + timedelta(minutes=count * block.time_per_question))
+
+    def test_count_follows_question_changes(self):
+        block = create_block(self.course, questions=3)
+        other = create_block(self.course, questions=0)
+        self.assertCount(block, 3)
+
+        question = block.questions.first()
+        question.test_block = other
+        question.save()
+        self.assertCount(block, 2)
+        self.assertCount(other, 1)
+
+        question.delete()
+        self.assertCount(other, 0)
+
+        block.questions.all().delete()
+        self.assertCount(block, 0)
+
+    def test_stale_instance_keeps_count(self):
+        block = create_block(self.course, questions=0)
+        Question.objects.create(test_block=block, question_text='Yangi', option_a='a', option_b='b', option_c='c',
+                                option_d='d', correct_answer='A')
+        block.title = 'Yangi nom'
+        block.save()
+        self.assertEqual(block.question_count, 1)
+        self.assertCount(block, 1)
+        block.time_per_question = 5
+        block.save(update_fields=['time_per_question'])
+        self.assertCount(block, 1)
+
+    def test_admin_views_update_count(self):
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        self.client.force_login(admin)
+        block = create_block(self.course, questions=1)
+
+        self.client.post(reverse('admin_add_question', args=[block.id]), {
+            'question_text': 'Yangi', 'option_a': 'a', 'option_b': 'b', 'option_c': 'c', 'option_d': 'd',
+            'correct_answer': 'A', 'order': 2,
+        })
+        self.assertCount(block, 2)
+
+        question = block.questions.first()
+        self.client.post(reverse('admin_delete_question', args=[question.id]))
+        self.assertCount(block, 1)
+
+    def test_time_window_checks_run_no_queries(self):
+        block = TestBlock.objects.get(pk=create_block(self.course).pk)
+        with self.assertNumQueries(0):
+            block.get_end_time()
+            block.is_expired()
+            block.can_take_test()
+
+    def test_recount_command_repairs_counts(self):
+        block = create_block(self.course, questions=4)
+        TestBlock.objects.filter(pk=block.pk).update(question_count=0, end_time=None)
+        call_command('recount_questions', stdout=StringIO())
+        self.assertCount(block, 4)
+
+
+class ExamPaperCacheTest(ExamTestCase):
+    def test_paper_has_no_correct_answers(self):
+        block = create_block(self.course)
+        paper = exam_paper.get_exam_paper(block)
+        self.assertEqual(len(paper['questions']), 3)
+        self.assertNotIn('correct_answer', paper['questions'][0])
+        self.assertIn('Savol 0', paper['html'])
+
+    def test_warm_take_test_skips_question_queries(self):
+        block = create_block(self.course)
+        url = reverse('take_test', args=[block.id])
+        cold = self.count_queries(url)
+        warm = self.count_queries(url)
+        self.assertEqual(warm, cold - 1)
+
+    def test_editing_questions_or_block_changes_paper(self):
+        block = create_block(self.course)
+        exam_paper.get_exam_paper(block)
+
+        question = block.questions.first()
+        question.question_text = 'Tahrirlangan savol'
+        question.save()
+        block.refresh_from_db()
+        self.assertIn('Tahrirlangan savol', exam_paper.get_exam_paper(block)['html'])
+
+        version = block.version
+        block.title = 'Yangi nom'
+        block.save()
+        self.assertEqual(block.version, version + 1)
+
+    def test_concurrent_misses_build_once(self):
+        block = create_block(self.course)
+        paper = exam_paper.build_exam_paper(block)
+
+        def slow_build(block):
+            threading.Event().wait(0.1)
+            return paper
+
+        with mock.patch.object(exam_paper, 'build_exam_paper', side_effect=slow_build) as build:
+            threads = [threading.Thread(target=exam_paper.get_exam_paper, args=[block]) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(build.call_count, 1)
+
+
+class SubmitTestTest(ExamTestCase):
+    def test_grades_and_saves_answers(self):
+        block = create_block(self.course, questions=4)
+        ids = list(block.questions.values_list('id', flat=True))
+        response = self.submit(block, {str(ids[0]): 'A', str(ids[1]): 'A', str(ids[2]): 'X'})
+
+        data = response.json()
+        self.assertEqual((data['correct'], data['total'], data['score']), (1, 4, 25))
+        result = TestResult.objects.get(pk=data['result_id'])
+        self.assertEqual(result.time_spent, 30)
+        vector = decode_answers(result.answer_vector)
+        self.assertEqual(list(vector.question_ids), ids)
+        self.assertEqual(vector.selected, b'AA--')
+        self.assertEqual(list(vector.correct_mask), [True, False, False, False])
+        self.assertFalse(UserAnswer.objects.exists())
+
+    @override_settings(STORE_USER_ANSWER_ROWS=True)
+    def test_optional_user_answer_rows(self):
+        block = create_block(self.course, questions=4)
+        ids = list(block.questions.values_list('id', flat=True))
+        self.submit(block, {str(ids[0]): 'A', str(ids[1]): 'A'})
+        self.assertEqual(
+            sorted(UserAnswer.objects.filter(user=self.student).values_list('question_id', 'is_correct')),
+            [(ids[0], True), (ids[1], False)],
+        )
+
+    def test_non_string_letters_are_blank(self):
+        block = create_block(self.course, questions=4)
+        ids = list(block.questions.values_list('id', flat=True))
+        answer_key = grading.compile_answer_key(block)
+        encoded = answer_key.encode({str(ids[0]): ['A'], str(ids[1]): {'B': 1}, str(ids[2]): None, str(ids[3]): 'D'})
+        self.assertEqual(encoded, b'---D')
+
+    def test_answer_key_is_cached_per_version(self):
+        block = create_block(self.course)
+        grading.compile_answer_key(block)
+        with self.assertNumQueries(0):
+            grading.compile_answer_key(block)
+
+        question = block.questions.first()
+        question.correct_answer = 'D'
+        question.save()
+        block.refresh_from_db()
+        self.assertEqual(grading.compile_answer_key(block).letters, b'DBC')
+
+    def test_answer_vector_round_trip(self):
+        question_ids = [7, 8, 9, 300, 2, 100000]
+        data = encode_answers(encode_layout(question_ids), b'AB--DC', [True, False, False, False, True, True])
+        vector = decode_answers(data)
+        self.assertEqual(vector.question_ids, tuple(question_ids))
+        self.assertEqual(vector.answers(), {'7': 'A', '8': 'B', '2': 'D', '100000': 'C'})
+        self.assertEqual(list(vector.correct_mask), [True, False, False, False, True, True])
+        self.assertLess(len(data), 2 * len(question_ids) + 10)
+
+    def test_backfill_migration_writes_current_format(self):
+        migration = importlib.import_module('my_app.migrations.0012_testresult_answer_vector')
+        question_ids = [5, 3, 400, 401, 9]
+        layout = migration.encode_layout(question_ids)
+        self.assertEqual(layout, encode_layout(question_ids))
+        mask = [True, False, True, True, False]
+        self.assertEqual(migration.encode_answers(layout, b'AB-CD', mask), encode_answers(layout, b'AB-CD', mask))
+
+    def test_result_page_reads_vector_after_questions_change(self):
+        block = create_block(self.course, questions=3)
+        first, second, third = block.questions.all()
+        result = grading.save_submission(self.student, block, {str(first.id): 'A', str(third.id): 'A'})
+        second.delete()
+        create_block(self.course)
+        Question.objects.create(test_block=block, question_text='Yangi', option_a='a', option_b='b', option_c='c',
+                                option_d='d', correct_answer='A', order=-1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('view_result', args=[result.id]))
+        self.assertFalse([query for query in ctx.captured_queries if 'my_app_useranswer' in query['sql']])
+        answers = [(answer.question.pk, answer.selected_answer, answer.is_correct) for answer in response.context['user_answers']]
+        self.assertEqual(answers, [(first.id, 'A', True), (third.id, 'A', False)])
+
+    def test_failed_submission_writes_nothing(self):
+        block = create_block(self.course)
+        ids = list(block.questions.values_list('id', flat=True))
+        with mock.patch.object(TestResult.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                grading.save_submission(self.student, block, {str(ids[0]): 'A'})
+        self.assertFalse(UserAnswer.objects.exists())
+
+
+class IdempotentSubmitTest(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.block = create_block(self.course)
+        self.ids = list(self.block.questions.values_list('id', flat=True))
+
+    def test_retry_with_same_key_returns_original_result(self):
+        first = self.submit(self.block, {str(self.ids[0]): 'A'}, key='urinish-1').json()
+        with mock.patch('my_app.views.save_submission') as save, self.assertNumQueries(2):
+            # Qayta yuborishda boshqa javoblar ham kelsa - asl natija o'zgarmaydi
+            retry = self.submit(self.block, {str(self.ids[1]): 'B'}, key='urinish-1').json()
+        save.assert_not_called()
+        self.assertEqual(retry, first)
+        result = TestResult.objects.get()
+        self.assertEqual(result.submission_key, 'urinish-1')
+        self.assertEqual(decode_answers(result.answer_vector).answers(), {str(self.ids[0]): 'A'})
+
+    def test_other_key_is_already_submitted(self):
+        self.submit(self.block, {}, key='urinish-1')
+        self.assertRedirects(self.submit(self.block, {}, key='urinish-2'), reverse('dashboard'))
+        self.assertRedirects(self.submit(self.block, {}), reverse('dashboard'))
+
+    def test_concurrent_retry_is_resolved_by_constraint(self):
+        first = self.submit(self.block, {str(self.ids[0]): 'A'}, key='urinish-1').json()
+        submitted = grading.get_submission(self.student.id, self.block.id)
+        # Ikkinchi so'rov natija yozilmasdan oldin tekshiruvdan o'tgan holat
+        with mock.patch('my_app.views.get_submission', side_effect=[None, submitted]):
+            retry = self.submit(self.block, {str(self.ids[0]): 'A'}, key='urinish-1')
+        self.assertEqual(retry.json(), first)
+        self.assertEqual(TestResult.objects.count(), 1)
+
+    def test_bad_requests(self):
+        url = reverse('submit_test', args=[self.block.id])
+        response = self.client.post(url, data='{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, data='{}', content_type='application/json', headers={'Idempotency-Key': 'x' * 65})
+        self.assertEqual(response.status_code, 400)
+        for body in ['[]', '{"answers": ["A"]}', '{"answers": null}', '{"time_spent": "abc"}',
+                     '{"time_spent": null}', '{"time_spent": Infinity}', '{"time_spent": -1}', '{"time_spent": 1e30}']:
+            response = self.client.post(url, data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(TestResult.objects.exists())
+        self.assertEqual(self.submit(self.block, {}, time_spent='45').status_code, 200)
+        self.assertEqual(TestResult.objects.get().time_spent, 45)
+
+
+class GradeManyTest(ExamTestCase):
+    def test_grades_dicts_and_encoded_submissions(self):
+        block = create_block(self.course, questions=4)
+        ids = [str(question_id) for question_id in block.questions.values_list('id', flat=True)]
+        grades = grading.grade_many(block, [
+            {ids[0]: 'A', ids[1]: 'B', ids[2]: 'C', ids[3]: 'D'},
+            {ids[0]: 'B', ids[3]: 'D', '999999': 'A'},
+            b'A--D',
+        ])
+        self.assertEqual([grade.correct_count for grade in grades], [4, 1, 2])
+        self.assertEqual(grades[1].selected, b'B--D')
+        self.assertEqual(list(grades[2].correct_mask), [True, False, False, True])
+
+    @override_settings(STORE_USER_ANSWER_ROWS=True)
+    def test_regrade_after_correct_answer_change(self):
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        block = create_block(self.course, questions=2)
+        first, second = block.questions.all()
+        result = grading.save_submission(self.student, block, {str(first.id): 'B', str(second.id): 'B'})
+        self.assertEqual(result.correct_answers, 1)
+
+        self.client.force_login(admin)
+        self.client.post(reverse('admin_edit_question', args=[first.id]), {
+            'question_text': first.question_text, 'option_a': 'a', 'option_b': 'b', 'option_c': 'c',
+            'option_d': 'd', 'correct_answer': 'B', 'order': first.order,
+        })
+        block.refresh_from_db()
+        self.assertEqual(grading.compile_answer_key(block).letters, b'BB')
+
+        call_command('regrade_block', block.id, stdout=StringIO())
+        result.refresh_from_db()
+        self.assertEqual((result.correct_answers, result.score), (2, 100))
+        self.assertEqual(list(decode_answers(result.answer_vector).correct_mask), [True, True])
+        self.assertTrue(UserAnswer.objects.get(question=first).is_correct)
+
+    def test_import_answer_sheets(self):
+        block = create_block(self.course, questions=3)
+        other = CustomUser.objects.create_user(username='ikkinchi', password='parol', group=self.group)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('username,answers,time_spent\ntalaba,AB-,120\nikkinchi,AB,0\nyoq,ABC,0\n')
+        self.addCleanup(os.remove, f.name)
+        stderr = StringIO()
+        call_command('import_answer_sheets', block.id, f.name, stdout=StringIO(), stderr=stderr)
+
+        result = TestResult.objects.get(user=self.student, test_block=block)
+        self.assertEqual((result.correct_answers, result.time_spent), (2, 120))
+        self.assertFalse(TestResult.objects.filter(user=other).exists())
+        self.assertIn('3-qator', stderr.getvalue())
+        self.assertIn('4-qator', stderr.getvalue())
+
+
+@override_settings(SUBMISSION_QUEUE_ENABLED=True, SUBMISSION_QUEUE_BACKEND='database')
+class SubmissionQueueTest(ExamTestCase):
+    def test_queued_submission_is_graded_by_worker(self):
+        block = create_block(self.course, questions=4)
+        ids = list(block.questions.values_list('id', flat=True))
+        response = self.submit(block, {str(ids[0]): 'A', str(ids[1]): 'A'})
+        self.assertEqual(response.status_code, 202)
+        data = response.json()
+        self.assertTrue(data['queued'])
+        self.assertFalse(TestResult.objects.exists())
+
+        # Takroriy yuborish yangi yozuv yaratmaydi
+        self.assertEqual(self.submit(block, {}).json()['receipt'], data['receipt'])
+        self.assertFalse(self.client.get(data['status_url']).json()['ready'])
+        self.assertEqual(self.client.get(data['pending_url']).status_code, 200)
+
+        self.assertEqual(process_batch(DatabaseSubmissionQueue()), 1)
+        result = TestResult.objects.get(user=self.student, test_block=block)
+        self.assertEqual((result.correct_answers, result.total_questions), (1, 4))
+        status = self.client.get(data['status_url']).json()
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['result_url'], reverse('view_result', args=[result.id]))
+
+    def test_receipt_is_private(self):
+        block = create_block(self.course)
+        receipt = self.submit(block, {}).json()['receipt']
+        other = CustomUser.objects.create_user(username='boshqa', password='parol', group=self.group)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('submission_status', args=[receipt])).status_code, 404)
+
+    def test_batch_skips_already_graded(self):
+        block = create_block(self.course)
+        queue = DatabaseSubmissionQueue()
+        queue.enqueue(self.student.id, block.id, {}, 0)
+        grading.save_submission(self.student, block, {})
+        process_batch(queue)
+        self.assertEqual(TestResult.objects.filter(user=self.student).count(), 1)
+        self.assertEqual(QueuedSubmission.objects.get().status, QueuedSubmission.DONE)
+
+
+    def test_answers_are_normalized_before_enqueue(self):
+        block = create_block(self.course, questions=3)
+        ids = list(block.questions.values_list('id', flat=True))
+        self.submit(block, {str(ids[0]): 'A', str(ids[1]): ['B'], str(ids[2]): 'X'})
+        self.assertEqual(QueuedSubmission.objects.get().answers, {str(ids[0]): 'A'})
+
+    def test_resubmit_after_failure(self):
+        block = create_block(self.course, questions=2)
+        ids = list(block.questions.values_list('id', flat=True))
+        receipt = self.submit(block, {str(ids[0]): 'B'}).json()['receipt']
+        queue = DatabaseSubmissionQueue()
+        queue.fail([item.receipt for item in queue.claim(10)], 'xato')
+        self.assertEqual(self.client.get(reverse('submission_status', args=[receipt])).json()['status'], QueuedSubmission.FAILED)
+
+        retry = self.submit(block, {str(ids[0]): 'A'}, time_spent=50).json()
+        self.assertEqual(retry['receipt'], receipt)
+        self.assertEqual(self.client.get(retry['status_url']).json()['status'], QueuedSubmission.PENDING)
+        self.assertEqual(process_batch(queue), 1)
+        result = TestResult.objects.get(user=self.student, test_block=block)
+        self.assertEqual((result.correct_answers, result.time_spent), (1, 50))
+        self.assertTrue(self.client.get(retry['status_url']).json()['ready'])
+
+    def test_failed_item_does_not_fail_batch(self):
+        block = create_block(self.course)
+        other = CustomUser.objects.create_user(username='boshqa', password='parol', group=self.group)
+        queue = DatabaseSubmissionQueue()
+        good = queue.enqueue(self.student.id, block.id, {}, 0)
+        bad = queue.enqueue(other.id, block.id, {}, 0)
+        save_submissions = grading.save_submissions
+
+        def failing(block, entries, *args):
+            if any(user == other for user, _, _ in entries):
+                raise ValueError('buzilgan topshiriq')
+            return save_submissions(block, entries, *args)
+
+        with mock.patch('my_app.submission_queue.save_submissions', side_effect=failing):
+            self.assertEqual(process_batch(queue), 2)
+        statuses = dict(QueuedSubmission.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {int(good): QueuedSubmission.DONE, int(bad): QueuedSubmission.FAILED})
+        self.assertEqual(QueuedSubmission.objects.get(id=bad).error, 'buzilgan topshiriq')
+        self.assertEqual(list(TestResult.objects.values_list('user_id', flat=True)), [self.student.id])
+
+
+class QueryBudgetTest(QueryBudgetMixin, ExamTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        cls.block = create_block(cls.course, questions=5)
+        for i in range(5):
+            create_block(cls.course, title=f'Blok {i}')
+            student = CustomUser.objects.create_user(username=f'talaba{i}', password='parol', group=cls.group)
+            grading.save_submission(student, cls.block, {})
+
+    def test_student_views_within_budget(self):
+        self.assertWithinQueryBudget(reverse('dashboard'))
+        self.assertWithinQueryBudget(reverse('take_test', args=[self.block.id]))
+        answers = {str(question_id): 'A' for question_id in self.block.questions.values_list('id', flat=True)}
+        response = self.assertWithinQueryBudget(
+            reverse('submit_test', args=[self.block.id]), method='post', data=json.dumps({'answers': answers}),
+            content_type='application/json',
+        )
+        self.assertWithinQueryBudget(reverse('view_result', args=[response.json()['result_id']]))
+
+    def test_admin_views_within_budget(self):
+        self.client.force_login(self.admin)
+        for name in ['admin_dashboard', 'admin_users', 'admin_results', 'admin_courses', 'admin_groups',
+                     'admin_test_blocks']:
+            self.assertWithinQueryBudget(reverse(name))
+        self.assertWithinQueryBudget(reverse('admin_user_results', args=[self.student.id]))
+        self.assertWithinQueryBudget(reverse('admin_test_questions', args=[self.block.id]))
+        self.assertWithinQueryBudget(reverse('admin_leaderboard', args=['block', self.block.id]))
+
+    def test_debug_headers_and_production_log(self):
+        with override_settings(DEBUG=True):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response['X-Query-Budget'], '5')
+        self.assertIn('X-Query-Count', response)
+
+        with self.assertLogs('my_app.requests', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('X-Query-Count', response)
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual((data['view'], data['status']), ('dashboard', 200))
+
+    def test_duplicate_patterns_are_reported(self):
+        def view(request):
+            for user_id in range(3):
+                CustomUser.objects.filter(pk=user_id).exists()
+            return HttpResponse()
+        view.__module__ = 'my_app.views'
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = RequestInstrumentationMiddleware(get_response)
+        with override_settings(DEBUG=True):
+            response = middleware(RequestFactory().get('/'))
+        self.assertTrue(response['X-Duplicate-Patterns'].startswith('3x SELECT'))
+        self.assertLessEqual(float(response['X-View-Time-Ms']), float(response['X-Request-Time-Ms']))
+
+        with self.assertLogs('my_app.requests', 'INFO') as logs:
+            middleware(RequestFactory().get('/'))
+        data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(data['duplicate_queries'], 3)
+        self.assertEqual([pattern['count'] for pattern in data['duplicate_patterns']], [3])
+        self.assertIn('"my_app_customuser"', data['duplicate_patterns'][0]['sql'])
+
+    def test_normalize_sql_groups_parameters(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id = 5 AND name = 'x' AND pk IN (%s, %s)"),
+            normalize_sql("SELECT * FROM t WHERE id = 7 AND name = 'y' AND pk IN (%s)"),
+        )
+
+
+class AdminResultsPaginationTest(ExamTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        cls.other_group = Group.objects.create(name='102', course=cls.course)
+        cls.block = create_block(cls.course)
+        completed_at = timezone.now()
+        for i in range(7):
+            student = CustomUser.objects.create_user(
+                username=f'talaba{i}', password='parol', group=cls.group if i % 2 else cls.other_group
+            )
+            result = TestResult.objects.create(user=student, test_block=cls.block, total_questions=3)
+            # Bir xil vaqtli natijalar ham to'g'ri tartiblanishi kerak
+            TestResult.objects.filter(pk=result.pk).update(completed_at=completed_at - timedelta(days=i // 2))
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def collect_pages(self, params):
+        ids, url = [], reverse('admin_results') + '?' + params
+        with mock.patch('my_app.views.RESULTS_PER_PAGE', 3):
+            while url:
+                response = self.client.get(url if url.startswith('/') else reverse('admin_results') + url)
+                ids.extend(result.id for result in response.context['results'])
+                url = response.context['next_url']
+        return ids, response.context['total_count']
+
+    def test_pages_cover_all_results_in_order(self):
+        ids, total = self.collect_pages('')
+        expected = list(TestResult.objects.order_by('-completed_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(total, 7)
+
+    def test_filters_are_kept_across_pages(self):
+        ids, total = self.collect_pages(f'group={self.group.id}')
+        self.assertEqual(set(ids), set(TestResult.objects.filter(user__group=self.group).values_list('id', flat=True)))
+        self.assertEqual(total, 3)
+
+        today = timezone.localdate().isoformat()
+        ids, _ = self.collect_pages(f'date_from={today}&date_to={today}')
+        self.assertEqual(len(ids), 2)
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('admin_results') + '?cursor=notacursor')
+        self.assertEqual(len(response.context['results']), 7)
+
+
+class ExportTest(ExamTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        cls.block = create_block(cls.course, questions=3)
+        cls.ids = [str(question_id) for question_id in cls.block.questions.values_list('id', flat=True)]
+        cls.second = CustomUser.objects.create_user(username='ikkinchi', password='parol', group=cls.group)
+        cls.third = CustomUser.objects.create_user(username='uchinchi', password='parol', group=cls.group)
+        grading.save_submission(cls.student, cls.block, {cls.ids[0]: 'A', cls.ids[2]: 'D'})
+        grading.save_submission(cls.second, cls.block, {})
+        grading.save_submission(cls.third, cls.block, {cls.ids[1]: 'B'})
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('admin_export_results'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_results_csv(self):
+        rows = list(csv.reader(self.export(test=self.block.id).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0][0], 'Username')
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ['ikkinchi', 'talaba', 'uchinchi'])
+
+    def test_answer_matrix_aligns_answers(self):
+        rows = list(csv.reader(self.export(test=self.block.id, answers=1).decode('utf-8-sig').splitlines()))
+        matrix = {row[0]: row[6:] for row in rows[1:]}
+        self.assertEqual(matrix, {'talaba': ['A', '', 'D'], 'ikkinchi': ['', '', ''], 'uchinchi': ['', 'B', '']})
+
+    def test_invalid_block_filter_is_not_found(self):
+        for value in ['abc', '\u00b2', '9' * 30, '0', '']:
+            response = self.client.get(reverse('admin_export_results'), {'test': value, 'answers': 1})
+            self.assertEqual(response.status_code, 404, value)
+        response = self.client.get(reverse('admin_results'), {'test': 'abc', 'group': '\u00b2'})
+        self.assertEqual((response.status_code, response.context['filters']), (200, {}))
+
+    def test_xlsx_is_valid_workbook(self):
+        content = self.export(test=self.block.id, format='xlsx')
+        with zipfile.ZipFile(BytesIO(content)) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('uchinchi', sheet)
+
+
+class ItemAnalysisTest(ExamTestCase):
+    SHEETS = ['AB', 'AC', 'BB', 'A', 'CD', 'AB']
+
+    def setUp(self):
+        super().setUp()
+        self.block = create_block(self.course, questions=2)
+        self.questions = list(self.block.questions.all())
+
+    def submit_sheets(self, sheets, offset=0):
+        for i, sheet in enumerate(sheets, start=offset):
+            student = CustomUser.objects.create_user(username=f'talaba{i}', password='parol', group=self.group)
+            grading.save_submission(student, self.block, {
+                str(question.id): letter for question, letter in zip(self.questions, sheet)
+            })
+
+    def expected(self, question_index):
+        import numpy as np
+        results = dict(TestResult.objects.filter(test_block=self.block).values_list('user_id', 'score'))
+        correct = {
+            user_id for user_id, answer_vector in TestResult.objects.filter(test_block=self.block).values_list('user_id', 'answer_vector')
+            if decode_answers(answer_vector).correct_mask[question_index]
+        }
+        users = sorted(results)
+        scores = np.array([results[user_id] for user_id in users], dtype=float)
+        marks = np.array([user_id in correct for user_id in users], dtype=float)
+        return marks.mean(), np.corrcoef(marks, scores)[0, 1]
+
+    def test_matches_direct_computation_and_updates_incrementally(self):
+        self.submit_sheets(self.SHEETS[:3])
+        refresh_item_analysis(self.block)
+        self.submit_sheets(self.SHEETS[3:], offset=3)
+        with self.assertNumQueries(9):
+            analysis = refresh_item_analysis(self.block)
+        self.assertEqual(analysis.result_count, 6)
+
+        first = QuestionAnalysis.objects.get(question=self.questions[0])
+        second = QuestionAnalysis.objects.get(question=self.questions[1])
+        self.assertEqual((first.count_a, first.count_b, first.count_c), (4, 1, 1))
+        self.assertEqual((second.count_b, second.count_c, second.count_d), (3, 1, 1))
+        for index, item in enumerate([first, second]):
+            difficulty, discrimination = self.expected(index)
+            self.assertAlmostEqual(item.difficulty, difficulty, places=3)
+            self.assertAlmostEqual(item.discrimination, discrimination, places=3)
+
+    def test_admin_page_shows_statistics(self):
+        self.submit_sheets(self.SHEETS)
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin_test_questions', args=[self.block.id]))
+        self.assertContains(response, 'Qiyinlik (p): 0,67')
+        self.assertContains(response, 'A: 66,7% (4)')
+
+
+class LeaderboardTest(ExamTestCase):
+    def test_memory_board_orders_by_score_then_time(self):
+        board = leaderboard.MemoryLeaderboard()
+        board.increment('block:1', [(1, 80, 300), (2, 90, 500), (3, 80, 200)])
+        self.assertEqual([entry.user_id for entry in board.top('block:1', 10)], [2, 3, 1])
+        board.increment('block:1', [(1, 20, 10)])
+        self.assertEqual(board.rank('block:1', 1), leaderboard.LeaderboardEntry(1, 1, 100, 310))
+        self.assertIsNone(board.rank('block:1', 4))
+
+    def test_memory_board_warns_outside_debug(self):
+        with self.settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_leaderboard(None)], ['my_app.W002'])
+        with self.settings(DEBUG=False, LEADERBOARD_BACKEND='redis'):
+            self.assertEqual(check_shared_leaderboard(None), [])
+
+    def test_redis_encoding_clamps_time(self):
+        board = leaderboard.RedisLeaderboard.__new__(leaderboard.RedisLeaderboard)
+        slow = board._encode(80, 2 ** 31 - 1)
+        self.assertGreater(slow, board._encode(79, 0))
+        self.assertEqual(board._decode(1, 1, slow).score, 80)
+
+    def test_broken_backend_renders_pages_without_rankings(self):
+        block = create_block(self.course)
+        result = grading.save_submission(self.student, block, {})
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        broken = mock.Mock(**{name: mock.Mock(side_effect=ConnectionError) for name in ['exists', 'rank', 'top', 'size', 'delete']})
+        with mock.patch('my_app.leaderboard.get_leaderboard', return_value=broken), self.assertLogs('my_app.leaderboard', 'ERROR'):
+            response = self.client.get(reverse('view_result', args=[result.id]))
+            self.assertIsNone(response.context['rankings'])
+            self.assertNotContains(response, '<div class="ranking-section">')
+            self.client.force_login(admin)
+            response = self.client.get(reverse('admin_leaderboard', args=['block', block.id]))
+            self.assertContains(response, 'Reyting vaqtincha mavjud emas')
+            leaderboard.invalidate_leaderboards(block)
+
+    def test_submissions_update_boards_and_match_rebuild(self):
+        other_block = create_block(self.course, questions=2)
+        block = create_block(self.course, questions=2)
+        ids = [str(question_id) for question_id in block.questions.values_list('id', flat=True)]
+        rival = CustomUser.objects.create_user(username='raqib', password='parol', group=self.group)
+        grading.save_submission(rival, other_block, {})
+        # Birinchi murojaat bazadan yuklaydi, keyingilari faqat qo'shadi
+        leaderboard.get_rank(leaderboard.course_board(self.course.id), rival.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.save_submission(rival, block, {ids[0]: 'A', ids[1]: 'B'}, time_spent=90)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit(block, {ids[0]: 'A', ids[1]: 'B'}, time_spent=60)
+
+        board = leaderboard.block_board(block.id)
+        self.assertEqual(leaderboard.get_rank(board, self.student.id).rank, 1)
+        course = leaderboard.get_leaderboard().top(leaderboard.course_board(self.course.id), 10)
+        # Ikkalasida ham yig'indi 100 ball - kam vaqt sarflagan yuqorida
+        self.assertEqual([(entry.user_id, entry.score, entry.time_spent) for entry in course],
+                         [(self.student.id, 100, 60), (rival.id, 100, 90)])
+        for name in [board, leaderboard.course_board(self.course.id), leaderboard.group_board(self.group.id)]:
+            incremental = leaderboard.get_leaderboard().top(name, 10)
+            leaderboard.rebuild_board(name)
+            self.assertEqual(leaderboard.get_leaderboard().top(name, 10), incremental)
+
+        response = self.client.get(reverse('view_result', args=[response.json()['result_id']]))
+        self.assertEqual(response.context['rankings']['block'], {'rank': 1, 'total': 2})
+        self.assertEqual(response.context['rankings']['top'][0]['user'], self.student)
+
+
+class QuestionImportTest(ExamTestCase):
+    CSV = (
+        'question_text,option_a,option_b,option_c,option_d,correct_answer\n'
+        'Birinchi,a,b,c,d,b\n'
+        '"Ikkinchi, vergul bilan",a,b,c,d,D\n'
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(CustomUser.objects.create_user(username='admin', password='parol', is_staff=True))
+        self.block = create_block(self.course, questions=2)
+
+    def upload(self, name, content, **data):
+        upload = BytesIO(content.encode())
+        upload.name = name
+        return self.client.post(reverse('admin_import_questions', args=[self.block.id]), {'file': upload, **data})
+
+    def test_csv_appends_questions_and_updates_block(self):
+        version = self.block.version
+        response = self.upload('savollar.csv', self.CSV)
+        self.assertRedirects(response, reverse('admin_test_questions', args=[self.block.id]))
+
+        self.block.refresh_from_db()
+        self.assertEqual(self.block.question_count, 4)
+        self.assertGreater(self.block.version, version)
+        self.assertEqual(self.block.end_time, self.block.start_time + timedelta(minutes=4 * self.block.time_per_question))
+        self.assertEqual(
+            list(self.block.questions.values_list('order', 'question_text', 'correct_answer'))[2:],
+            [(2, 'Birinchi', 'B'), (3, 'Ikkinchi, vergul bilan', 'D')],
+        )
+
+    def test_errors_are_reported_per_line_and_nothing_is_saved(self):
+        response = self.upload('savollar.csv', self.CSV + 'Uchinchi,a,,c,d,E\n')
+        self.assertEqual(response.context['errors'], [(4, "'option_b' bo'sh"), (4, "to'g'ri javob A, B, C yoki D bo'lishi kerak: E")])
+        self.assertEqual(self.block.questions.count(), 2)
+
+    def test_text_format_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write('1. Poytaxt qaysi?\nA) Toshkent\nB) Samarqand\nC) Buxoro\nD) Xiva\nJavob: A\n\n'
+                    '2. Ikki\nA) 1\nB) 2\nC) 3\nD) 4\nJavob: B\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('import_questions', self.block.id, f.name, stdout=StringIO())
+        question = self.block.questions.get(order=2)
+        self.assertEqual((question.question_text, question.option_a, question.correct_answer), ('Poytaxt qaysi?', 'Toshkent', 'A'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTest(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(CustomUser.objects.create_user(username='admin', password='parol', is_staff=True))
+
+    def upload(self, content, **data):
+        upload = BytesIO(content.encode())
+        upload.name = 'royxat.csv'
+        return self.client.post(reverse('admin_import_users'), {'file': upload, **data})
+
+    def test_import_creates_students_and_credentials_sheet(self):
+        response = self.upload(
+            'username,first_name,last_name,group,password\n'
+            'yangi1,Olim,Karimov,101,\n'
+            'talaba,Ali,Valiyev,101,\n'
+            'yangi2,Nodira,Saidova,101,maxfiy12\n'
+        )
+        self.assertEqual([credential.username for credential in response.context['credentials']], ['yangi1', 'yangi2'])
+        self.assertEqual(response.context['duplicates'], [(3, 'talaba')])
+        generated = response.context['credentials'][0].password
+        self.assertEqual(len(generated), roster_import.PASSWORD_LENGTH)
+        self.assertContains(response, f'Parol: {generated}')
+
+        user = CustomUser.objects.get(username='yangi2')
+        self.assertEqual((user.group, user.get_full_name()), (self.group, 'Nodira Saidova'))
+        self.assertTrue(user.check_password('maxfiy12'))
+        self.assertTrue(CustomUser.objects.get(username='yangi1').check_password(generated))
+
+    def test_errors_abort_the_whole_roster(self):
+        Group.objects.create(name='101', course=Course.objects.create(name='Boshqa kurs'))
+        response = self.upload(
+            'username,first_name,last_name,group\n'
+            'yangi1,Olim,Karimov,999\n'
+            'yangi1,Olim,,101\n'
+        )
+        self.assertEqual(response.context['errors'], [
+            (2, 'guruh topilmadi: 999'),
+            (3, "'last_name' bo'sh"),
+            (3, 'username faylda takrorlangan (2-qator bilan)'),
+            (3, "'101' nomli guruh bir nechta kursda bor - course ustunini to'ldiring"),
+        ])
+        self.assertFalse(CustomUser.objects.filter(username='yangi1').exists())
+
+    def test_admin_import_hashes_in_thread(self):
+        with mock.patch('my_app.roster_import.ProcessPoolExecutor') as pool:
+            self.upload('username,first_name,last_name,group\n' + ''.join(
+                f'yangi{i},Olim,Karimov,101\n' for i in range(roster_import.MIN_PARALLEL)
+            ))
+        pool.assert_not_called()
+        self.assertEqual(CustomUser.objects.filter(username__startswith='yangi').count(), roster_import.MIN_PARALLEL)
+
+    @override_settings(ROSTER_WEB_MAX_ROWS=2)
+    def test_large_roster_points_to_command(self):
+        response = self.upload('username,first_name,last_name,group\n' + ''.join(
+            f'yangi{i},Olim,Karimov,101\n' for i in range(3)
+        ))
+        self.assertContains(response, 'manage.py import_roster')
+        self.assertIn('3 ta qator', str(list(response.context['messages'])[0]))
+        self.assertFalse(CustomUser.objects.filter(username__startswith='yangi').exists())
+
+    def test_passwords_hashed_in_process_pool(self):
+        passwords = [f'parol{i}' for i in range(roster_import.MIN_PARALLEL)]
+        self.assertLessEqual(roster_import.get_default_workers(), roster_import.MAX_WORKERS)
+        hashes = roster_import.hash_passwords(passwords, workers=2)
+        user = CustomUser(username='x')
+        for password, password_hash in zip(passwords, hashes):
+            user.password = password_hash
+            self.assertTrue(user.check_password(password))
+
+
+class ExamTicketTest(ExamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.logout()
+        self.block = create_block(self.course)
+
+    def test_ticket_logs_in_once_straight_to_take_test(self):
+        tickets = exam_tickets.issue_tickets(self.block)
+        self.assertEqual([ticket.user for ticket in tickets], [self.student])
+
+        response = self.client.post(reverse('ticket_login'), {'ticket': tickets[0].token.upper()})
+        self.assertRedirects(response, reverse('take_test', args=[self.block.id]))
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.student.id)
+
+        self.client.logout()
+        response = self.client.post(reverse('ticket_login'), {'ticket': tickets[0].token})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_forged_tickets_rejected_without_queries(self):
+        token = exam_tickets.issue_tickets(self.block)[0].token
+        user_id, block_id, nonce, signature = token.split('-')
+        with self.assertNumQueries(0):
+            self.assertIsNone(exam_tickets.redeem_ticket(f'{int(user_id) + 1}-{block_id}-{nonce}-{signature}'))
+            self.assertIsNone(exam_tickets.redeem_ticket('salom'))
+
+    def test_reissuing_revokes_old_tickets(self):
+        old = exam_tickets.issue_tickets(self.block)[0].token
+        exam_tickets.issue_tickets(self.block)
+        self.assertIsNone(exam_tickets.redeem_ticket(old))
+
+
+class CachedPrincipalTest(ExamTestCase):
+    IDENTITY_TABLES = ('django_session', 'my_app_customuser', 'my_app_group', 'my_app_course')
+
+    def test_student_pages_run_no_identity_queries(self):
+        block = create_block(self.course)
+        for url in [reverse('dashboard'), reverse('take_test', args=[block.id])]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            identity = [query['sql'] for query in ctx.captured_queries
+                        if any(f'FROM "{table}"' in query['sql'] for table in self.IDENTITY_TABLES)]
+            self.assertEqual(identity, [], url)
+        self.assertContains(self.client.get(reverse('dashboard')), '101')
+
+    def test_admin_edit_user_invalidates_principal(self):
+        other = Group.objects.create(name='202', course=self.course)
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        admin_client = self.client_class()
+        admin_client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.post(reverse('admin_edit_user', args=[self.student.id]), {
+                'first_name': 'Ali', 'last_name': 'Valiyev', 'group': other.id,
+            })
+        self.assertEqual(get_principal(self.student.id)['group_name'], '202')
+        self.assertContains(self.client.get(reverse('dashboard')), '202')
+
+    def test_identity_caches_are_shared_between_workers(self):
+        shared = {**settings.CACHES, 'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with self.settings(DEBUG=False, CACHES=shared, SESSION_CACHE_ALIAS='shared', PRINCIPAL_CACHE='shared'):
+            self.assertEqual(check_shared_caches(None), [])
+        with self.settings(DEBUG=False, SESSION_ENGINE='django.contrib.sessions.backends.db', PRINCIPAL_CACHE=None):
+            self.assertEqual(check_shared_caches(None), [])
+        with self.settings(DEBUG=False):
+            self.assertEqual([error.id for error in check_shared_caches(None)], ['my_app.E001', 'my_app.E001'])
+
+    def test_broken_cache_falls_back_to_database(self):
+        with mock.patch('my_app.principal.get_principal', side_effect=ConnectionError):
+            self.assertContains(self.client.get(reverse('dashboard')), 'Ali')
+        with self.settings(SESSION_ENGINE='django.contrib.sessions.backends.db', PRINCIPAL_CACHE=None):
+            self.client.force_login(self.student)
+            self.assertContains(self.client.get(reverse('dashboard')), 'Ali')
+
+
+@override_settings(EXAM_TIMER_INTERVAL=0.05)
+class ExamTimerTest(ExamTestCase):
+    async def connect(self, block):
+        communicator = WebsocketCommunicator(TestConsumer.as_asgi(), f'/ws/test/{block.id}/')
+        communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['type'], 'init')
+        return communicator
+
+    async def test_connect_sends_remaining_time(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now())
+        await TestBlock.objects.filter(pk=block.pk).aupdate(end_time=timezone.now() + timedelta(minutes=10))
+        communicator = await self.connect(block)
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'timer')
+        self.assertAlmostEqual(message['remaining'], 600, delta=2)
+        await communicator.disconnect()
+
+    async def test_one_ticker_per_room_and_client_cannot_set_time(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now())
+        await TestBlock.objects.filter(pk=block.pk).aupdate(end_time=timezone.now() + timedelta(minutes=10))
+        first, second = await self.connect(block), await self.connect(block)
+        self.assertEqual(exam_timer.active_tickers(), {str(block.id): 2})
+        await first.send_json_to({'type': 'timer_update', 'elapsed': 99999})
+        for communicator in (first, second):
+            for _ in range(3):
+                message = await communicator.receive_json_from()
+                self.assertEqual(message['type'], 'timer')
+                self.assertGreater(message['remaining'], 590)
+
+        await first.disconnect()
+        self.assertEqual(exam_timer.active_tickers(), {str(block.id): 1})
+        await second.disconnect()
+        self.assertEqual(exam_timer.active_tickers(), {})
+
+    async def test_sync_resends_time(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now())
+        await TestBlock.objects.filter(pk=block.pk).aupdate(end_time=timezone.now() - timedelta(minutes=1))
+        with self.settings(EXAM_TIMER_INTERVAL=60):
+            communicator = await self.connect(block)
+            await communicator.receive_json_from()
+            await communicator.send_json_to({'type': 'sync'})
+            message = await communicator.receive_json_from()
+        self.assertEqual(message, {'type': 'timer', 'remaining': 0, 'end_time': message['end_time']})
+        await communicator.disconnect()
+
+
+class BlockInfoCacheTest(ExamTestCase):
+    async def test_concurrent_connects_share_one_load(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now())
+        load = mock.AsyncMock(wraps=block_info.load_block_info)
+        with mock.patch.object(block_info, 'load_block_info', load):
+            infos = await asyncio.gather(*[block_info.get_block_info(str(block.id)) for _ in range(200)])
+            await block_info.get_block_info(block.id)
+        self.assertEqual(load.await_count, 1)
+        self.assertEqual({info['title'] for info in infos}, {'Blok'})
+        self.assertIsNone(await block_info.get_block_info('yoq'))
+
+    def test_block_edit_invalidates(self):
+        block = create_block(self.course, questions=1)
+        self.assertEqual(async_to_sync(block_info.get_block_info)(block.id)['question_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.create(
+                test_block=block, question_text='Yangi', option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_answer='A', order=5,
+            )
+        self.assertEqual(async_to_sync(block_info.get_block_info)(block.id)['question_count'], 2)
+        block.title = 'Yangi nom'
+        with self.captureOnCommitCallbacks(execute=True):
+            block.save()
+        self.assertEqual(async_to_sync(block_info.get_block_info)(block.id)['title'], 'Yangi nom')
+
+    async def test_init_message_uses_real_fields(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now(), time_per_question=3)
+        communicator = WebsocketCommunicator(TestConsumer.as_asgi(), f'/ws/test/{block.id}/')
+        communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+        await communicator.connect()
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['type'], 'init')
+        self.assertEqual(message['data']['time_per_question'], 3)
+        self.assertEqual(message['data']['start_time'], block.start_time.isoformat())
+        await communicator.disconnect()
+
+
+@override_settings(EXAM_TIMER_INTERVAL=60, ANSWER_FLUSH_INTERVAL=60)
+class AnswerAutosaveTest(ExamTestCase):
+    async def connect(self, block, user):
+        communicator = WebsocketCommunicator(TestConsumer.as_asgi(), f'/ws/test/{block.id}/')
+        communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+        communicator.scope['user'] = user
+        await communicator.connect()
+        messages = [await communicator.receive_json_from() for _ in range(3)]
+        self.assertEqual([message['type'] for message in messages], ['init', 'timer', 'answers'])
+        return communicator, messages[2]['answers']
+
+    def test_answers_are_coalesced_into_one_upsert(self):
+        block = create_block(self.course)
+        first, second = [str(question_id) for question_id in block.questions.values_list('id', flat=True)[:2]]
+        AnswerDraft.objects.create(user=self.student, test_block=block, answers={second: 'C'})
+
+        async def run():
+            communicator, restored = await self.connect(block, self.student)
+            self.assertEqual(restored, {second: 'C'})
+            for letter in 'ABD':
+                await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': letter})
+            await communicator.send_json_to({'type': 'answer', 'question_id': '999999', 'answer': 'A'})
+            self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+            for letter in [['A'], {'A': 1}, 5]:
+                await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': letter})
+                self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+            buffer = answer_buffer.get_answer_buffer()
+            self.assertEqual(buffer.pending(), 1)
+            await buffer.flush()
+            await communicator.send_json_to({'type': 'answer', 'question_id': second, 'answer': ''})
+            await communicator.receive_nothing()
+            await communicator.disconnect()
+            return buffer.stats
+
+        stats = async_to_sync(run)()
+        self.assertEqual(stats, {'messages': 4, 'flushes': 2, 'rows': 2})
+        self.assertEqual(AnswerDraft.objects.get(user=self.student, test_block=block).answers, {first: 'D'})
+
+    def test_failed_detach_write_keeps_answers(self):
+        block = create_block(self.course)
+        first = str(block.questions.values_list('id', flat=True)[0])
+
+        async def run():
+            communicator, _ = await self.connect(block, self.student)
+            await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': 'B'})
+            await communicator.receive_nothing()
+            buffer = answer_buffer.get_answer_buffer()
+            with mock.patch('my_app.answer_buffer.write_drafts', side_effect=RuntimeError):
+                await communicator.disconnect()
+            self.assertEqual(buffer.pending(), 1)
+            self.assertEqual(buffer.progress(block.id), {1: 1})
+            await buffer.flush()
+            return buffer
+
+        buffer = async_to_sync(run)()
+        self.assertEqual(AnswerDraft.objects.get(user=self.student, test_block=block).answers, {first: 'B'})
+        self.assertEqual((buffer.pending(), buffer.progress(block.id)), (0, {}))
+
+    async def test_anonymous_cannot_save(self):
+        block = await TestBlock.objects.acreate(course=self.course, title='Blok', start_time=timezone.now())
+        communicator = WebsocketCommunicator(TestConsumer.as_asgi(), f'/ws/test/{block.id}/')
+        communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+        await communicator.connect()
+        await communicator.receive_json_from()
+        await communicator.receive_json_from()
+        await communicator.send_json_to({'type': 'answer', 'question_id': '1', 'answer': 'A'})
+        self.assertEqual((await communicator.receive_json_from())['type'], 'error')
+        await communicator.disconnect()
+
+    def test_closed_block_rejects_answers(self):
+        inactive = create_block(self.course, is_active=False)
+        future = create_block(self.course, start_time=timezone.now() + timedelta(hours=1))
+
+        async def run():
+            errors = []
+            for block in (inactive, future):
+                communicator, _ = await self.connect(block, self.student)
+                question_id = str(await block.questions.values_list('id', flat=True).afirst())
+                await communicator.send_json_to({'type': 'answer', 'question_id': question_id, 'answer': 'A'})
+                errors.append((await communicator.receive_json_from())['message'])
+                await communicator.disconnect()
+            return errors
+
+        self.assertEqual(async_to_sync(run)(), ["Bu test hozir mavjud emas"] * 2)
+        self.assertFalse(AnswerDraft.objects.exists())
+
+    @override_settings(BLOCK_INFO_CACHE_TIMEOUT=0)
+    def test_submitted_student_cannot_autosave(self):
+        block = create_block(self.course)
+        first = str(block.questions.values_list('id', flat=True)[0])
+
+        async def run():
+            communicator, _ = await self.connect(block, self.student)
+            await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': 'A'})
+            await communicator.receive_nothing()
+            # Boshqa oynadan topshirildi, ochiq soket endi javob qabul qilmaydi
+            await sync_to_async(self.submit)(block, {first: 'A'})
+            await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': 'B'})
+            message = await communicator.receive_json_from()
+            await communicator.disconnect()
+
+            # Topshirgandan keyin ulanganda qoralama qaytarilmaydi
+            communicator = WebsocketCommunicator(TestConsumer.as_asgi(), f'/ws/test/{block.id}/')
+            communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+            communicator.scope['user'] = self.student
+            await communicator.connect()
+            types = [(await communicator.receive_json_from())['type'] for _ in range(2)]
+            await communicator.send_json_to({'type': 'answer', 'question_id': first, 'answer': 'C'})
+            types.append((await communicator.receive_json_from())['message'])
+            await communicator.disconnect()
+            return message['message'], types
+
+        message, types = async_to_sync(run)()
+        self.assertEqual(message, "Siz bu testni allaqachon topshirgansiz")
+        self.assertEqual(types, ['init', 'timer', "Siz bu testni allaqachon topshirgansiz"])
+        self.assertFalse(AnswerDraft.objects.exists())
+
+    def test_explicit_blank_overrides_draft(self):
+        block = create_block(self.course)
+        question_ids = [str(question_id) for question_id in block.questions.values_list('id', flat=True)]
+        AnswerDraft.objects.create(user=self.student, test_block=block, answers={question_ids[0]: 'A', question_ids[1]: 'A'})
+
+        # Oxirgi saqlashdan keyin tozalangan javob qoralamadan qaytib kelmaydi
+        response = self.submit(block, {question_ids[0]: '', question_ids[1]: 'B', question_ids[2]: ''})
+        self.assertEqual(response.json()['correct'], 1)
+        self.assertEqual(len(answer_archive.result_answers(TestResult.objects.get(user=self.student))), 1)
+
+    def test_submit_seals_draft(self):
+        block = create_block(self.course)
+        question_ids = [str(question_id) for question_id in block.questions.values_list('id', flat=True)]
+        AnswerDraft.objects.create(user=self.student, test_block=block, answers={question_ids[0]: 'A', question_ids[1]: 'A'})
+        response = self.client.get(reverse('take_test', args=[block.id]))
+        self.assertContains(response, f'"{question_ids[0]}": "A"')
+
+        response = self.submit(block, {question_ids[1]: 'B', question_ids[2]: 'C'})
+        self.assertEqual(response.json()['correct'], 3)
+        self.assertFalse(AnswerDraft.objects.filter(user=self.student).exists())
+        # Topshirgandan keyin yopilgan soket qoralamani qayta yaratmaydi
+        self.assertEqual(answer_buffer.write_drafts([(self.student.id, block.id, {question_ids[0]: 'B'})]), 0)
+        self.assertFalse(AnswerDraft.objects.exists())
+
+
+@override_settings(EXAM_TIMER_INTERVAL=0.05, PROCTOR_PUSH_INTERVAL=0.05, ANSWER_FLUSH_INTERVAL=60)
+class ProctorTest(ExamTestCase):
+    def communicator(self, consumer, path, block, user):
+        communicator = WebsocketCommunicator(consumer.as_asgi(), path)
+        communicator.scope['url_route'] = {'kwargs': {'block_id': str(block.id)}}
+        communicator.scope['user'] = user
+        return communicator
+
+    def test_student_cannot_connect(self):
+        block = create_block(self.course)
+
+        async def run():
+            communicator = self.communicator(ProctorConsumer, f'/ws/proctor/{block.id}/', block, self.student)
+            connected, code = await communicator.connect()
+            return connected, code
+
+        self.assertEqual(async_to_sync(run)(), (False, 4403))
+
+    def test_progress_stream(self):
+        block = create_block(self.course)
+        question_ids = [str(question_id) for question_id in block.questions.values_list('id', flat=True)]
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        other = CustomUser.objects.create_user(username='boshqa', password='parol', group=self.group)
+        TestResult.objects.create(user=other, test_block=block, score=100, total_questions=3, correct_answers=3)
+
+        async def run():
+            student = self.communicator(TestConsumer, f'/ws/test/{block.id}/', block, self.student)
+            await student.connect()
+            for question_id in question_ids[:2]:
+                await student.send_json_to({'type': 'answer', 'question_id': question_id, 'answer': 'A'})
+            proctor = self.communicator(ProctorConsumer, f'/ws/proctor/{block.id}/', block, admin)
+            connected, _ = await proctor.connect()
+            self.assertTrue(connected)
+            # Birinchi xabar tickdan oldin kelishi mumkin - gistogramma to'lguncha kutiladi
+            for _ in range(20):
+                message = await proctor.receive_json_from()
+                if message['connected']:
+                    break
+            await proctor.disconnect()
+            await student.disconnect()
+            return message
+
+        message = async_to_sync(run)()
+        self.assertEqual(message['type'], 'progress')
+        self.assertEqual(message['connected'], 1)
+        self.assertEqual(message['histogram'], [0, 0, 1, 0])
+        self.assertEqual(message['submitted'], 1)
+        self.assertGreater(message['remaining'], 0)
+
+    def test_admin_page(self):
+        block = create_block(self.course)
+        admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        self.client.force_login(admin)
+        get_principal(admin.id)
+        response = self.client.get(reverse('admin_proctor', args=[block.id]))
+        self.assertContains(response, f'/ws/proctor/{block.id}/')
+
+
+@override_settings(REPORTING_DATABASE='replica')
+class ReportingRouterTest(ExamTestCase):
+    def test_reporting_reads_go_to_replica(self):
+        @reporting_view
+        def view(request):
+            reads.append(TestResult.objects.all().db)
+            # Oqimli javob view qaytgandan keyin o'qiladi
+            return StreamingHttpResponse(TestResult.objects.all().db for _ in range(2))
+
+        reads = []
+        response = view(None)
+        self.assertEqual(reads, ['replica'])
+        self.assertEqual(TestResult.objects.all().db, 'default')
+        self.assertEqual(b''.join(response.streaming_content), b'replicareplica')
+        self.assertEqual(TestResult.objects.all().db, 'default')
+        self.assertEqual(ReportingReplicaRouter().db_for_write(TestResult), 'default')
+
+    def test_missing_alias_falls_back_to_default(self):
+        with self.settings(REPORTING_DATABASE='yoq'):
+            self.assertEqual(reporting_view(lambda request: TestResult.objects.all().db)(None), 'default')
+
+
+class HotPathIndexTest(ExamTestCase):
+    """EXPLAIN: asosiy so'rovlar katta bazada ham indeks bo'yicha ishlaydi"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'talaba{i}', password='!', group=cls.group) for i in range(300)
+        ])
+        blocks = [
+            TestBlock.objects.create(course=cls.course, title=f'Blok {i}', start_time=timezone.now()) for i in range(8)
+        ]
+        questions = Question.objects.bulk_create([
+            Question(
+                test_block=block, question_text='?', option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_answer='A', order=order,
+            )
+            for block in blocks for order in range(15)
+        ])
+        TestResult.objects.bulk_create([TestResult(user=user, test_block=block) for user in users for block in blocks])
+        UserAnswer.objects.bulk_create([
+            UserAnswer(user=user, question=question, selected_answer='A') for user in users for question in questions
+        ], batch_size=2000)
+        cls.block, cls.user = blocks[3], users[100]
+        # Ishlab chiqarishdagidek rejalashtiruvchi statistikasi bilan
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset, index, table):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+        full_scans = [line for line in plan.splitlines() if line.strip().endswith(f'SCAN {table}')]
+        self.assertEqual(full_scans, [], plan)
+        self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_dashboard_completed_results(self):
+        self.assertUsesIndex(
+            TestResult.objects.filter(user=self.user, test_block_id__in=[self.block.id]).values_list('test_block_id', 'id'),
+            '(user_id=? AND test_block_id=?)', 'my_app_testresult',
+        )
+
+    def test_submit_already_submitted_check(self):
+        self.assertUsesIndex(
+            TestResult.objects.filter(user=self.user, test_block=self.block).values('id')[:1],
+            '(user_id=? AND test_block_id=?)', 'my_app_testresult',
+        )
+
+    def test_result_answers(self):
+        plan = UserAnswer.objects.filter(user=self.user, question__test_block=self.block).select_related('question').explain()
+        self.assertNotRegex(plan, r'SCAN my_app_useranswer\s*$')
+        self.assertIn('question_block_order_idx', plan, plan)
+
+    def test_admin_results_for_block(self):
+        self.assertUsesIndex(
+            TestResult.objects.filter(test_block=self.block).order_by('-completed_at', '-id')[:51],
+            'result_block_completed_idx', 'my_app_testresult',
+        )
+
+    def test_admin_block_answers(self):
+        self.assertUsesIndex(
+            UserAnswer.objects.filter(question__test_block=self.block).values('user_id', 'question_id'),
+            'answer_question_user_idx', 'my_app_useranswer',
+        )
+
+    def test_admin_questions(self):
+        self.assertUsesIndex(self.block.questions.order_by('order', 'id'), 'question_block_order_idx', 'my_app_question')
+
+    def test_duplicate_result_is_rejected_by_database(self):
+        block = create_block(self.course)
+        TestResult.objects.create(user=self.student, test_block=block)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TestResult.objects.create(user=self.student, test_block=block)
+
+    def test_double_submit_race_redirects(self):
+        # exists() tekshiruvidan ikkala so'rov ham o'tib ketgan holat
+        block = create_block(self.course)
+        with mock.patch('my_app.views.save_submission', side_effect=IntegrityError):
+            response = self.submit(block, {})
+        self.assertRedirects(response, reverse('dashboard'))
+
+
+@override_settings(STORE_USER_ANSWER_ROWS=True)
+class AnswerArchiveTest(ExamTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = CustomUser.objects.create_user(username='admin', password='parol', is_staff=True)
+        cls.block = create_block(cls.course, questions=4, start_time=timezone.now() - timedelta(days=60))
+        cls.questions = list(cls.block.questions.all())
+        cls.recent = create_block(cls.course, questions=2, title='Yaqinda', start_time=timezone.now() - timedelta(days=1))
+        cls.students = [cls.student] + [
+            CustomUser.objects.create_user(username=f'talaba{i}', password='parol', group=cls.group) for i in range(3)
+        ]
+        with override_settings(STORE_USER_ANSWER_ROWS=True):
+            for i, student in enumerate(cls.students):
+                grading.save_submission(student, cls.block, {
+                    str(question.id): 'ABCD'[(i + index) % 4] for index, question in enumerate(cls.questions) if index != i
+                })
+            grading.save_submission(cls.student, cls.recent, {str(cls.recent.questions.first().id): 'A'})
+
+    def snapshot(self):
+        self.client.force_login(self.admin)
+        matrix = self.client.get(reverse('admin_export_results'), {'test': self.block.id, 'answers': 1})
+        self.client.force_login(self.student)
+        result = TestResult.objects.get(user=self.student, test_block=self.block)
+        page = self.client.get(reverse('view_result', args=[result.id]))
+        analysis = refresh_item_analysis(self.block, recompute=True)
+        return {
+            'matrix': b''.join(matrix.streaming_content),
+            'answers': [(answer.question.pk, answer.selected_answer, answer.is_correct) for answer in page.context['user_answers']],
+            'counts': list(QuestionAnalysis.objects.filter(question__test_block=self.block).order_by('question_id').values_list(
+                'count_a', 'count_b', 'count_c', 'count_d',
+            )),
+            'result_count': analysis.result_count,
+        }
+
+    def test_compaction_is_transparent_to_readers(self):
+        before = self.snapshot()
+        out = StringIO()
+        call_command('compact_answers', stdout=out)
+
+        self.assertFalse(UserAnswer.objects.filter(question__test_block=self.block).exists())
+        self.assertFalse(TestResult.objects.filter(test_block=self.block, answer_vector__isnull=False).exists())
+        self.assertTrue(UserAnswer.objects.filter(question__test_block=self.recent).exists())
+        archive = AnswerArchive.objects.get(test_block=self.block)
+        self.assertEqual((archive.result_count, archive.rows_deleted), (4, 12))
+        self.assertIn("12 ta UserAnswer qatori o'chirildi", out.getvalue())
+        self.assertIn("Bo'shagan joy", out.getvalue())
+
+        self.assertEqual(self.snapshot(), before)
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_user_results', args=[self.student.id]))
+        self.assertEqual(len(response.context['results']), 2)
+
+    def test_legacy_rows_are_archived(self):
+        # Vektorsiz eski natija - javoblari faqat qatorlarda
+        legacy = CustomUser.objects.create_user(username='eski', password='parol', group=self.group)
+        result = TestResult.objects.create(user=legacy, test_block=self.block, total_questions=4, correct_answers=1, score=25)
+        UserAnswer.objects.create(user=legacy, question=self.questions[2], selected_answer='C', is_correct=True)
+
+        call_command('compact_answers', stdout=StringIO())
+        self.assertEqual(answer_archive.decode_archive(AnswerArchive.objects.get().data)[legacy.id][-5:-1], b'--C-')
+        self.client.force_login(legacy)
+        response = self.client.get(reverse('view_result', args=[result.id]))
+        self.assertEqual(
+            [(answer.question.pk, answer.selected_answer, answer.is_correct) for answer in response.context['user_answers']],
+            [(self.questions[2].pk, 'C', True)],
+        )
+
+    def test_interrupted_run_resumes(self):
+        before = self.snapshot()
+        calls = []
+
+        # Ikkinchi o'chirish bo'lagida jarayon to'xtaydi
+        def failing_atomic(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError("uzilish")
+            return transaction.atomic(*args, **kwargs)
+
+        with mock.patch('my_app.answer_archive.transaction', mock.Mock(atomic=failing_atomic)), self.assertRaises(RuntimeError):
+            call_command('compact_answers', chunk_size=5, stdout=StringIO())
+        self.assertEqual(AnswerArchive.objects.get(test_block=self.block).rows_deleted, 5)
+        self.assertEqual(self.snapshot(), before)
+
+        call_command('compact_answers', chunk_size=5, stdout=StringIO())
+        self.assertEqual(AnswerArchive.objects.get(test_block=self.block).rows_deleted, 12)
+        self.assertFalse(answer_archive.blocks_to_compact().exists())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_regrade_archived_block(self):
+        call_command('compact_answers', stdout=StringIO())
+        question = self.questions[0]
+        question.correct_answer = 'B'
+        question.save()
+        self.block.refresh_from_db()
+        grading.regrade_block(self.block)
+
+        result = TestResult.objects.get(user=self.students[1], test_block=self.block)
+        vector = decode_answers(result.answer_vector)
+        self.assertEqual(vector.selected[0], ord('B'))
+        self.assertTrue(vector.correct_mask[0])
+        self.assertEqual(list(answer_archive.blocks_to_compact()), [self.block])
+
+
+class BenchmarkCommandTest(ExamTestCase):
+    def test_commands_import_and_answers_scenario_runs(self):
+        # Modul ko'chirilganda buyruqlar importda yiqilmasligi uchun
+        for name in ['exam_bench', 'exam_loadtest']:
+            load_command_class('my_app', name)
+        stdout = StringIO()
+        # Vaqtinchalik baza o'rniga shu test bazasida - faqat senariy qadamlari
+        load_command_class('my_app', 'exam_bench').__class__(stdout=stdout).bench_answers(3, 5)
+        self.assertIn('faqat vektor', stdout.getvalue())
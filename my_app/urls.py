@@ -4,18 +4,25 @@ from . import views
 urlpatterns = [
     path('', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('ticket/', views.ticket_login, name='ticket_login'),
+    path('ticket/<str:token>/', views.ticket_login, name='ticket_login_token'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('test/<int:test_id>/', views.take_test, name='take_test'),
     path('test/<int:test_id>/submit/', views.submit_test, name='submit_test'),
     path('results/<int:result_id>/', views.view_result, name='view_result'),
+    path('submissions/<str:receipt>/', views.submission_pending, name='submission_pending'),
+    path('submissions/<str:receipt>/status/', views.submission_status, name='submission_status'),
     
     # Custom admin panel
     path('custom-admin/', views.admin_dashboard, name='admin_dashboard'),
     path('custom-admin/users/', views.admin_users, name='admin_users'),
     path('custom-admin/users/add/', views.admin_add_user, name='admin_add_user'),
+    path('custom-admin/users/import/', views.admin_import_users, name='admin_import_users'),
     path('custom-admin/users/<int:user_id>/edit/', views.admin_edit_user, name='admin_edit_user'),
     path('custom-admin/results/', views.admin_results, name='admin_results'),
+    path('custom-admin/results/export/', views.admin_export_results, name='admin_export_results'),
     path('custom-admin/results/<int:user_id>/', views.admin_user_results, name='admin_user_results'),
+    path('custom-admin/leaderboard/<str:kind>/<int:pk>/', views.admin_leaderboard, name='admin_leaderboard'),
     
     path('custom-admin/courses/', views.admin_courses, name='admin_courses'),
     path('custom-admin/courses/add/', views.admin_add_course, name='admin_add_course'),
@@ -33,6 +40,9 @@ urlpatterns = [
     path('custom-admin/test-blocks/<int:block_id>/delete/', views.admin_delete_test_block, name='admin_delete_test_block'),
     path('custom-admin/test-blocks/<int:block_id>/questions/', views.admin_test_questions, name='admin_test_questions'),
     path('custom-admin/test-blocks/<int:block_id>/questions/add/', views.admin_add_question, name='admin_add_question'),
+    path('custom-admin/test-blocks/<int:block_id>/tickets/', views.admin_exam_tickets, name='admin_exam_tickets'),
+    path('custom-admin/test-blocks/<int:block_id>/proctor/', views.admin_proctor, name='admin_proctor'),
+    path('custom-admin/test-blocks/<int:block_id>/questions/import/', views.admin_import_questions, name='admin_import_questions'),
     path('custom-admin/questions/<int:question_id>/edit/', views.admin_edit_question, name='admin_edit_question'),
     path('custom-admin/questions/<int:question_id>/delete/', views.admin_delete_question, name='admin_delete_question'),
 ]
@@ -3,10 +3,33 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.db import IntegrityError
 from django.db.models import Q, Avg, Count, Max
-from .models import CustomUser, Course, Group, TestBlock, Question, TestResult, UserAnswer
+from .models import CustomUser, Course, Group, TestBlock, Question, TestResult, QueuedSubmission
+from .answer_buffer import get_draft_answers
+from .answer_archive import result_answers
+from .block_status import get_blocks_status, get_block_status
+from .db_router import reporting_view
+from .exam_paper import get_exam_paper
+from .exam_tickets import issue_tickets, redeem_ticket
+from .exports import answer_matrix_rows, result_rows, stream_csv, stream_xlsx
+from .grading import compile_answer_key, get_submission, normalize_answers, save_submission
+from .instrumentation import query_budget
+from .item_analysis import get_item_analysis, refresh_item_analysis
+from .leaderboard import KINDS as LEADERBOARD_KINDS, delete_boards, get_board_entries, get_result_rankings, group_board
+from .pagination import paginate_keyset
+from .question_import import FORMATS as QUESTION_IMPORT_FORMATS, QuestionImportError, detect_format, import_questions
+from .reports import cached_count, filter_results, get_result_filters
+from .roster_import import RosterImportError, RosterTooLargeError, get_web_max_rows, import_roster, write_credentials_csv
+from .submission_queue import get_submission_queue
+import io
 import json
+from urllib.parse import urlencode
+
+RESULTS_PER_PAGE = 50
 
 
 def login_view(request):
@@ -28,80 +51,128 @@ def login_view(request):
     return render(request, 'login.html')
 
 
+def ticket_login(request, token=None):
+    """Imtihon chiptasi bilan kirish - parol tekshiruvisiz, to'g'ridan-to'g'ri testga"""
+    if request.method == 'POST':
+        redeemed = redeem_ticket(request.POST.get('ticket'))
+        if redeemed is not None:
+            user, block_id = redeemed
+            login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
+            return redirect('take_test', test_id=block_id)
+        messages.error(request, 'Chipta noto\'g\'ri yoki allaqachon ishlatilgan!')
+    
+    return render(request, 'ticket_login.html', {'ticket': token or ''})
+
+
 def logout_view(request):
     """Logout"""
     logout(request)
     return redirect('login')
 
 @login_required
+@query_budget(5)
 def dashboard(request):
     """Asosiy sahifa - test bloklari"""
     user = request.user
     
-    # Foydalanuvchi guruhiga tegishli kursni topish
-    if user.group:  # Bu yerda user.groups.exists() kerak emas
-        test_blocks = TestBlock.objects.filter(course=user.group.course, is_active=True)
-    else:
-        test_blocks = TestBlock.objects.filter(is_active=True)
-    
-    # Har bir blok uchun holatni aniqlash
-    blocks_data = []
-    for block in test_blocks:
-        # Foydalanuvchi bu testni topshirganmi?
-        # user allaqachon CustomUser instance, qayta get qilish kerak emas!
-        completed = TestResult.objects.filter(user=user, test_block=block).exists()
-        
-        blocks_data.append({
-            'block': block,
-            'is_locked': not block.is_unlocked(),
-            'is_expired': block.is_expired(),
-            'can_take': block.can_take_test() and not completed,
-            'completed': completed,
-        })
+    # Barcha bloklar holati o'zgarmas sondagi so'rovlarda hisoblanadi
+    blocks_data = get_blocks_status(user)
     
     context = {
         'user': user,
         'blocks_data': blocks_data,
     }
     return render(request, 'dashboard.html', context)
+
+
 @login_required
+@query_budget(5)
 def take_test(request, test_id):
     """Test topshirish sahifasi"""
     test_block = get_object_or_404(TestBlock, id=test_id)
     user = request.user
+    status = get_block_status(user, test_block)
     
     # Test topshirish mumkinmi tekshirish
-    if not test_block.can_take_test():
+    if not status['is_open']:
         messages.error(request, 'Bu test hozir mavjud emas!')
         return redirect('dashboard')
     
     # Allaqachon topshirganmi?
-    if TestResult.objects.filter(user=user, test_block=test_block).exists():
+    if status['completed']:
         messages.error(request, 'Siz bu testni allaqachon topshirgansiz!')
         return redirect('dashboard')
     
-    questions = test_block.questions.all()
+    # Savollar va ularning HTML ko'rinishi barcha talabalar uchun umumiy keshda
+    paper = get_exam_paper(test_block)
     
     context = {
         'test_block': test_block,
-        'questions': questions,
-        'total_time': test_block.questions.count() * test_block.time_per_question * 60,  # soniyada
+        'paper': paper,
+        'questions': paper['questions'],
+        'total_time': status['question_count'] * test_block.time_per_question * 60,  # soniyada
         'end_time': test_block.get_end_time().isoformat(),
+        # Sahifa qayta yuklansa avtomatik saqlangan javoblar tiklanadi
+        'saved_answers': get_draft_answers(user.id, test_block.id),
     }
     return render(request, 'take_test.html', context)
 
 
+MAX_TIME_SPENT = 2 ** 31 - 1  # IntegerField chegarasi
+
+
+def parse_submission(body):
+    """So'rov tanasidan (javoblar, sarflangan vaqt); shakli noto'g'ri bo'lsa ValueError"""
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError("So'rov tanasi obyekt emas")
+    answers = data.get('answers', {})
+    if not isinstance(answers, dict):
+        raise ValueError("answers obyekt emas")
+    try:
+        time_spent = int(data.get('time_spent', 0))
+    except (TypeError, OverflowError):
+        raise ValueError("time_spent son emas")
+    if not 0 <= time_spent <= MAX_TIME_SPENT:
+        raise ValueError("time_spent chegaradan tashqarida")
+    return answers, time_spent
+
+
+def submission_response(result):
+    """Topshiriq natijasi (JSON) - birinchi javob ham, qayta yuborishlar ham bir xil"""
+    return JsonResponse({
+        'success': True,
+        'result_id': result['id'],
+        'score': result['score'],
+        'correct': result['correct_answers'],
+        'total': result['total_questions'],
+    })
+
+
 @login_required
+@query_budget(8)
 def submit_test(request, test_id):
-    """Test natijasini saqlash"""
+    """Test natijasini saqlash.
+
+    Brauzer har bir urinish uchun ``Idempotency-Key`` yuboradi va tarmoq
+    xatosida shu kalit bilan qayta yuboradi; natija allaqachon shu kalit
+    bilan saqlangan bo'lsa qayta baholanmasdan asl javob qaytadi.
+    """
     if request.method != 'POST':
         return redirect('dashboard')
     
+    submission_key = request.headers.get('Idempotency-Key', '')
+    if len(submission_key) > 64:
+        return JsonResponse({'success': False, 'error': 'Idempotency-Key juda uzun'}, status=400)
+    
     test_block = get_object_or_404(TestBlock, id=test_id)
     user = request.user
     
-    # Allaqachon topshirganmi?
-    if TestResult.objects.filter(user=user, test_block=test_block).exists():
+    # Allaqachon topshirganmi? Shu kalit bilan bo'lsa - bu qayta yuborish
+    submitted = get_submission(user.id, test_block.id)
+    if submitted is not None:
+        if submission_key and submitted['submission_key'] == submission_key:
+            return submission_response(submitted)
         messages.error(request, 'Siz bu testni allaqachon topshirgansiz!')
         return redirect('dashboard')
     
@@ -111,65 +182,81 @@ def submit_test(request, test_id):
         return redirect('dashboard')
     
     # Javoblarni olish
-    data = json.loads(request.body)
-    answers = data.get('answers', {})
-    time_spent = data.get('time_spent', 0)
-    
-    questions = test_block.questions.all()
-    correct_count = 0
-    
-    # Har bir javobni tekshirish va saqlash
-    for question in questions:
-        selected = answers.get(str(question.id))
-        if selected:
-            is_correct = selected == question.correct_answer
-            if is_correct:
-                correct_count += 1
-            
-            UserAnswer.objects.create(
-                user=user,
-                question=question,
-                selected_answer=selected,
-                is_correct=is_correct
-            )
-    
-    # Natijani hisoblash
-    total_questions = questions.count()
-    score = round((correct_count / total_questions) * 100, 2) if total_questions > 0 else 0
-    
-    # Natijani saqlash
-    result = TestResult.objects.create(
-        user=user,
-        test_block=test_block,
-        score=score,
-        total_questions=total_questions,
-        correct_answers=correct_count,
-        time_spent=time_spent
-    )
+    try:
+        answers, time_spent = parse_submission(request.body)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': "Noto'g'ri so'rov"}, status=400)
+    # WebSocket orqali avtomatik saqlangan javoblar ustiga yuborilganlari;
+    # yuborilgan bo'sh qiymat qoralamadagi javobni o'chiradi (normalize_answers tashlab yuboradi)
+    answers = normalize_answers({**get_draft_answers(user.id, test_block.id), **answers})
+    
+    # Navbat rejimida javoblar faqat navbatga yoziladi, baholashni worker bajaradi
+    if settings.SUBMISSION_QUEUE_ENABLED:
+        receipt = get_submission_queue().enqueue(user.id, test_block.id, answers, time_spent)
+        return JsonResponse({
+            'success': True,
+            'queued': True,
+            'receipt': receipt,
+            'status_url': reverse('submission_status', args=[receipt]),
+            'pending_url': reverse('submission_pending', args=[receipt]),
+        }, status=202)
+    
+    # Baholash va saqlash bitta tranzaksiyada
+    try:
+        result = save_submission(user, test_block, answers, time_spent, submission_key)
+    except IntegrityError:
+        # Parallel so'rov yuqoridagi tekshiruvdan o'tib ketgan - (user, test_block)
+        # cheklovi uni bazada to'xtatdi; shu urinishning qayta yuborishi bo'lsa asl natija
+        submitted = get_submission(user.id, test_block.id)
+        if submitted is not None and submission_key and submitted['submission_key'] == submission_key:
+            return submission_response(submitted)
+        messages.error(request, 'Siz bu testni allaqachon topshirgansiz!')
+        return redirect('dashboard')
     
-    return JsonResponse({
-        'success': True,
-        'result_id': result.id,
-        'score': score,
-        'correct': correct_count,
-        'total': total_questions
+    return submission_response({
+        'id': result.id,
+        # Bazada butun son saqlanadi - qayta yuborishlar ham aynan shu qiymatni oladi
+        'score': int(result.score),
+        'correct_answers': result.correct_answers,
+        'total_questions': result.total_questions,
     })
 
 
 @login_required
+@query_budget(4)
+def submission_status(request, receipt):
+    """Navbatdagi topshiriq holati (JSON)"""
+    status = get_submission_queue().status(receipt, request.user.id)
+    if status is None:
+        raise Http404
+    data = {'status': status['status'], 'ready': status['status'] == QueuedSubmission.DONE}
+    if data['ready']:
+        data['result_url'] = reverse('view_result', args=[status['result_id']])
+    return JsonResponse(data)
+
+
+@login_required
+def submission_pending(request, receipt):
+    """Natija tayyor bo'lguncha kutish sahifasi"""
+    if get_submission_queue().status(receipt, request.user.id) is None:
+        raise Http404
+    context = {
+        'status_url': reverse('submission_status', args=[receipt]),
+    }
+    return render(request, 'submission_pending.html', context)
+
+
+@login_required
+@query_budget(8)
 def view_result(request, result_id):
     """Natijani ko'rish"""
-    result = get_object_or_404(TestResult, id=result_id, user=request.user)
-    
-    # Foydalanuvchi javoblarini olish
-    user_answers = UserAnswer.objects.filter(
-        user=request.user,
-        question__test_block=result.test_block
-    ).select_related('question')
+    result = get_object_or_404(TestResult.objects.select_related('test_block'), id=result_id, user=request.user)
     
     context = {
         'result': result,
-        'user_answers': user_answers,
+        # Javoblar natijaning vektoridan - UserAnswer jadvaliga murojaatsiz
+        'user_answers': result_answers(result),
+        'rankings': get_result_rankings(result, request.user),
     }
     return render(request, 'result.html', context)
 
@@ -182,6 +269,7 @@ def is_admin(user):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(7)
 def admin_dashboard(request):
     """Custom admin bosh sahifa"""
     total_users = CustomUser.objects.filter(is_staff=False).count()
@@ -204,6 +292,7 @@ def admin_dashboard(request):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(3)
 def admin_users(request):
     """Foydalanuvchilar ro'yxati"""
     users = CustomUser.objects.filter(is_staff=False).select_related('group', 'group__course')
@@ -247,6 +336,52 @@ def admin_add_user(request):
     return render(request, 'admin/add_user.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_import_users(request):
+    """O'quvchilar ro'yxatini CSV dan ommaviy qo'shish"""
+    errors = []
+    
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, 'Faylni tanlang!')
+        else:
+            try:
+                # Xeshlash shu oqimda - so'rov workeri ichida jarayonlar hovuzi ochilmaydi,
+                # shuning uchun so'rov vaqtiga sig'adigan qatorlar soni cheklangan
+                report = import_roster(upload, workers=1, max_rows=get_web_max_rows())
+            except RosterImportError as exc:
+                errors = exc.errors
+            except RosterTooLargeError as exc:
+                messages.error(
+                    request,
+                    f"Faylda {exc.rows} ta qator bor - bu sahifa {exc.max_rows} tagacha qabul qiladi. "
+                    f"Kattaroq ro'yxatni serverda import qiling: python manage.py import_roster fayl.csv",
+                )
+            else:
+                # Parollar hech qayerda saqlanmaydi - varaq faqat shu javobda beriladi
+                if request.POST.get('output') == 'csv':
+                    output = io.StringIO()
+                    write_credentials_csv(report.credentials, output)
+                    response = HttpResponse('\ufeff' + output.getvalue(), content_type='text/csv; charset=utf-8')
+                    response['Content-Disposition'] = 'attachment; filename="parollar.csv"'
+                    return response
+                context = {
+                    'credentials': report.credentials,
+                    'duplicates': report.duplicates,
+                    'generated_at': timezone.now(),
+                }
+                return render(request, 'admin/credentials_sheet.html', context)
+    
+    context = {
+        'errors': errors[:200],
+        'error_count': len(errors),
+        'max_rows': get_web_max_rows(),
+    }
+    return render(request, 'admin/import_users.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_edit_user(request, user_id):
@@ -260,6 +395,9 @@ def admin_edit_user(request, user_id):
         password = request.POST.get('password')
         
         if group_id:
+            # Guruh almashsa ikkala guruh reytingi qayta quriladi
+            if str(user.group_id) != group_id:
+                delete_boards([group_board(user.group_id), group_board(group_id)])
             user.group = Group.objects.get(id=group_id)
         
         if password:
@@ -279,36 +417,105 @@ def admin_edit_user(request, user_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(7)
+@reporting_view
 def admin_results(request):
     """Barcha natijalar"""
-    results = TestResult.objects.select_related('user', 'test_block').order_by('-completed_at')
+    filters = get_result_filters(request.GET)
+    results = filter_results(TestResult.objects.select_related('user', 'test_block'), filters)
     
-    # Filter by test block
-    test_id = request.GET.get('test')
-    if test_id:
-        results = results.filter(test_block_id=test_id)
+    # Kursor bo'yicha sahifalash - chuqur sahifalar ham bir xil tez
+    page = paginate_keyset(results, request.GET.get('cursor'), per_page=RESULTS_PER_PAGE)
+    next_url = None
+    if page.next_cursor:
+        next_url = '?' + urlencode({**filters, 'cursor': page.next_cursor})
     
-    # Filter by course
-    course_id = request.GET.get('course')
-    if course_id:
-        results = results.filter(test_block__course_id=course_id)
-    
-    test_blocks = TestBlock.objects.all()
-    courses = Course.objects.all()
+    test_blocks = TestBlock.objects.only('id', 'title')
+    courses = Course.objects.only('id', 'name')
+    groups = Group.objects.only('id', 'name')
     
     context = {
-        'results': results,
+        'results': page.items,
+        'next_url': next_url,
+        'first_url': '?' + urlencode(filters) if 'cursor' in request.GET else None,
+        'total_count': cached_count(results, filters),
+        'filters': filters,
+        'export_query': urlencode(filters),
         'test_blocks': test_blocks,
         'courses': courses,
+        'groups': groups,
     }
     return render(request, 'admin/results.html', context)
 
 
 @login_required
 @user_passes_test(is_admin)
+@reporting_view
+def admin_export_results(request):
+    """Natijalarni (yoki bitta blok bo'yicha javoblar matritsasini) CSV/XLSX ga eksport qilish"""
+    filters = get_result_filters(request.GET)
+    export_format = request.GET.get('format', 'csv')
+    
+    if request.GET.get('answers'):
+        # Noto'g'ri id ni get_result_filters tashlab yuboradi - blok yo'q bo'lsa 404
+        if 'test' not in filters:
+            raise Http404
+        test_block = get_object_or_404(TestBlock, id=filters['test'])
+        rows = answer_matrix_rows(test_block, filters)
+        filename = f'javoblar_{test_block.id}'
+    else:
+        rows = result_rows(filters)
+        filename = 'natijalar'
+    
+    if export_format == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(rows),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        filename += '.xlsx'
+    else:
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv; charset=utf-8')
+        filename += '.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_admin)
+@query_budget(6)
+def admin_leaderboard(request, kind, pk):
+    """Blok, guruh yoki kurs reytingi (top 100)"""
+    if kind not in LEADERBOARD_KINDS:
+        raise Http404
+    model = {'block': TestBlock, 'group': Group, 'course': Course}[kind]
+    target = get_object_or_404(model, id=pk)
+    
+    board = get_board_entries(f'{kind}:{target.id}', k=100)
+    context = {
+        'kind': kind,
+        'target': target,
+        'entries': board[0] if board else [],
+        'total_count': board[1] if board else 0,
+        'unavailable': board is None,
+    }
+    return render(request, 'admin/leaderboard.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+@query_budget(1)
+def admin_proctor(request, block_id):
+    """Imtihonni jonli kuzatish (ma'lumot ws/proctor/ orqali keladi)"""
+    test_block = get_object_or_404(TestBlock, id=block_id)
+    return render(request, 'admin/proctor.html', {'test_block': test_block})
+
+
+@login_required
+@user_passes_test(is_admin)
+@query_budget(4)
 def admin_user_results(request, user_id):
     """Bitta foydalanuvchining barcha natijalari"""
-    user = get_object_or_404(CustomUser, id=user_id)
+    user = get_object_or_404(CustomUser.objects.select_related('group'), id=user_id)
     results = TestResult.objects.filter(user=user).select_related('test_block').order_by('-completed_at')
     
     context = {
@@ -320,6 +527,8 @@ def admin_user_results(request, user_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(3)
+@reporting_view
 def admin_courses(request):
     """Kurslar ro'yxati"""
     courses = Course.objects.annotate(
@@ -386,6 +595,7 @@ def admin_delete_course(request, course_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(3)
 def admin_groups(request):
     """Guruhlar ro'yxati"""
     groups = Group.objects.select_related('course').annotate(
@@ -465,10 +675,10 @@ def admin_delete_group(request, group_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(3)
 def admin_test_blocks(request):
     """Test bloklari ro'yxati"""
     test_blocks = TestBlock.objects.select_related('course').annotate(
-        question_count=Count('questions'),
         result_count=Count('results')
     ).order_by('-created_at')
     
@@ -556,14 +766,19 @@ def admin_delete_test_block(request, block_id):
 
 @login_required
 @user_passes_test(is_admin)
+@query_budget(14)
 def admin_test_questions(request, block_id):
     """Test blokidagi savollar ro'yxati"""
     test_block = get_object_or_404(TestBlock, id=block_id)
-    questions = test_block.questions.all().order_by('order')
+    questions = list(test_block.questions.all().order_by('order'))
+    item_analysis = get_item_analysis(test_block)
+    for question in questions:
+        question.stats = item_analysis['questions'].get(question.id)
     
     context = {
         'test_block': test_block,
         'questions': questions,
+        'result_count': item_analysis['result_count'],
     }
     return render(request, 'admin/test_questions.html', context)
 
@@ -610,6 +825,61 @@ def admin_add_question(request, block_id):
     return render(request, 'admin/question_form.html', context)
 
 
+@login_required
+@user_passes_test(is_admin)
+def admin_exam_tickets(request, block_id):
+    """Blok uchun imtihon chiptalarini yaratish va chop etish"""
+    test_block = get_object_or_404(TestBlock.objects.select_related('course'), id=block_id)
+    
+    if request.method == 'POST':
+        tickets = issue_tickets(test_block)
+        context = {
+            'test_block': test_block,
+            'tickets': [
+                {'ticket': ticket, 'url': request.build_absolute_uri(reverse('ticket_login_token', args=[ticket.token]))}
+                for ticket in tickets
+            ],
+            'generated_at': timezone.now(),
+        }
+        return render(request, 'admin/ticket_sheet.html', context)
+    
+    context = {
+        'test_block': test_block,
+        'ticket_stats': test_block.tickets.aggregate(issued=Count('id'), used=Count('used_at')),
+    }
+    return render(request, 'admin/exam_tickets.html', context)
+
+
+@login_required
+@user_passes_test(is_admin)
+def admin_import_questions(request, block_id):
+    """Savollarni CSV/JSON/matn fayldan ommaviy qo'shish"""
+    test_block = get_object_or_404(TestBlock, id=block_id)
+    errors = []
+    
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        fmt = request.POST.get('format') or (detect_format(upload.name) if upload else '')
+        if upload is None:
+            messages.error(request, 'Faylni tanlang!')
+        else:
+            try:
+                created = import_questions(test_block, upload, fmt)
+            except QuestionImportError as exc:
+                errors = exc.errors
+            else:
+                messages.success(request, f'{len(created)} ta savol muvaffaqiyatli qo\'shildi!')
+                return redirect('admin_test_questions', block_id=test_block.id)
+    
+    context = {
+        'test_block': test_block,
+        'formats': QUESTION_IMPORT_FORMATS,
+        'errors': errors[:200],
+        'error_count': len(errors),
+    }
+    return render(request, 'admin/import_questions.html', context)
+
+
 @login_required
 @user_passes_test(is_admin)
 def admin_edit_question(request, question_id):
@@ -623,10 +893,17 @@ def admin_edit_question(request, question_id):
         question.option_b = request.POST.get('option_b')
         question.option_c = request.POST.get('option_c')
         question.option_d = request.POST.get('option_d')
+        old_correct_answer = question.correct_answer
         question.correct_answer = request.POST.get('correct_answer')
         question.order = int(request.POST.get('order', 0))
         
         question.save()
+        
+        # To'g'ri javob o'zgarsa javoblar kaliti qayta kompilyatsiya qilinadi
+        if question.correct_answer != old_correct_answer:
+            test_block.refresh_from_db(fields=['version'])
+            compile_answer_key(test_block, refresh=True)
+            refresh_item_analysis(test_block, recompute=True)
         messages.success(request, 'Savol muvaffaqiyatli yangilandi!')
         return redirect('admin_test_questions', block_id=test_block.id)
     
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'my_app.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,18 +72,154 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'test_sayt.wsgi.application'
+ASGI_APPLICATION = 'test_sayt.asgi.application'
+
+# Bir nechta jarayonda ishlaganda channels_redis.core.RedisChannelLayer ishlatiladi
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
+
+# Imtihon taymeri qolgan vaqtni necha soniyada bir yuborishi (exam_timer.py)
+EXAM_TIMER_INTERVAL = 1
+
+# WebSocket ulanishlari uchun blok ma'lumotlari jarayon xotirasida necha soniya saqlanadi (block_info.py)
+BLOCK_INFO_CACHE_TIMEOUT = 10
+
+# Avtomatik saqlangan javoblar bazaga necha soniyada bir va bir so'rovda nechta urinish yoziladi (answer_buffer.py)
+ANSWER_FLUSH_INTERVAL = 5
+ANSWER_FLUSH_BATCH_SIZE = 500
+
+# Proktor sahifasiga imtihon holati necha soniyada bir yuboriladi (proctor.py)
+PROCTOR_PUSH_INTERVAL = 1
 
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Imtihon oxirida yuzlab topshiriq bir vaqtda yoziladi. Standart sozlamada SQLite
+# rollback jurnali bilan ishlaydi va yozuvchilar "database is locked" bilan
+# yiqiladi. Ishlab chiqarish profili:
+#   WAL                  - o'quvchilar yozuvchini, yozuvchi o'quvchilarni kutmaydi
+#   synchronous=NORMAL   - WAL da har tranzaksiyada fsync shart emas (checkpointda yetarli)
+#   mmap_size            - o'qishlar sahifa keshini nusxalamasdan xotiradan
+#   timeout              - qulf band bo'lsa xato o'rniga shuncha soniya kutish (busy timeout)
+#   IMMEDIATE            - yozuvchi qulfni tranzaksiya boshida oladi, o'rtada
+#                          qulfni oshirishdagi darhol "locked" xatosi bo'lmaydi
+SQLITE_PRODUCTION_OPTIONS = {
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA mmap_size=268435456',
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+        # Ulanish har so'rovda qayta ochilmaydi
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    },
+    # Admin hisobotlari va eksportlar uchun o'qish replikasi (db_router.py).
+    # Standart holatda asosiy fayl (WAL da o'quvchilar yozuvchiga xalaqit bermaydi);
+    # ishlab chiqarishda asosiy bazaning nusxasiga (masalan, Litestream) yo'naltiriladi
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'init_command': 'PRAGMA query_only=ON; PRAGMA mmap_size=268435456',
+            'timeout': 20,
+        },
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['my_app.db_router.ReportingReplicaRouter']
+REPORTING_DATABASE = 'replica'
+
+
+# Cache
+# Imtihon varag'i workerlar orasida umumiy bo'lishi uchun fayl keshida saqlanadi.
+# 'default' har bir jarayonda alohida (LocMem) - unda faqat yo'qolsa qayta
+# hisoblanadigan narsalar turadi.
+# Redis ixtiyoriy: REDIS_URL berilsa (masalan, redis://localhost:6379/1) sessiyalar,
+# principal va reytinglar barcha workerlar uchun umumiy Redis da turadi
+
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'exam_papers': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'exam_papers',
+    },
+}
+if REDIS_URL:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+EXAM_PAPER_CACHE = 'exam_papers'
+EXAM_PAPER_TIMEOUT = 6 * 60 * 60  # soniya
+EXAM_PAPER_LOCK_TIMEOUT = 10  # soniya
+
+
+# Test topshiriqlari navbati
+# Yoqilganda submit_test javoblarni navbatga yozadi, baholashni
+# "manage.py process_submissions" worker bajaradi
+
+SUBMISSION_QUEUE_ENABLED = False
+SUBMISSION_QUEUE_BACKEND = 'database'  # yoki 'redis'
+SUBMISSION_QUEUE_REDIS_URL = 'redis://localhost:6379/0'
+SUBMISSION_QUEUE_BATCH_SIZE = 200
+
+# Javoblar natijaning o'zida ixcham vektor bo'lib saqlanadi; har bir javob uchun
+# alohida UserAnswer qatori faqat tashqi SQL hisobotlari kerak bo'lsa
+STORE_USER_ANSWER_ROWS = False
+
+# Muddati shuncha kundan oldin tugagan bloklar javoblari "manage.py compact_answers"
+# bilan siqilgan arxivga ko'chiriladi (cron: kuniga bir marta)
+ANSWER_ARCHIVE_AFTER_DAYS = 30
+ANSWER_ARCHIVE_CHUNK_SIZE = 5000  # bir tranzaksiyada o'chiriladigan UserAnswer qatorlari
+
+
+# Reytinglar (blok, guruh, kurs)
+# 'redis' - barcha workerlar uchun umumiy (REDIS_URL berilganda). 'memory' har bir
+# jarayonda alohida va boshqa workerda saqlangan natijalarni ko'rmaydi
+# (checks.py DEBUG siz ogohlantiradi)
+
+LEADERBOARD_BACKEND = 'redis' if REDIS_URL else 'memory'
+LEADERBOARD_REDIS_URL = REDIS_URL or 'redis://localhost:6379/0'
+
+
+# Sessiyalar keshda (topilmasa bazadan), foydalanuvchi ham keshdan tiklanadi -
+# talaba sahifalarida identifikatsiya uchun so'rov yo'q. Kesh barcha workerlar uchun
+# umumiy bo'lishi shart: jarayon ichidagi keshda chiqish yoki parol almashtirish faqat
+# bitta workerga yetib borardi (checks.py LocMem ni rad etadi). Redis bo'lmasa
+# sessiyalar bazada, principal esa keshlanmaydi (har so'rovda bazadan)
+
+AUTHENTICATION_BACKENDS = ['my_app.principal.CachedModelBackend']
+if REDIS_URL:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'shared'
+    PRINCIPAL_CACHE = 'shared'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    PRINCIPAL_CACHE = None
+PRINCIPAL_CACHE_TIMEOUT = 5 * 60  # soniya
+
+# Admin sahifasidan bir martada import qilinadigan o'quvchilar: parollar so'rov
+# ichida ketma-ket xeshlanadi (~0.2 s dan). Kattaroq ro'yxatlar "manage.py import_roster"
+# bilan (jarayonlar hovuzida)
+ROSTER_WEB_MAX_ROWS = 100
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -125,4 +264,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
-LOGOUT_REDIRECT_URL = 'login'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login'
+
+# Logging
+# my_app.requests - har bir so'rov uchun JSON qator (DEBUG o'chiq bo'lganda)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'my_app': {
+            'handlers': ['console'],
+            # Testlar chiqishini har bir so'rov qatori bilan to'ldirmaslik uchun
+            'level': 'WARNING' if 'test' in sys.argv[1:2] else 'INFO',
+        },
+    },
+}